@@ -3,16 +3,37 @@
 # ARCHIVO PRINCIPAL DE LA APLICACIÓN FASTAPI (VERSIÓN SIMPLIFICADA)
 # -----------------------------------------------------------------------------
 
-from fastapi import FastAPI
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from fastapi import FastAPI, Request, Response
 from apscheduler.triggers.cron import CronTrigger
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from config.db import Base, engine, SessionLocal
+from config.db import (
+    Base,
+    engine,
+    async_engine,
+    replica_engine,
+    mark_client_write,
+    PRIMARY_STICKY_COOKIE,
+    READ_YOUR_WRITES_SECONDS,
+)
+from config.schema_upgrades import check_schema_upgrades
 from models import models
 import logging
 from core.logging_config import setup_logging
-from routes.billing_routes import generate_monthly_invoices_job
+from core.responses import default_response_class
+from core.conditional import NotModifiedException
+from core import db_notify
+from core.compression import CompressionMiddleware, PrecompressedStaticFiles
+from utils.file_delivery import (
+    FILE_DELIVERY_MODE,
+    PUBLIC_FILE_MOUNTS,
+    OffloadedStaticFiles,
+)
+from core.query_stats import QueryStatsMiddleware
+from core.http_metrics import HTTPMetricsMiddleware
+from core.profiling import PROFILING_ENABLED, ProfilingMiddleware
+from core import metrics
+from services.plan_catalogue import plan_catalogue
+from services import job_runner
 
 # --- Importaciones de Rutas ---
 from routes.user_routes import user_router
@@ -22,11 +43,17 @@ from routes.subscription_routes import subscription_router
 from routes.admin_routes import admin_router
 from routes.billing_routes import billing_router
 from routes.invoice_routes import invoice_router
+from routes.system_routes import system_router
+from routes.profiling_routes import profiling_router
+from routes.job_routes import job_router
+from routes.file_routes import file_router
 
 # Configura el logging al inicio de la app.
 setup_logging()
 # Crea las tablas en la base de datos si no existen.
 Base.metadata.create_all(bind=engine)
+# Verifica (o, con SCHEMA_AUTO_UPGRADE=true, aplica) las migraciones de esquema.
+check_schema_upgrades(engine)
 
 # Metadatos para la documentación de la API.
 tags_metadata = [
@@ -54,6 +81,14 @@ tags_metadata = [
         "name": "Facturación",
         "description": "Endpoints para la gestión de facturas.",
     },
+    {
+        "name": "Sistema",
+        "description": "Chequeos de salud y estado interno de la API.",
+    },
+    {
+        "name": "Archivos",
+        "description": "Descarga de comprobantes y PDFs con URLs firmadas y con vencimiento.",
+    },
 ]
 
 app = FastAPI(
@@ -61,19 +96,10 @@ app = FastAPI(
     description="API para la gestión de clientes, planes, suscripciones y facturación.",
     version="2.0.0",
     openapi_tags=tags_metadata,
+    default_response_class=default_response_class,
 )
 
 logger = logging.getLogger(__name__)
-scheduler = AsyncIOScheduler()
-
-
-def get_db_for_job():
-    """Función para obtener una sesión de BD para las tareas programadas."""
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
 
 
 # Eventos de inicio y apagado de la aplicación
@@ -83,22 +109,63 @@ async def startup_event():
     logger.info("La aplicación se ha iniciado.")
     # Ya no se crean roles y permisos aquí.
 
-    scheduler.start()
-    scheduler.add_job(
-        generate_monthly_invoices_job,
-        trigger=CronTrigger(day=1, hour=2, minute=0),
-        id="monthly_invoicing_job",
-        name="Generación de Facturas Mensuales",
-        replace_existing=True,
-        args=[next(get_db_for_job())],
-    )
-    logger.info("Tarea de facturación mensual programada.")
+    # Escucha los avisos de cambios (configuración, etc.) de otros workers.
+    db_notify.start_listener()
+    # Con varios workers, cada uno vuelca sus métricas para /metrics.
+    metrics.start_flusher()
+
+    # Precarga el catálogo público de planes; si falla, se carga en la primera
+    # petición a /plans/all.
+    try:
+        plan_catalogue.reload()
+    except Exception as e:
+        logger.error(f"No se pudo precargar el catálogo de planes: {e}")
+
+    # Cada ejecución abre su propia sesión en el executor de tareas.
+    job_runner.scheduler.start()
+    # Corre todos los días y factura solo los ciclos (billing_day) que llegan
+    # hoy, así la carga se reparte a lo largo del mes.
+    job_runner.schedule_job("monthly_invoicing", trigger=CronTrigger(hour=2, minute=0))
+    job_runner.schedule_job("blob_gc", trigger=CronTrigger(hour=4, minute=30))
+    logger.info("Tarea de facturación diaria programada.")
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("La aplicación se está apagando.")
-    scheduler.shutdown()
+    job_runner.scheduler.shutdown()
+    job_runner.shutdown()
+    db_notify.stop_listener()
+    metrics.stop_flusher()
+    await async_engine.dispose()
+
+
+@app.exception_handler(NotModifiedException)
+async def not_modified_handler(request: Request, exc: NotModifiedException):
+    return Response(status_code=304, headers=exc.headers)
+
+
+@app.middleware("http")
+async def read_your_writes_middleware(request: Request, call_next):
+    """
+    Tras una escritura exitosa, fija al cliente al primario durante unos segundos
+    (ver get_read_db en config/db.py). Sin réplica configurada no hace nada.
+    """
+    response = await call_next(request)
+    if (
+        replica_engine is not None
+        and request.method in ("POST", "PUT", "PATCH", "DELETE")
+        and response.status_code < 400
+    ):
+        until = mark_client_write(request)
+        response.set_cookie(
+            PRIMARY_STICKY_COOKIE,
+            f"{until:.3f}",
+            max_age=int(READ_YOUR_WRITES_SECONDS) + 1,
+            httponly=True,
+            samesite="lax",
+        )
+    return response
 
 
 # Configuración de CORS
@@ -113,6 +180,15 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Comprime JSON y texto con Brotli/gzip según lo que acepte el cliente.
+app.add_middleware(CompressionMiddleware)
+# Cuenta las sentencias SQL de cada petición (Server-Timing y detector de N+1).
+app.add_middleware(QueryStatsMiddleware)
+# Latencia por plantilla de ruta y peticiones en curso, expuestas en /metrics.
+app.add_middleware(HTTPMetricsMiddleware)
+# Perfilado bajo demanda; deshabilitado, el middleware no se registra.
+if PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
 
 # --- Inclusión de los Routers Simplificados ---
 app.include_router(user_router, prefix="/api")
@@ -124,13 +200,27 @@ app.include_router(
 )  # Prefijo de admin se maneja en el propio router
 app.include_router(billing_router, prefix="/api")
 app.include_router(invoice_router, prefix="/api")
+app.include_router(profiling_router, prefix="/api")
+app.include_router(job_router, prefix="/api")
+# Los chequeos de salud van sin prefijo para los balanceadores y orquestadores.
+app.include_router(system_router)
 
 # Rutas que ya no se incluyen:
 # app.include_router(token_router, ...)
 # app.include_router(role_router, ...)
 
-app.mount("/facturas", StaticFiles(directory="facturas"), name="facturas")
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+# Descargas con URL firmada (sin JWT ni BD), sin prefijo como los estáticos.
+app.include_router(file_router)
+
+# Con FILE_DELIVERY_MODE=nginx/sendfile los bytes los envía el proxy.
+StaticFilesClass = (
+    PrecompressedStaticFiles if FILE_DELIVERY_MODE == "app" else OffloadedStaticFiles
+)
+# PUBLIC_FILE_MOUNTS=false cierra el acceso sin firma a /facturas y /uploads:
+# los archivos solo se descargan con las URLs firmadas de /files.
+if PUBLIC_FILE_MOUNTS:
+    app.mount("/facturas", StaticFilesClass(directory="facturas"), name="facturas")
+    app.mount("/uploads", StaticFilesClass(directory="uploads"), name="uploads")
 
 
 @app.get("/")
@@ -1,13 +1,40 @@
 # Backend/auth/security.py
 import datetime
+import time
 import pytz
 import jwt
 import logging
 from passlib.context import CryptContext
 from models.models import User
+from core.metrics import registry
 
 logger = logging.getLogger(__name__)
 
+# bcrypt es CPU intensivo y corre en el threadpool de las rutas sync: estas
+# métricas muestran cuántos hashes hay en curso y cuánto tarda cada uno.
+password_hash_in_progress = registry.gauge(
+    "auth_password_hash_in_progress",
+    "Operaciones de bcrypt (hash o verificación) en curso.",
+)
+password_hash_duration = registry.histogram(
+    "auth_password_hash_seconds",
+    "Duración de las operaciones de bcrypt.",
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 2.0, 5.0),
+)
+
+
+def _timed_bcrypt(operation: str, func, *args):
+    password_hash_in_progress.inc()
+    started = time.perf_counter()
+    try:
+        return func(*args)
+    finally:
+        password_hash_in_progress.dec()
+        password_hash_duration.observe(
+            time.perf_counter() - started, labels={"operation": operation}
+        )
+
+
 # --- Configuración de Seguridad Simplificada ---
 SECRET_KEY = "tu_clave_secreta_aqui_deberia_ser_mas_larga_y_compleja"
 ALGORITHM = "HS256"
@@ -21,12 +48,14 @@ class Security:
     @staticmethod
     def get_password_hash(password: str) -> str:
         """Genera el hash encriptado de una contraseña."""
-        return pwd_context.hash(password)
+        return _timed_bcrypt("hash", pwd_context.hash, password)
 
     @staticmethod
     def verify_password(plain_password: str, hashed_password: str) -> bool:
         """Verifica una contraseña plana contra su versión encriptada."""
-        return pwd_context.verify(plain_password, hashed_password)
+        return _timed_bcrypt(
+            "verify", pwd_context.verify, plain_password, hashed_password
+        )
 
     @classmethod
     def hoy(cls):
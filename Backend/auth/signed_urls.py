@@ -0,0 +1,81 @@
+# auth/signed_urls.py
+import base64
+import datetime
+import hashlib
+import hmac
+import os
+import posixpath
+import time
+from urllib.parse import quote
+
+from auth.security import SECRET_KEY
+
+# URLs firmadas (HMAC-SHA256) y con vencimiento para descargar comprobantes y
+# PDFs sin JWT ni consulta a la BD: la firma prueba que la API autorizó esa
+# ruta hasta ese momento. Por defecto la clave se deriva de la de los JWT.
+FILE_URL_SECRET = (
+    os.getenv("FILE_URL_SECRET")
+    or hmac.new(SECRET_KEY.encode(), b"signed-file-urls", hashlib.sha256).hexdigest()
+).encode()
+FILE_URL_TTL_SECONDS = int(os.getenv("FILE_URL_TTL_SECONDS", "900"))
+FILE_URL_PREFIX = "/files"
+# Únicas carpetas que se pueden firmar y descargar.
+SIGNED_ROOTS = ("facturas", "uploads")
+
+
+def normalize_file_path(url: str | None) -> str | None:
+    """
+    Ruta relativa al backend ('uploads/...', 'facturas/...') de un archivo
+    guardado en la BD, o None si queda fuera de SIGNED_ROOTS. Los PDFs
+    generados se guardan relativos a facturas/.
+    """
+    if not url:
+        return None
+    path = posixpath.normpath(url.replace("\\", "/")).lstrip("/")
+    if path.startswith("../") or path in ("", ".", ".."):
+        return None
+    if path.split("/", 1)[0] not in SIGNED_ROOTS:
+        path = f"facturas/{path}"
+    return path
+
+
+def _signature(path: str, expires: int) -> str:
+    digest = hmac.new(
+        FILE_URL_SECRET, f"{path}\n{expires}".encode(), hashlib.sha256
+    ).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+
+def signing_window() -> int:
+    """Ventana de firma actual: las URLs firmadas cambian al empezar cada una."""
+    return int(time.time()) // FILE_URL_TTL_SECONDS
+
+
+def signing_window_start() -> datetime.datetime:
+    """Momento en que empezó la ventana actual (hora local, como las fechas de la BD)."""
+    return datetime.datetime.fromtimestamp(signing_window() * FILE_URL_TTL_SECONDS)
+
+
+def sign_file_url(url: str | None, ttl: int | None = None) -> str | None:
+    """
+    URL firmada para 'url'. El vencimiento se redondea a ventanas de 'ttl'
+    segundos: durante una ventana la URL es la misma para todas las
+    respuestas, así que el navegador o una caché intermedia la reutilizan.
+    Vale entre 'ttl' y 2 * 'ttl' segundos.
+    """
+    path = normalize_file_path(url)
+    if path is None:
+        return None
+    ttl = ttl or FILE_URL_TTL_SECONDS
+    expires = (int(time.time()) // ttl + 2) * ttl
+    return (
+        f"{FILE_URL_PREFIX}/{quote(path)}"
+        f"?expires={expires}&signature={_signature(path, expires)}"
+    )
+
+
+def verify_file_signature(path: str, expires: int, signature: str) -> bool:
+    """True si la firma corresponde a la ruta y todavía no venció."""
+    if expires < time.time():
+        return False
+    return hmac.compare_digest(_signature(path, expires), signature)
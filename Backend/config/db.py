@@ -1,9 +1,16 @@
 # config/db.py
 import os
+import time
+import hashlib
+import threading
+from fastapi import Request
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import QueuePool
 from dotenv import load_dotenv
+from core.metrics import registry
+from core.query_stats import instrument_engine
 
 load_dotenv()
 DB_USER = os.getenv("DB_USER")
@@ -12,12 +19,182 @@ DB_HOST = os.getenv("DB_HOST")
 DB_NAME = os.getenv("DB_NAME")
 
 DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASS}@{DB_HOST}:5432/{DB_NAME}"
+# Misma base de datos, pero a través del driver asíncrono (asyncpg).
+ASYNC_DATABASE_URL = (
+    f"postgresql+asyncpg://{DB_USER}:{DB_PASS}@{DB_HOST}:5432/{DB_NAME}"
+)
 
-engine = create_engine(DATABASE_URL)
+# --- Réplica de lectura (opcional) ---
+# Si DB_REPLICA_HOST no está definido, las lecturas van al primario.
+DB_REPLICA_HOST = os.getenv("DB_REPLICA_HOST")
+DB_REPLICA_PORT = os.getenv("DB_REPLICA_PORT", "5432")
+REPLICA_DATABASE_URL = (
+    f"postgresql://{DB_USER}:{DB_PASS}@{DB_REPLICA_HOST}:{DB_REPLICA_PORT}/{DB_NAME}"
+    if DB_REPLICA_HOST
+    else None
+)
+# Segundos durante los cuales un cliente que acaba de escribir lee del primario,
+# para que vea sus propios cambios aunque la réplica tenga retraso.
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+PRIMARY_STICKY_COOKIE = "upl_primary_until"
+
+# --- Configuración del pool de conexiones ---
+# Todos los valores se pueden ajustar por variables de entorno. Cada worker
+# tiene un pool sync y otro async, así que el total de conexiones al primario es
+#   workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW
+#              + DB_ASYNC_POOL_SIZE + DB_ASYNC_MAX_OVERFLOW).
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+# Pool del motor asíncrono; por defecto, el mismo tamaño que el sync.
+DB_ASYNC_POOL_SIZE = int(os.getenv("DB_ASYNC_POOL_SIZE", str(DB_POOL_SIZE)))
+DB_ASYNC_MAX_OVERFLOW = int(os.getenv("DB_ASYNC_MAX_OVERFLOW", str(DB_MAX_OVERFLOW)))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))  # segundos
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # segundos
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+# Timeout por sentencia en milisegundos (0 = sin límite).
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+# Porcentaje de uso del pool a partir del cual /health/ready responde 503.
+DB_POOL_SATURATION_LIMIT = float(os.getenv("DB_POOL_SATURATION_LIMIT", "0.9"))
+
+pool_checkout_wait = registry.histogram(
+    "db_pool_checkout_wait_seconds",
+    "Tiempo de espera para obtener una conexión del pool.",
+)
+pool_checkout_timeouts = registry.counter(
+    "db_pool_checkout_timeouts_total",
+    "Cantidad de veces que no se pudo obtener una conexión dentro del timeout.",
+)
+pool_connections = registry.gauge(
+    "db_pool_connections", "Conexiones de cada pool por estado."
+)
+pool_saturation = registry.gauge(
+    "db_pool_saturation",
+    "Fracción de conexiones en uso de cada pool sobre su máximo (el peor worker).",
+    mode="max",
+)
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool que mide cuánto espera cada petición por una conexión."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except Exception:
+            pool_checkout_timeouts.inc()
+            raise
+        finally:
+            pool_checkout_wait.observe(time.perf_counter() - start)
+
+
+def _connect_args() -> dict:
+    if DB_STATEMENT_TIMEOUT_MS > 0:
+        return {"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"}
+    return {}
+
+
+def _create_sync_engine(url: str):
+    return create_engine(
+        url,
+        poolclass=InstrumentedQueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+        connect_args=_connect_args(),
+    )
+
+
+engine = _create_sync_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+replica_engine = (
+    _create_sync_engine(REPLICA_DATABASE_URL) if REPLICA_DATABASE_URL else None
+)
+ReadSessionLocal = (
+    sessionmaker(autocommit=False, autoflush=False, bind=replica_engine)
+    if replica_engine
+    else SessionLocal
+)
 Base = declarative_base()
 
 
+def _async_connect_args() -> dict:
+    if DB_STATEMENT_TIMEOUT_MS > 0:
+        return {"server_settings": {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}}
+    return {}
+
+
+# --- Motor asíncrono ---
+# Se usa en las rutas de lectura declaradas con 'async def', para que las
+# consultas no ocupen un hilo del threadpool mientras esperan a PostgreSQL.
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    pool_size=DB_ASYNC_POOL_SIZE,
+    max_overflow=DB_ASYNC_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_pre_ping=DB_POOL_PRE_PING,
+    connect_args=_async_connect_args(),
+)
+# expire_on_commit=False: los objetos siguen siendo legibles después del commit,
+# ya que en modo asíncrono no se pueden recargar atributos de forma implícita.
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, autoflush=False, expire_on_commit=False
+)
+
+# Conteo por petición y registro de consultas lentas en todos los motores. Los
+# EXPLAIN de las consultas asíncronas se hacen con el motor sync del primario.
+instrument_engine(engine)
+instrument_engine(replica_engine)
+instrument_engine(async_engine.sync_engine, explain_engine=engine)
+
+
+def _pool_stats(pool, pool_size: int, max_overflow: int) -> dict:
+    checked_out = pool.checkedout()
+    capacity = pool_size + max_overflow
+    return {
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "checked_out": checked_out,
+        "checked_in": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "saturation": round(checked_out / capacity, 3) if capacity else 1.0,
+    }
+
+
+def get_pool_stats() -> dict:
+    """
+    Devuelve el estado de cada pool de conexiones y actualiza las métricas.
+    La saturación es la fracción de conexiones en uso sobre el máximo permitido;
+    la general es la del pool más saturado.
+    """
+    pools = {
+        "primary": _pool_stats(engine.pool, DB_POOL_SIZE, DB_MAX_OVERFLOW),
+        "async": _pool_stats(
+            async_engine.sync_engine.pool, DB_ASYNC_POOL_SIZE, DB_ASYNC_MAX_OVERFLOW
+        ),
+    }
+    if replica_engine is not None:
+        pools["replica"] = _pool_stats(
+            replica_engine.pool, DB_POOL_SIZE, DB_MAX_OVERFLOW
+        )
+    for name, stats in pools.items():
+        for state in ("checked_out", "checked_in", "overflow"):
+            pool_connections.set(stats[state], {"pool": name, "state": state})
+        pool_saturation.set(stats["saturation"], {"pool": name})
+    return {
+        "saturation": max(stats["saturation"] for stats in pools.values()),
+        "pools": pools,
+    }
+
+
+# Las métricas del pool se refrescan en cada exportación de /metrics.
+registry.add_collector(get_pool_stats)
+
+
 # --- Dependencia de Base de Datos ---
 def get_db():
     """
@@ -29,3 +206,73 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    """
+    Dependencia de FastAPI equivalente a get_db, pero con una AsyncSession.
+    Solo debe usarse desde rutas declaradas con 'async def'.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# --- Enrutamiento de lecturas entre primario y réplica ---
+# Marcas locales del proceso: clave de cliente -> instante (monotonic) hasta el
+# que debe leer del primario. La cookie PRIMARY_STICKY_COOKIE cubre el caso en
+# que la siguiente petición del cliente llega a otro worker.
+_primary_sticky_until = {}
+_primary_sticky_lock = threading.Lock()
+
+
+def client_key(request: Request) -> str:
+    """Identifica al cliente por su token, o por su IP si no está autenticado."""
+    authorization = request.headers.get("authorization")
+    if authorization:
+        return hashlib.sha1(authorization.encode()).hexdigest()
+    return request.client.host if request.client else "anonimo"
+
+
+def mark_client_write(request: Request) -> float:
+    """
+    Registra que el cliente acaba de escribir. Devuelve el timestamp (epoch)
+    hasta el cual sus lecturas irán al primario, para guardarlo en la cookie.
+    """
+    with _primary_sticky_lock:
+        _primary_sticky_until[client_key(request)] = (
+            time.monotonic() + READ_YOUR_WRITES_SECONDS
+        )
+        # Limpieza oportunista de marcas vencidas para que el dict no crezca.
+        if len(_primary_sticky_until) > 10000:
+            now = time.monotonic()
+            for key in [k for k, v in _primary_sticky_until.items() if v < now]:
+                del _primary_sticky_until[key]
+    return time.time() + READ_YOUR_WRITES_SECONDS
+
+
+def should_read_from_primary(request: Request) -> bool:
+    if replica_engine is None:
+        return True
+    with _primary_sticky_lock:
+        until = _primary_sticky_until.get(client_key(request))
+    if until and until > time.monotonic():
+        return True
+    cookie = request.cookies.get(PRIMARY_STICKY_COOKIE)
+    try:
+        return bool(cookie) and float(cookie) > time.time()
+    except ValueError:
+        return False
+
+
+def get_read_db(request: Request):
+    """
+    Dependencia para endpoints de solo lectura (listados, reportes).
+    Usa la réplica si está configurada, salvo que el cliente haya escrito
+    hace menos de READ_YOUR_WRITES_SECONDS segundos.
+    """
+    factory = SessionLocal if should_read_from_primary(request) else ReadSessionLocal
+    db = factory()
+    try:
+        yield db
+    finally:
+        db.close()
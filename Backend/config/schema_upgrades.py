@@ -0,0 +1,152 @@
+# config/schema_upgrades.py
+import logging
+import os
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+# Base.metadata.create_all() crea tablas nuevas pero no modifica las existentes.
+# Aquí se listan, en orden, los cambios de esquema sobre tablas que ya existen,
+# agrupados en migraciones con nombre. Cada una se aplica una sola vez: la tabla
+# schema_migrations guarda las ya aplicadas. Sus sentencias siguen siendo
+# idempotentes por si la base se creó con create_all() después del cambio.
+#
+# Los ALTER ... SET NOT NULL y los UPDATE de relleno toman locks exclusivos,
+# así que no se ejecutan al arrancar cada worker: se aplican en el despliegue
+# con scripts/upgrade_schema.py (o al importar la app si SCHEMA_AUTO_UPGRADE=true).
+SCHEMA_AUTO_UPGRADE = os.getenv("SCHEMA_AUTO_UPGRADE", "false").lower() == "true"
+# Primer argumento de pg_advisory_xact_lock: dos despliegues simultáneos no
+# aplican las mismas migraciones a la vez.
+SCHEMA_LOCK_KEY = 7402
+
+SCHEMA_UPGRADES = [
+    (
+        # Versión de fila para ETag / Last-Modified (peticiones condicionales).
+        "0001_updated_at_columns",
+        [
+            "ALTER TABLE users ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP DEFAULT now()",
+            "ALTER TABLE userdetails ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP DEFAULT now()",
+            "ALTER TABLE internet_plans ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP DEFAULT now()",
+            "ALTER TABLE invoices ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP DEFAULT now()",
+        ],
+    ),
+    (
+        # Turno programado de cada ejecución: una sola por turno en el cluster.
+        "0002_job_runs_slot",
+        [
+            "ALTER TABLE job_runs ADD COLUMN IF NOT EXISTS slot TIMESTAMP",
+            "CREATE UNIQUE INDEX IF NOT EXISTS uq_job_runs_job_slot ON job_runs (job_name, slot)",
+        ],
+    ),
+    (
+        # Ciclos de facturación escalonados: día de facturación por suscripción
+        # (el aniversario, hasta el 28) y ciclo facturado en cada factura.
+        "0003_billing_cycles",
+        [
+            "ALTER TABLE subscriptions ADD COLUMN IF NOT EXISTS billing_day INTEGER",
+            """
+            UPDATE subscriptions
+            SET billing_day = LEAST(COALESCE(EXTRACT(DAY FROM subscription_date)::int, 1), 28)
+            WHERE billing_day IS NULL
+            """,
+            "ALTER TABLE subscriptions ALTER COLUMN billing_day SET DEFAULT 1",
+            "ALTER TABLE subscriptions ALTER COLUMN billing_day SET NOT NULL",
+            "ALTER TABLE invoices ADD COLUMN IF NOT EXISTS billing_period DATE",
+            # Las facturas anteriores pertenecen al ciclo del mes en que se
+            # emitieron; si hubiera duplicados en un mes, solo la primera
+            # recibe el ciclo.
+            """
+            UPDATE invoices AS i
+            SET billing_period = date_trunc('month', i.issue_date)::date
+            WHERE i.billing_period IS NULL
+              AND i.issue_date IS NOT NULL
+              AND i.id = (
+                  SELECT min(j.id) FROM invoices AS j
+                  WHERE j.subscription_id = i.subscription_id
+                    AND date_trunc('month', j.issue_date) = date_trunc('month', i.issue_date)
+              )
+              AND NOT EXISTS (
+                  SELECT 1 FROM invoices AS k
+                  WHERE k.subscription_id = i.subscription_id
+                    AND k.billing_period = date_trunc('month', i.issue_date)::date
+              )
+            """,
+            "CREATE UNIQUE INDEX IF NOT EXISTS uq_invoices_subscription_period "
+            "ON invoices (subscription_id, billing_period)",
+        ],
+    ),
+    (
+        # Cola de revisión de comprobantes (ver INVOICE_REVIEW_STATUSES).
+        "0004_invoice_review_queue_index",
+        [
+            "CREATE INDEX IF NOT EXISTS ix_invoices_review_queue ON invoices (updated_at, id) "
+            "WHERE status IN ('En Verificacion', 'in_review')",
+        ],
+    ),
+]
+
+
+def _applied(connection) -> set:
+    if connection.scalar(text("SELECT to_regclass('schema_migrations')")) is None:
+        return set()
+    return set(connection.scalars(text("SELECT name FROM schema_migrations")))
+
+
+def pending_schema_upgrades(engine) -> list[str]:
+    """Nombres de las migraciones que faltan aplicar (una sola consulta, sin locks)."""
+    with engine.connect() as connection:
+        applied = _applied(connection)
+    return [name for name, _ in SCHEMA_UPGRADES if name not in applied]
+
+
+def apply_schema_upgrades(engine) -> list[str]:
+    """
+    Aplica en una sola transacción las migraciones pendientes y las registra en
+    schema_migrations. Devuelve los nombres de las aplicadas.
+    """
+    if not pending_schema_upgrades(engine):
+        logger.info("Esquema al día, sin migraciones pendientes.")
+        return []
+    with engine.begin() as connection:
+        connection.execute(
+            text("SELECT pg_advisory_xact_lock(:key)"), {"key": SCHEMA_LOCK_KEY}
+        )
+        connection.execute(
+            text(
+                "CREATE TABLE IF NOT EXISTS schema_migrations ("
+                "name VARCHAR(100) PRIMARY KEY, applied_at TIMESTAMP DEFAULT now())"
+            )
+        )
+        # Con el lock tomado se vuelve a leer: otro proceso pudo aplicarlas.
+        applied = _applied(connection)
+        pending = [
+            (name, statements)
+            for name, statements in SCHEMA_UPGRADES
+            if name not in applied
+        ]
+        for name, statements in pending:
+            for statement in statements:
+                connection.execute(text(statement))
+            connection.execute(
+                text("INSERT INTO schema_migrations (name) VALUES (:name)"),
+                {"name": name},
+            )
+            logger.info(f"Migración de esquema aplicada: {name}.")
+    return [name for name, _ in pending]
+
+
+def check_schema_upgrades(engine):
+    """
+    Al arrancar la app: aplica las migraciones pendientes si SCHEMA_AUTO_UPGRADE
+    está activo; si no, solo avisa de las que faltan.
+    """
+    if SCHEMA_AUTO_UPGRADE:
+        apply_schema_upgrades(engine)
+        return
+    pending = pending_schema_upgrades(engine)
+    if pending:
+        logger.error(
+            f"Faltan migraciones de esquema: {', '.join(pending)}. "
+            "Ejecute scripts/upgrade_schema.py antes de iniciar la app."
+        )
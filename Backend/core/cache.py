@@ -0,0 +1,237 @@
+# core/cache.py
+import functools
+import inspect
+import logging
+import os
+import pickle
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from core import db_notify
+from core.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# Caché de resultados de consultas, local a cada worker.
+# - LRU con TTL por entrada y un tope de memoria aproximado (CACHE_MAX_BYTES).
+# - Cada entrada lleva etiquetas ("user:42", "invoices"); las rutas que escriben
+#   llaman a invalidate_tags() y, al hacer commit, se desalojan las entradas con
+#   esas etiquetas en este worker y, vía NOTIFY, en los demás.
+# - Los valores se comparten entre peticiones: deben ser datos planos o schemas
+#   de Pydantic (nunca objetos ORM) y no deben modificarse.
+
+CACHE_ENABLED = os.getenv("QUERY_CACHE_ENABLED", "true").lower() == "true"
+CACHE_MAX_BYTES = int(os.getenv("QUERY_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+CACHE_DEFAULT_TTL = float(os.getenv("QUERY_CACHE_DEFAULT_TTL", "60"))
+
+CACHE_CHANNEL = "query_cache_evict"
+
+_hits = registry.counter("query_cache_hits_total", "Aciertos de la caché de consultas.")
+_misses = registry.counter(
+    "query_cache_misses_total", "Fallos de la caché de consultas."
+)
+_evictions = registry.counter(
+    "query_cache_evictions_total", "Entradas desalojadas de la caché de consultas."
+)
+_size_bytes = registry.gauge(
+    "query_cache_size_bytes", "Tamaño aproximado de la caché de consultas."
+)
+_entries = registry.gauge("query_cache_entries", "Entradas en la caché de consultas.")
+
+
+def _estimate_size(value) -> int:
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return sys.getsizeof(value)
+
+
+class _Entry:
+    __slots__ = ("value", "expires_at", "size", "tags")
+
+    def __init__(self, value, expires_at: float, size: int, tags: frozenset):
+        self.value = value
+        self.expires_at = expires_at
+        self.size = size
+        self.tags = tags
+
+
+class QueryCache:
+    def __init__(self, max_bytes: int = CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._tag_index = {}
+        self._bytes = 0
+        # Aumenta con cada desalojo por etiqueta; evita guardar un resultado
+        # calculado antes de una invalidación que ocurrió mientras tanto.
+        self.generation = 0
+
+    def _remove(self, key, reason: str):
+        # Debe llamarse con el lock tomado.
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._bytes -= entry.size
+        for tag in entry.tags:
+            keys = self._tag_index.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tag_index[tag]
+        _evictions.inc(labels={"reason": reason})
+
+    def _update_gauges(self):
+        _size_bytes.set(self._bytes)
+        _entries.set(len(self._entries))
+
+    def get(self, key):
+        """Devuelve (True, valor) si hay una entrada vigente, o (False, None)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            if entry.expires_at <= time.monotonic():
+                self._remove(key, "expired")
+                self._update_gauges()
+                return False, None
+            self._entries.move_to_end(key)
+            return True, entry.value
+
+    def set(self, key, value, ttl: float, tags=(), generation: int | None = None):
+        size = _estimate_size(value)
+        if size > self.max_bytes:
+            return
+        entry = _Entry(value, time.monotonic() + ttl, size, frozenset(tags))
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._remove(key, "replaced")
+            self._entries[key] = entry
+            self._bytes += size
+            for tag in entry.tags:
+                self._tag_index.setdefault(tag, set()).add(key)
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest, "size")
+            self._update_gauges()
+
+    def evict_tags(self, tags) -> int:
+        with self._lock:
+            self.generation += 1
+            keys = set()
+            for tag in tags:
+                keys |= self._tag_index.get(tag, set())
+            for key in keys:
+                self._remove(key, "tag")
+            self._update_gauges()
+        return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            for key in list(self._entries):
+                self._remove(key, "clear")
+            self._update_gauges()
+
+
+query_cache = QueryCache()
+
+
+def cached(ttl: float | None = None, tags=(), ignore=("db",)):
+    """
+    Decorador para funciones de servicio (sync o async). La clave es el nombre
+    de la función más sus argumentos, salvo los listados en 'ignore' (la sesión
+    de BD). Las etiquetas pueden usar los argumentos: tags=("user:{user_id}",).
+    """
+    ttl = CACHE_DEFAULT_TTL if ttl is None else ttl
+
+    def decorator(func):
+        signature = inspect.signature(func)
+        name = f"{func.__module__}.{func.__qualname__}"
+
+        def make_key(args, kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = {k: v for k, v in bound.arguments.items() if k not in ignore}
+            key = (name, tuple(sorted(arguments.items())))
+            entry_tags = [tag.format(**arguments) for tag in tags]
+            return key, entry_tags
+
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if not CACHE_ENABLED:
+                    return await func(*args, **kwargs)
+                key, entry_tags = make_key(args, kwargs)
+                found, value = query_cache.get(key)
+                if found:
+                    _hits.inc(labels={"function": name})
+                    return value
+                _misses.inc(labels={"function": name})
+                generation = query_cache.generation
+                value = await func(*args, **kwargs)
+                query_cache.set(key, value, ttl, entry_tags, generation)
+                return value
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not CACHE_ENABLED:
+                return func(*args, **kwargs)
+            key, entry_tags = make_key(args, kwargs)
+            found, value = query_cache.get(key)
+            if found:
+                _hits.inc(labels={"function": name})
+                return value
+            _misses.inc(labels={"function": name})
+            generation = query_cache.generation
+            value = func(*args, **kwargs)
+            query_cache.set(key, value, ttl, entry_tags, generation)
+            return value
+
+        return wrapper
+
+    return decorator
+
+
+def invalidate_tags(db: Session, *tags: str):
+    """
+    Marca etiquetas a desalojar cuando la transacción de 'db' haga commit.
+    Este worker desaloja en el after_commit; los demás reciben el NOTIFY, que
+    PostgreSQL solo entrega si el commit se completa.
+    """
+    if not tags:
+        return
+    db.info.setdefault("cache_tags", set()).update(tags)
+    db_notify.notify(db, CACHE_CHANNEL, ",".join(tags))
+
+
+@event.listens_for(Session, "after_commit")
+def _evict_after_commit(session):
+    tags = session.info.pop("cache_tags", None)
+    if tags:
+        query_cache.evict_tags(tags)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session):
+    session.info.pop("cache_tags", None)
+
+
+def _on_remote_eviction(payload: str | None):
+    if payload is None:
+        # Se perdieron avisos mientras la conexión estaba caída.
+        query_cache.clear()
+        return
+    query_cache.evict_tags(tag for tag in payload.split(",") if tag)
+
+
+db_notify.subscribe(CACHE_CHANNEL, _on_remote_eviction)
@@ -0,0 +1,221 @@
+# core/compression.py
+import gzip
+import os
+import stat
+import zlib
+from mimetypes import guess_type
+
+import anyio
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers, MutableHeaders
+
+from core.metrics import registry
+
+try:
+    import brotli
+except ImportError:  # Brotli es opcional: sin él solo se ofrece gzip.
+    brotli = None
+
+# --- Configuración ---
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "500"))  # bytes
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+
+# Solo se comprimen formatos de texto. PDF, JPG o PNG ya vienen comprimidos y
+# recomprimirlos gasta CPU sin ahorrar casi nada.
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+    "text/",
+)
+
+compression_bytes_in = registry.counter(
+    "http_compression_bytes_in_total", "Bytes de respuesta antes de comprimir."
+)
+compression_bytes_out = registry.counter(
+    "http_compression_bytes_out_total", "Bytes de respuesta enviados ya comprimidos."
+)
+
+
+def accepted_encodings(scope) -> set:
+    """Devuelve las codificaciones aceptadas por el cliente (sin q=0)."""
+    header = Headers(scope=scope).get("accept-encoding", "")
+    encodings = set()
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        if name and params.replace(" ", "") not in ("q=0", "q=0.0"):
+            encodings.add(name.lower())
+    return encodings
+
+
+def choose_encoding(scope) -> str | None:
+    accepted = accepted_encodings(scope)
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def is_compressible(content_type: str | None) -> bool:
+    if not content_type:
+        return False
+    return content_type.split(";")[0].strip().lower().startswith(COMPRESSIBLE_TYPES)
+
+
+class _StreamCompressor:
+    """Interfaz común para comprimir por partes con brotli o gzip."""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=COMPRESSION_BROTLI_QUALITY)
+        else:
+            # wbits = 16 + MAX_WBITS genera el formato gzip (con cabecera y CRC).
+            self._compressor = zlib.compressobj(
+                COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS
+            )
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.process(data) + self._compressor.flush()
+        return self._compressor.compress(data) + self._compressor.flush(
+            zlib.Z_SYNC_FLUSH
+        )
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+
+def compress_body(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=COMPRESSION_GZIP_LEVEL)
+
+
+class CompressionMiddleware:
+    """
+    Middleware ASGI que comprime respuestas con Brotli (preferido) o gzip.
+    Solo actúa sobre tipos de contenido de texto y cuerpos de al menos
+    COMPRESSION_MIN_SIZE bytes, y respeta respuestas que ya traen
+    Content-Encoding (por ejemplo, archivos estáticos precomprimidos).
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(scope)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        compressor = None
+        passthrough = False
+        # Cuerpo retenido mientras no se sepa si alcanza COMPRESSION_MIN_SIZE.
+        # Hace falta porque algunas respuestas llegan en varios mensajes.
+        pending = b""
+
+        async def send_wrapper(message):
+            nonlocal start_message, compressor, passthrough, pending
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                passthrough = (
+                    message["status"] in (204, 206, 304)
+                    or "content-encoding" in headers
+                    or not is_compressible(headers.get("content-type"))
+                )
+                if passthrough:
+                    await send(message)
+                else:
+                    # Se retiene hasta decidir si el cuerpo se comprime.
+                    start_message = message
+                return
+
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if compressor is None:
+                pending += body
+                if more_body and len(pending) < self.minimum_size:
+                    return
+                if not more_body and len(pending) < self.minimum_size:
+                    passthrough = True
+                    await send(start_message)
+                    await send({**message, "body": pending})
+                    return
+
+                headers = MutableHeaders(raw=start_message["headers"])
+                headers["content-encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                body, pending = pending, b""
+                if not more_body:
+                    # Cuerpo completo: se comprime de una vez.
+                    compressed = compress_body(body, encoding)
+                    headers["content-length"] = str(len(compressed))
+                    compression_bytes_in.inc(len(body), {"encoding": encoding})
+                    compression_bytes_out.inc(len(compressed), {"encoding": encoding})
+                    await send(start_message)
+                    await send({**message, "body": compressed})
+                    return
+
+                # Respuesta en streaming: se comprime bloque a bloque.
+                del headers["content-length"]
+                compressor = _StreamCompressor(encoding)
+                await send(start_message)
+
+            chunk = compressor.compress(body)
+            if not more_body:
+                chunk += compressor.finish()
+            compression_bytes_in.inc(len(body), {"encoding": encoding})
+            compression_bytes_out.inc(len(chunk), {"encoding": encoding})
+            await send(
+                {"type": "http.response.body", "body": chunk, "more_body": more_body}
+            )
+
+        await self.app(scope, receive, send_wrapper)
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """
+    StaticFiles que, si el cliente lo acepta, sirve la variante precomprimida
+    ('archivo.br' o 'archivo.gz') que exista junto al archivo original.
+    """
+
+    async def get_response(self, path: str, scope):
+        for encoding, suffix in (("br", ".br"), ("gzip", ".gz")):
+            if encoding not in accepted_encodings(scope):
+                continue
+            full_path, stat_result = await anyio.to_thread.run_sync(
+                self.lookup_path, path + suffix
+            )
+            if not stat_result or not stat.S_ISREG(stat_result.st_mode):
+                continue
+
+            _, original_stat = await anyio.to_thread.run_sync(self.lookup_path, path)
+            if original_stat:
+                compression_bytes_in.inc(original_stat.st_size, {"encoding": encoding})
+                compression_bytes_out.inc(stat_result.st_size, {"encoding": encoding})
+
+            response = self.file_response(full_path, stat_result, scope)
+            response.headers["content-type"] = (
+                guess_type(path)[0] or "application/octet-stream"
+            )
+            response.headers["content-encoding"] = encoding
+            response.headers.add_vary_header("Accept-Encoding")
+            return response
+
+        return await super().get_response(path, scope)
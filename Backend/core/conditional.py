@@ -0,0 +1,79 @@
+# core/conditional.py
+import datetime
+import hashlib
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import Request, Response
+
+
+class NotModifiedException(Exception):
+    """
+    Se lanza cuando la copia del cliente sigue vigente. El manejador registrado
+    en app.py la convierte en una respuesta 304 sin cuerpo.
+    """
+
+    def __init__(self, headers: dict):
+        self.headers = headers
+        super().__init__("Not Modified")
+
+
+def _to_utc(value: datetime.datetime) -> datetime.datetime:
+    # Las fechas de la BD son 'naive' en hora local; astimezone las interpreta así.
+    return value.astimezone(datetime.timezone.utc).replace(microsecond=0)
+
+
+class ConditionalRequest:
+    """
+    Maneja ETag / Last-Modified para un recurso. La ruta calcula una clave de
+    versión barata (por ejemplo, el updated_at de la fila) y llama a check()
+    antes de cargar o serializar el cuerpo.
+    """
+
+    def __init__(self, request: Request, response: Response):
+        self.request = request
+        self.response = response
+        self.headers = {}
+
+    def check(
+        self,
+        version: str,
+        last_modified: datetime.datetime | None = None,
+        cache_control: str = "private, no-cache",
+    ):
+        """
+        Agrega ETag, Last-Modified y Cache-Control a la respuesta. Si el cliente
+        ya tiene esta versión, lanza NotModifiedException (304).
+        """
+        etag = f'W/"{hashlib.sha1(version.encode()).hexdigest()[:20]}"'
+        self.headers = {"ETag": etag, "Cache-Control": cache_control}
+        if last_modified is not None:
+            last_modified = _to_utc(last_modified)
+            self.headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+        self.response.headers.update(self.headers)
+
+        if_none_match = self.request.headers.get("if-none-match")
+        if if_none_match is not None:
+            # If-None-Match tiene prioridad sobre If-Modified-Since (RFC 9110).
+            candidates = {tag.strip() for tag in if_none_match.split(",")}
+            if "*" in candidates or etag in candidates or etag[2:] in candidates:
+                raise NotModifiedException(self.headers)
+            return
+
+        if_modified_since = self.request.headers.get("if-modified-since")
+        if if_modified_since and last_modified is not None:
+            try:
+                since = parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                return
+            if since.tzinfo is not None and last_modified <= since:
+                raise NotModifiedException(self.headers)
+
+    def apply(self, response: Response) -> Response:
+        """Copia las cabeceras de caché a una respuesta creada por la ruta."""
+        response.headers.update(self.headers)
+        return response
+
+
+def conditional_request(request: Request, response: Response) -> ConditionalRequest:
+    """Dependencia de FastAPI para rutas que soportan GET condicional."""
+    return ConditionalRequest(request, response)
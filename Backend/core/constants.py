@@ -10,8 +10,19 @@ USER_ROLE_CLIENT = "cliente"
 SUBSCRIPTION_STATUS_ACTIVE = "active"
 SUBSCRIPTION_STATUS_SUSPENDED = "suspended"
 
+# --- Ciclo de facturación ---
+# Último día de facturación posible: el 28 existe en todos los meses.
+MAX_BILLING_DAY = 28
+
 # --- Invoice Status ---
 # Estos estados también siguen siendo válidos.
 INVOICE_STATUS_PENDING = "pending"
 INVOICE_STATUS_PAID = "paid"
 INVOICE_STATUS_IN_REVIEW = "in_review"  # Es buena idea añadir este si no lo tenías
+
+# Comprobantes pendientes de revisión: el cliente los sube por dos rutas que
+# marcan la factura con valores distintos; la cola de revisión toma ambos.
+INVOICE_STATUS_IN_VERIFICATION = "En Verificacion"
+INVOICE_REVIEW_STATUSES = (INVOICE_STATUS_IN_VERIFICATION, INVOICE_STATUS_IN_REVIEW)
+# Facturas ya cobradas (el panel de admin usa "Pagado"; el pago del cliente, "paid").
+INVOICE_PAID_STATUSES = ("Pagado", INVOICE_STATUS_PAID)
@@ -0,0 +1,104 @@
+# core/db_notify.py
+import logging
+import select
+import threading
+from collections import defaultdict
+
+import psycopg2
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from config.db import DATABASE_URL
+
+logger = logging.getLogger(__name__)
+
+# Avisos entre workers usando LISTEN/NOTIFY de PostgreSQL.
+# Cada worker abre una conexión dedicada que escucha los canales suscritos y
+# ejecuta los callbacks registrados (típicamente, invalidar una caché local).
+
+_callbacks = defaultdict(list)
+_listener_thread = None
+_stop_event = threading.Event()
+
+
+def notify(db: Session, channel: str, payload: str = ""):
+    """
+    Encola un aviso en la transacción de 'db'. PostgreSQL solo lo entrega a los
+    demás procesos cuando la transacción hace commit (y lo descarta si hay
+    rollback), así nadie invalida su caché antes de que el cambio sea visible.
+    """
+    db.execute(
+        text("SELECT pg_notify(:channel, :payload)"),
+        {"channel": channel, "payload": payload},
+    )
+
+
+def subscribe(channel: str, callback):
+    """
+    Registra callback(payload) para un canal. Si la conexión de escucha se
+    pierde, al reconectar se llama callback(None): los avisos del intervalo
+    se perdieron y conviene invalidar todo.
+    """
+    _callbacks[channel].append(callback)
+
+
+def _dispatch(channel: str, payload: str | None):
+    for callback in _callbacks.get(channel, []):
+        try:
+            callback(payload)
+        except Exception as e:
+            logger.error(f"Error en callback del canal '{channel}': {e}", exc_info=True)
+
+
+def _listen_forever(poll_seconds: float = 5.0):
+    first_connection = True
+    while not _stop_event.is_set():
+        connection = None
+        try:
+            connection = psycopg2.connect(DATABASE_URL)
+            connection.set_isolation_level(
+                psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT
+            )
+            with connection.cursor() as cursor:
+                for channel in _callbacks:
+                    cursor.execute(f'LISTEN "{channel}"')
+            logger.info(f"Escuchando avisos en: {', '.join(_callbacks)}.")
+            if not first_connection:
+                for channel in _callbacks:
+                    _dispatch(channel, None)
+            first_connection = False
+
+            while not _stop_event.is_set():
+                ready, _, _ = select.select([connection], [], [], poll_seconds)
+                if not ready:
+                    continue
+                connection.poll()
+                while connection.notifies:
+                    message = connection.notifies.pop(0)
+                    _dispatch(message.channel, message.payload)
+        except Exception as e:
+            logger.warning(f"Conexión de avisos perdida, reintentando: {e}")
+            _stop_event.wait(poll_seconds)
+        finally:
+            if connection is not None:
+                connection.close()
+
+
+def start_listener():
+    """Inicia el hilo de escucha del worker actual (una sola vez)."""
+    global _listener_thread
+    if _listener_thread is not None or not _callbacks:
+        return
+    _stop_event.clear()
+    _listener_thread = threading.Thread(
+        target=_listen_forever, name="db-notify-listener", daemon=True
+    )
+    _listener_thread.start()
+
+
+def stop_listener():
+    global _listener_thread
+    _stop_event.set()
+    if _listener_thread is not None:
+        _listener_thread.join(timeout=10)
+        _listener_thread = None
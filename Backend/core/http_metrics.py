@@ -0,0 +1,53 @@
+# core/http_metrics.py
+import time
+
+from core.metrics import registry
+
+request_duration = registry.histogram(
+    "http_request_duration_seconds",
+    "Duración de las peticiones HTTP por plantilla de ruta.",
+)
+requests_in_flight = registry.gauge(
+    "http_requests_in_flight", "Peticiones HTTP en curso."
+)
+
+
+class HTTPMetricsMiddleware:
+    """
+    Middleware ASGI que mide la latencia de cada petición por método, plantilla
+    de ruta (/api/users/{user_id}, no la URL concreta) y código de estado.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        requests_in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            requests_in_flight.dec()
+            route = scope.get("route")
+            # Las rutas inexistentes se agrupan para no crear una serie por URL.
+            template = getattr(route, "path", None) or "<sin_ruta>"
+            request_duration.observe(
+                time.perf_counter() - started,
+                labels={
+                    "method": scope["method"],
+                    "route": template,
+                    "status": str(status_code),
+                },
+            )
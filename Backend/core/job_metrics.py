@@ -0,0 +1,51 @@
+# core/job_metrics.py
+import functools
+import time
+from contextvars import ContextVar
+
+from core.metrics import registry
+
+job_duration = registry.histogram(
+    "job_duration_seconds",
+    "Duración de las tareas de facturación y mantenimiento.",
+    buckets=(0.1, 0.5, 1.0, 5.0, 15.0, 30.0, 60.0, 300.0, 900.0),
+)
+job_runs = registry.counter(
+    "job_runs_total",
+    "Ejecuciones de tareas por resultado (ok, error o skipped si se omitió el turno).",
+)
+job_rows = registry.counter(
+    "job_rows_total", "Filas procesadas por las tareas, según el resultado."
+)
+
+# Filas contadas por la ejecución en curso, por resultado (ver job_runner).
+job_rows_var: ContextVar[dict | None] = ContextVar("job_rows", default=None)
+
+
+def track_job(job: str):
+    """Decorador que mide la duración y el resultado de una tarea sync."""
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            status = "error"
+            try:
+                result = func(*args, **kwargs)
+                status = "ok"
+                return result
+            finally:
+                job_duration.observe(time.perf_counter() - started, labels={"job": job})
+                job_runs.inc(labels={"job": job, "status": status})
+
+        return wrapper
+
+    return decorator
+
+
+def count_rows(job: str, result: str, amount: int):
+    counted = job_rows_var.get()
+    if counted is not None:
+        counted[result] = counted.get(result, 0) + amount
+    if amount:
+        job_rows.inc(amount, labels={"job": job, "result": result})
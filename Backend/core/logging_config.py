@@ -1,37 +1,128 @@
 # core/logging_config.py
+import atexit
+import copy
+import datetime
+import json
 import logging
+import os
+import queue
 import sys
-from logging.handlers import TimedRotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
+
+from core.request_context import get_request_elapsed_ms, get_request_id, get_route
 
 # Define el formato que tendrán las líneas de log.
 # Formato: [Fecha y Hora] [Nivel del Log] [Módulo que lo genera]: Mensaje
 LOG_FORMAT = "%(asctime)s - %(levelname)s - [%(name)s]: %(message)s"
 LOG_FILE = "logs/app.log"  # El archivo donde se guardarán los logs
+# LOG_JSON=true escribe una línea JSON por registro (para Loki, ELK, etc.).
+LOG_JSON = os.getenv("LOG_JSON", "false").lower() == "true"
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+
+# Atributos estándar de LogRecord; el resto son campos pasados con extra={...}.
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+_listener = None
+
+
+class RequestContextFilter(logging.Filter):
+    """Agrega el ID de la petición, la ruta y el tiempo transcurrido a cada registro."""
+
+    def filter(self, record):
+        record.request_id = get_request_id()
+        record.route = get_route()
+        record.elapsed_ms = get_request_elapsed_ms()
+        return True
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record):
+        data = {
+            "timestamp": datetime.datetime.fromtimestamp(record.created)
+            .astimezone()
+            .isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and value is not None:
+                data[key] = value
+        if record.exc_text:
+            data["exception"] = record.exc_text
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class _ContextQueueHandler(QueueHandler):
+    """
+    Encola los registros sin hacer E/S en el hilo que registra. El mensaje y el
+    traceback se resuelven aquí, porque los argumentos y el contexto de la
+    petición no existen en el hilo del QueueListener.
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
 
 
 def setup_logging():
     """
     Configura el sistema de logging para la aplicación.
-    Establece un manejador para la consola y otro para un archivo rotativo.
+    Los registros pasan por una cola y un hilo aparte los escribe en la consola
+    y en un archivo rotativo. Llamarla varias veces no duplica los manejadores.
     """
+    global _listener
     # Obtenemos el logger raíz. Todos los demás loggers heredarán de este.
     logger = logging.getLogger()
-    logger.setLevel(logging.INFO)  # Nivel mínimo de registro (INFO, WARNING, ERROR)
+    logger.setLevel(LOG_LEVEL)  # Nivel mínimo de registro (INFO, WARNING, ERROR)
+    if _listener is not None or any(
+        isinstance(handler, _ContextQueueHandler) for handler in logger.handlers
+    ):
+        return
 
     # Creamos el formateador con el formato que definimos
-    formatter = logging.Formatter(LOG_FORMAT)
+    formatter = JSONFormatter() if LOG_JSON else logging.Formatter(LOG_FORMAT)
 
     # 1. Manejador de Consola (para ver los logs en la terminal)
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
 
     # 2. Manejador de Archivo (para guardar los logs)
     # Rota cada día a medianoche y conserva los logs de los últimos 7 días.
+    os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)
     file_handler = TimedRotatingFileHandler(
         LOG_FILE, when="midnight", interval=1, backupCount=7, encoding="utf-8"
     )
     file_handler.setFormatter(formatter)
-    logger.addHandler(file_handler)
+
+    # 3. La cola: los loggers solo encolan; el listener escribe en su hilo.
+    log_queue = queue.SimpleQueue()
+    queue_handler = _ContextQueueHandler(log_queue)
+    queue_handler.addFilter(RequestContextFilter())
+    logger.addHandler(queue_handler)
+
+    _listener = QueueListener(
+        log_queue, console_handler, file_handler, respect_handler_level=True
+    )
+    _listener.start()
+    # Al salir se vacía la cola para no perder los últimos registros.
+    atexit.register(stop_logging)
 
     logging.info("El sistema de logging ha sido configurado.")
+
+
+def stop_logging():
+    """Detiene el listener después de escribir lo que quede en la cola."""
+    global _listener
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        if isinstance(handler, _ContextQueueHandler):
+            root.removeHandler(handler)
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
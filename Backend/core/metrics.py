@@ -0,0 +1,315 @@
+# core/metrics.py
+import json
+import logging
+import os
+import tempfile
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Registro de métricas en memoria del proceso.
+# Cada métrica guarda sus valores por combinación de etiquetas (labels).
+#
+# Con varios workers (uvicorn/gunicorn --workers N), cada proceso vuelca sus
+# valores en METRICS_MULTIPROC_DIR/metrics_<pid>.json cada pocos segundos y el
+# worker que atiende /metrics suma los archivos de todos. El directorio debe
+# vaciarse antes de arrancar el servidor (si no, se suman ejecuciones viejas).
+MULTIPROC_DIR = os.getenv("METRICS_MULTIPROC_DIR") or None
+FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, description: str):
+        self.name = name
+        self.description = description
+        self._lock = threading.Lock()
+        self._values = {}
+
+    @staticmethod
+    def _key(labels: dict | None) -> tuple:
+        return tuple(sorted((labels or {}).items()))
+
+    def samples(self) -> dict:
+        """Devuelve una copia de los valores actuales, indexados por etiquetas."""
+        with self._lock:
+            return dict(self._values)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, labels: dict | None = None):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, description: str, mode: str = "sum"):
+        # 'mode' indica cómo combinar los valores de varios workers: sum o max.
+        super().__init__(name, description)
+        self.mode = mode
+
+    def set(self, value: float, labels: dict | None = None):
+        with self._lock:
+            self._values[self._key(labels)] = float(value)
+
+    def inc(self, amount: float = 1.0, labels: dict | None = None):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, labels: dict | None = None):
+        self.inc(-amount, labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self, name: str, description: str, buckets: tuple | None = None):
+        super().__init__(name, description)
+        self.buckets = tuple(sorted(buckets or self.DEFAULT_BUCKETS))
+
+    def observe(self, value: float, labels: dict | None = None):
+        key = self._key(labels)
+        with self._lock:
+            data = self._values.get(key)
+            if data is None:
+                data = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+                self._values[key] = data
+            for i, upper in enumerate(self.buckets):
+                if value <= upper:
+                    data["buckets"][i] += 1
+            data["sum"] += value
+            data["count"] += 1
+
+    def samples(self) -> dict:
+        with self._lock:
+            return {
+                key: {
+                    "buckets": list(data["buckets"]),
+                    "sum": data["sum"],
+                    "count": data["count"],
+                }
+                for key, data in self._values.items()
+            }
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+        self._collectors = []
+
+    def _get_or_create(self, cls, name: str, description: str, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, description, **kwargs)
+                self._metrics[name] = metric
+            return metric
+
+    def counter(self, name: str, description: str) -> Counter:
+        return self._get_or_create(Counter, name, description)
+
+    def gauge(self, name: str, description: str, mode: str = "sum") -> Gauge:
+        return self._get_or_create(Gauge, name, description, mode=mode)
+
+    def histogram(
+        self, name: str, description: str, buckets: tuple | None = None
+    ) -> Histogram:
+        return self._get_or_create(Histogram, name, description, buckets=buckets)
+
+    def all(self) -> list:
+        with self._lock:
+            return list(self._metrics.values())
+
+    def add_collector(self, callback):
+        """Registra una función que actualiza gauges justo antes de exportar."""
+        self._collectors.append(callback)
+
+    def snapshot(self) -> dict:
+        """Valores actuales del proceso en un formato serializable a JSON."""
+        for callback in list(self._collectors):
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Error en un colector de métricas: {e}")
+        data = {}
+        for metric in self.all():
+            entry = {
+                "kind": metric.kind,
+                "description": metric.description,
+                "samples": [
+                    [list(key), value] for key, value in metric.samples().items()
+                ],
+            }
+            if isinstance(metric, Histogram):
+                entry["buckets"] = list(metric.buckets)
+            if isinstance(metric, Gauge):
+                entry["mode"] = metric.mode
+            data[metric.name] = entry
+        return data
+
+
+# Registro global que usan todos los módulos de la aplicación.
+registry = MetricsRegistry()
+
+
+# --- Soporte para varios workers ---
+
+
+def _snapshot_path(pid: int) -> str:
+    return os.path.join(MULTIPROC_DIR, f"metrics_{pid}.json")
+
+
+def write_snapshot():
+    """Vuelca las métricas de este proceso de forma atómica (temporal + rename)."""
+    if not MULTIPROC_DIR:
+        return
+    os.makedirs(MULTIPROC_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=MULTIPROC_DIR, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(registry.snapshot(), f)
+        os.replace(tmp_path, _snapshot_path(os.getpid()))
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _merge(total: dict, snapshot: dict, alive: bool):
+    for name, entry in snapshot.items():
+        # Los gauges de un worker que ya terminó no describen nada actual.
+        if entry["kind"] == "gauge" and not alive:
+            continue
+        target = total.setdefault(name, {**entry, "samples": {}})
+        samples = target["samples"]
+        for labels, value in entry["samples"]:
+            key = tuple(tuple(item) for item in labels)
+            current = samples.get(key)
+            if current is None:
+                samples[key] = value
+            elif entry["kind"] == "histogram":
+                samples[key] = {
+                    "buckets": [
+                        a + b for a, b in zip(current["buckets"], value["buckets"])
+                    ],
+                    "sum": current["sum"] + value["sum"],
+                    "count": current["count"] + value["count"],
+                }
+            elif entry["kind"] == "gauge" and entry.get("mode") == "max":
+                samples[key] = max(current, value)
+            else:
+                samples[key] = current + value
+
+
+def collect() -> dict:
+    """
+    Devuelve las métricas a exportar: las de este proceso o, si hay directorio
+    multiproceso, la suma de todos los workers.
+    """
+    if not MULTIPROC_DIR:
+        total = {}
+        _merge(total, registry.snapshot(), alive=True)
+        return total
+
+    write_snapshot()
+    total = {}
+    for filename in sorted(os.listdir(MULTIPROC_DIR)):
+        if not (filename.startswith("metrics_") and filename.endswith(".json")):
+            continue
+        try:
+            pid = int(filename[len("metrics_") : -len(".json")])
+            with open(os.path.join(MULTIPROC_DIR, filename)) as f:
+                snapshot = json.load(f)
+        except (ValueError, OSError) as e:
+            logger.warning(f"Archivo de métricas ilegible '{filename}': {e}")
+            continue
+        _merge(total, snapshot, alive=_pid_alive(pid))
+    return total
+
+
+def _format_labels(labels) -> str:
+    if not labels:
+        return ""
+    parts = []
+    for key, value in labels:
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n")
+        value = value.replace('"', '\\"')
+        parts.append(f'{key}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def render_prometheus(metrics: dict) -> str:
+    """Formato de texto de Prometheus (versión 0.0.4)."""
+    lines = []
+    for name in sorted(metrics):
+        entry = metrics[name]
+        lines.append(f"# HELP {name} {entry['description']}")
+        lines.append(f"# TYPE {name} {entry['kind']}")
+        for labels, value in sorted(entry["samples"].items()):
+            if entry["kind"] == "histogram":
+                for upper, count in zip(entry["buckets"], value["buckets"]):
+                    bucket_labels = _format_labels(
+                        labels + (("le", repr(float(upper))),)
+                    )
+                    lines.append(f"{name}_bucket{bucket_labels} {count}")
+                inf_labels = _format_labels(labels + (("le", "+Inf"),))
+                lines.append(f"{name}_bucket{inf_labels} {value['count']}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {value['sum']}")
+                lines.append(f"{name}_count{_format_labels(labels)} {value['count']}")
+            else:
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+_flush_thread = None
+_flush_stop = threading.Event()
+
+
+def _flush_forever():
+    while not _flush_stop.wait(FLUSH_SECONDS):
+        try:
+            write_snapshot()
+        except Exception as e:
+            logger.warning(f"No se pudieron volcar las métricas: {e}")
+
+
+def start_flusher():
+    """Inicia el volcado periódico de métricas (solo con METRICS_MULTIPROC_DIR)."""
+    global _flush_thread
+    if not MULTIPROC_DIR or _flush_thread is not None:
+        return
+    _flush_stop.clear()
+    _flush_thread = threading.Thread(
+        target=_flush_forever, name="metrics-flusher", daemon=True
+    )
+    _flush_thread.start()
+
+
+def stop_flusher():
+    """Detiene el volcado y deja escrito el último estado del proceso."""
+    global _flush_thread
+    _flush_stop.set()
+    if _flush_thread is not None:
+        _flush_thread.join(timeout=5)
+        _flush_thread = None
+    if MULTIPROC_DIR:
+        write_snapshot()
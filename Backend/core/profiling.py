@@ -0,0 +1,216 @@
+# core/profiling.py
+import cProfile
+import datetime
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+from auth.security import Security
+
+logger = logging.getLogger(__name__)
+
+# Perfilado bajo demanda. Con PROFILING_ENABLED=false el middleware ni siquiera
+# se registra (ver app.py), así que no tiene ningún costo.
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+# Fracción de peticiones que se perfilan sin que nadie lo pida (0 = ninguna).
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+# sampler: muestreo de pilas de todos los hilos -> archivo .collapsed (flamegraph).
+# cprofile: cProfile del hilo del event loop -> archivo .prof (snakeviz, pstats).
+PROFILING_MODE = os.getenv("PROFILING_MODE", "sampler").lower()
+PROFILING_INTERVAL_MS = float(os.getenv("PROFILING_INTERVAL_MS", "5"))
+PROFILES_DIR = os.getenv("PROFILES_DIR", "logs/profiles")
+PROFILING_MAX_FILES = int(os.getenv("PROFILING_MAX_FILES", "200"))
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_FILENAME = re.compile(r"^[\w.-]+\.(prof|collapsed)$")
+
+# Funciones en las que un hilo está esperando, no trabajando.
+_IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+    ("selectors.py", "poll"),
+}
+# Hilos de fondo de la propia aplicación, que no atienden peticiones.
+_BACKGROUND_THREADS = {"db-notify-listener", "metrics-flusher", "slow-query-explain"}
+# Un solo perfil a la vez por worker: dos cProfile activos se pisan entre sí.
+_profiling_lock = threading.Lock()
+
+
+class StackSampler:
+    """
+    Perfilador por muestreo: cada PROFILING_INTERVAL_MS toma la pila de todos
+    los hilos activos. Así se ven también las rutas sync, que FastAPI ejecuta
+    en hilos del threadpool y que cProfile (por hilo) no alcanza. Si otras
+    peticiones corren a la vez en el worker, sus pilas también aparecen.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="profiling-sampler", daemon=True
+        )
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                code = frame.f_code
+                if (os.path.basename(code.co_filename), code.co_name) in _IDLE_FRAMES:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(
+                        f"{code.co_name} ({os.path.basename(code.co_filename)}"
+                        f":{code.co_firstlineno})"
+                    )
+                    frame = frame.f_back
+                if thread_id not in names:
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                thread_name = names.get(thread_id, str(thread_id))
+                if thread_name in _BACKGROUND_THREADS:
+                    continue
+                stack.append(thread_name)
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def write(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+def _prune_profiles():
+    files = sorted(
+        (entry for entry in os.scandir(PROFILES_DIR) if entry.is_file()),
+        key=lambda entry: entry.stat().st_mtime,
+    )
+    for entry in files[: max(len(files) - PROFILING_MAX_FILES, 0)]:
+        os.remove(entry.path)
+
+
+def list_profiles() -> list:
+    """Perfiles guardados, del más reciente al más antiguo."""
+    if not os.path.isdir(PROFILES_DIR):
+        return []
+    profiles = []
+    for entry in os.scandir(PROFILES_DIR):
+        if entry.is_file() and PROFILE_FILENAME.match(entry.name):
+            stat = entry.stat()
+            profiles.append(
+                {
+                    "name": entry.name,
+                    "size_bytes": stat.st_size,
+                    "created_at": datetime.datetime.fromtimestamp(stat.st_mtime),
+                }
+            )
+    return sorted(profiles, key=lambda p: p["created_at"], reverse=True)
+
+
+def profile_path(name: str) -> str | None:
+    """Ruta segura de un perfil por nombre, o None si no es válido o no existe."""
+    if not PROFILE_FILENAME.match(name):
+        return None
+    path = os.path.join(PROFILES_DIR, name)
+    return path if os.path.isfile(path) else None
+
+
+def _is_admin(authorization: str | None) -> bool:
+    if not authorization:
+        return False
+    token_data = Security.verify_token({"authorization": authorization})
+    return token_data.get("success") and token_data.get("role") == "administrador"
+
+
+class ProfilingMiddleware:
+    """
+    Perfila la petición si un administrador envía 'X-Profile: 1' o si le toca
+    por PROFILING_SAMPLE_RATE. El nombre del archivo generado se devuelve en la
+    cabecera X-Profile-File.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        os.makedirs(PROFILES_DIR, exist_ok=True)
+
+    def _should_profile(self, scope) -> bool:
+        headers = dict(scope.get("headers", []))
+        if headers.get(PROFILE_HEADER, b"").lower() in (b"1", b"true"):
+            authorization = headers.get(b"authorization")
+            if _is_admin(authorization.decode("latin-1") if authorization else None):
+                return True
+        return PROFILING_SAMPLE_RATE > 0 and random.random() < PROFILING_SAMPLE_RATE
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+        if not _profiling_lock.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+        try:
+            await self._profile(scope, receive, send)
+        finally:
+            _profiling_lock.release()
+
+    async def _profile(self, scope, receive, send):
+
+        extension = "prof" if PROFILING_MODE == "cprofile" else "collapsed"
+        slug = re.sub(r"[^\w]+", "_", scope["path"]).strip("_")[:60] or "root"
+        filename = (
+            f"{datetime.datetime.now():%Y%m%d_%H%M%S_%f}_{scope['method']}_{slug}"
+            f".{extension}"
+        )
+
+        async def send_with_name(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-profile-file", filename.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        if PROFILING_MODE == "cprofile":
+            profiler = cProfile.Profile()
+            profiler.enable()
+        else:
+            profiler = StackSampler(PROFILING_INTERVAL_MS / 1000)
+            profiler.start()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_name)
+        finally:
+            if PROFILING_MODE == "cprofile":
+                profiler.disable()
+            else:
+                profiler.stop()
+            path = os.path.join(PROFILES_DIR, filename)
+            try:
+                if PROFILING_MODE == "cprofile":
+                    profiler.dump_stats(path)
+                else:
+                    profiler.write(path)
+                _prune_profiles()
+                logger.info(
+                    f"Perfil de {scope['method']} {scope['path']} guardado en '{path}' "
+                    f"({(time.perf_counter() - started) * 1000:.1f} ms)."
+                )
+            except OSError as e:
+                logger.error(f"No se pudo guardar el perfil '{path}': {e}")
@@ -0,0 +1,157 @@
+# core/query_stats.py
+import logging
+import os
+import time
+
+from sqlalchemy import event
+
+from core import slow_queries
+from core.request_context import (
+    QueryStats,
+    new_request_id,
+    query_stats_var,
+    request_id_var,
+    request_scope_var,
+    request_started_var,
+)
+
+logger = logging.getLogger(__name__)
+
+# Peticiones con más sentencias o más tiempo de BD que esto se registran.
+SLOW_REQUEST_QUERY_COUNT = int(os.getenv("SLOW_REQUEST_QUERY_COUNT", "20"))
+SLOW_REQUEST_DB_MS = float(os.getenv("SLOW_REQUEST_DB_MS", "500"))
+# Veces que una misma sentencia debe repetirse para sospechar de un N+1.
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "5"))
+# Registra una línea por petición terminada, con estado y duración.
+LOG_REQUESTS = os.getenv("LOG_REQUESTS", "true").lower() == "true"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+    stats = query_stats_var.get()
+    if stats is not None:
+        stats.record(statement, parameters, elapsed, max_params=N_PLUS_ONE_THRESHOLD)
+    if elapsed >= slow_queries.SLOW_QUERY_SECONDS:
+        slow_queries.record(conn.engine, statement, parameters, elapsed, executemany)
+
+
+def _handle_error(exception_context):
+    # Si la sentencia falla no hay after_cursor_execute: se descarta su inicio.
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("query_start_time"):
+        connection.info["query_start_time"].pop()
+
+
+def instrument_engine(engine, explain_engine=None):
+    """
+    Registra los eventos de conteo y de consultas lentas en un Engine sync (o en
+    async_engine.sync_engine). 'explain_engine' es el Engine sync donde correr
+    los EXPLAIN de sus consultas lentas; por defecto, el mismo.
+    """
+    if engine is None or event.contains(
+        engine, "before_cursor_execute", _before_cursor_execute
+    ):
+        return
+    slow_queries.register_explain_engine(engine, explain_engine or engine)
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+def _route_template(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or scope.get("path", "")
+
+
+class QueryStatsMiddleware:
+    """
+    Middleware ASGI que asigna un X-Request-ID, cuenta las sentencias SQL de
+    la petición y agrega la cabecera Server-Timing. Registra las peticiones
+    lentas y las sentencias repetidas que sugieren un N+1.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        incoming = None
+        for name, value in scope.get("headers", []):
+            if name == b"x-request-id":
+                incoming = value.decode("latin-1")
+                break
+        request_id = new_request_id(incoming)
+        stats = QueryStats()
+        request_token = request_id_var.set(request_id)
+        stats_token = query_stats_var.set(stats)
+        scope_token = request_scope_var.set(scope)
+        started = time.perf_counter()
+        started_token = request_started_var.set(started)
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                app_ms = (time.perf_counter() - started) * 1000
+                db_ms = stats.total_time * 1000
+                timing = (
+                    f'db;dur={db_ms:.1f};desc="{stats.count} queries", '
+                    f"app;dur={app_ms:.1f}"
+                )
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timing.encode("latin-1")))
+                headers.append((b"x-request-id", request_id.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            self._report(
+                scope["method"],
+                _route_template(scope),
+                request_id,
+                stats,
+                started,
+                status_code,
+            )
+            request_id_var.reset(request_token)
+            query_stats_var.reset(stats_token)
+            request_scope_var.reset(scope_token)
+            request_started_var.reset(started_token)
+
+    @staticmethod
+    def _report(method, route, request_id, stats, started, status_code):
+        db_ms = stats.total_time * 1000
+        if LOG_REQUESTS:
+            duration_ms = (time.perf_counter() - started) * 1000
+            logger.info(
+                f"{method} {route} -> {status_code} en {duration_ms:.1f} ms "
+                f"({stats.count} sentencias, {db_ms:.1f} ms en BD)",
+                extra={
+                    "status": status_code,
+                    "duration_ms": round(duration_ms, 1),
+                    "db_queries": stats.count,
+                    "db_ms": round(db_ms, 1),
+                },
+            )
+        if stats.count >= SLOW_REQUEST_QUERY_COUNT or db_ms >= SLOW_REQUEST_DB_MS:
+            total_ms = (time.perf_counter() - started) * 1000
+            logger.warning(
+                f"Petición pesada {method} {route} [{request_id}]: "
+                f"{stats.count} sentencias, {db_ms:.1f} ms en BD, {total_ms:.1f} ms total."
+            )
+        for statement, times in stats.repeated_statements(N_PLUS_ONE_THRESHOLD):
+            compact = " ".join(statement.split())
+            logger.warning(
+                f"Posible N+1 en {method} {route} [{request_id}]: sentencia repetida "
+                f"{times} veces con distintos parámetros: {compact[:300]}"
+            )
@@ -0,0 +1,87 @@
+# core/request_context.py
+import time
+import uuid
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+# Estado ligado a la petición HTTP en curso. Los ContextVar se copian a los
+# hilos del threadpool donde corren las rutas sync, y como QueryStats es
+# mutable, lo que se registre ahí se ve desde el middleware.
+
+request_id_var: ContextVar[str | None] = ContextVar("request_id", default=None)
+query_stats_var: ContextVar["QueryStats | None"] = ContextVar(
+    "query_stats", default=None
+)
+# El scope ASGI de la petición; el router de Starlette le agrega "route" al
+# resolverla, así que sirve para conocer la plantilla de ruta desde cualquier capa.
+request_scope_var: ContextVar[dict | None] = ContextVar("request_scope", default=None)
+# time.perf_counter() al comenzar la petición.
+request_started_var: ContextVar[float | None] = ContextVar(
+    "request_started", default=None
+)
+
+
+@dataclass
+class QueryStats:
+    """Sentencias SQL ejecutadas durante una petición."""
+
+    count: int = 0
+    total_time: float = 0.0
+    # sentencia -> [veces ejecutada, hashes de los distintos parámetros]
+    statements: dict = field(default_factory=dict)
+
+    def record(self, statement: str, parameters, elapsed: float, max_params: int):
+        self.count += 1
+        self.total_time += elapsed
+        entry = self.statements.get(statement)
+        if entry is None:
+            entry = [0, set()]
+            self.statements[statement] = entry
+        entry[0] += 1
+        if len(entry[1]) < max_params:
+            try:
+                entry[1].add(hash(repr(parameters)))
+            except Exception:
+                pass
+
+    def repeated_statements(self, threshold: int) -> list:
+        """
+        Sentencias ejecutadas al menos 'threshold' veces con parámetros
+        distintos: el patrón típico de una carga perezosa dentro de un bucle.
+        """
+        return [
+            (statement, times)
+            for statement, (times, params) in self.statements.items()
+            if times >= threshold and len(params) > 1
+        ]
+
+
+def new_request_id(incoming: str | None = None) -> str:
+    """Reutiliza el X-Request-ID del proxy si es razonable; si no, genera uno."""
+    if incoming and len(incoming) <= 128 and incoming.isprintable():
+        return incoming
+    return uuid.uuid4().hex
+
+
+def get_request_id() -> str | None:
+    return request_id_var.get()
+
+
+def get_query_stats() -> QueryStats | None:
+    return query_stats_var.get()
+
+
+def get_request_elapsed_ms() -> float | None:
+    started = request_started_var.get()
+    if started is None:
+        return None
+    return round((time.perf_counter() - started) * 1000, 1)
+
+
+def get_route() -> str | None:
+    """Método y plantilla de ruta de la petición en curso, p. ej. 'GET /api/users/me'."""
+    scope = request_scope_var.get()
+    if scope is None:
+        return None
+    route = scope.get("route")
+    return f"{scope.get('method')} {getattr(route, 'path', None) or scope.get('path')}"
@@ -0,0 +1,66 @@
+# core/responses.py
+import math
+import os
+from functools import lru_cache
+
+from fastapi.responses import JSONResponse, ORJSONResponse, Response
+from pydantic import BaseModel, TypeAdapter
+
+from schemas.common_schemas import PaginatedResponse
+
+# --- Modo de respuestas rápidas (opcional) ---
+# Con FAST_JSON_RESPONSES=true:
+#  - la app usa ORJSONResponse como clase de respuesta por defecto;
+#  - los listados que arman sus propios schemas los crean sin validar
+#    (model_construct) y se serializan una sola vez con TypeAdapter.dump_json,
+#    sin la segunda validación de response_model.
+FAST_JSON_RESPONSES = os.getenv("FAST_JSON_RESPONSES", "false").lower() == "true"
+
+default_response_class = ORJSONResponse if FAST_JSON_RESPONSES else JSONResponse
+
+
+class PreRenderedJSONResponse(Response):
+    """Respuesta cuyo cuerpo ya viene serializado como JSON (bytes)."""
+
+    media_type = "application/json"
+
+
+@lru_cache(maxsize=None)
+def _paginated_adapter(item_schema: type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(PaginatedResponse[item_schema])
+
+
+def build_item(schema: type[BaseModel], **data) -> BaseModel:
+    """
+    Crea un item de respuesta a partir de datos que ya vienen tipados de la BD.
+    En modo rápido se omite la validación, porque los datos son de confianza.
+    """
+    if FAST_JSON_RESPONSES:
+        return schema.model_construct(**data)
+    return schema(**data)
+
+
+def paginated_response(
+    item_schema: type[BaseModel], items: list, total_items: int, page: int, size: int
+):
+    """
+    Arma la respuesta paginada estándar. En modo normal devuelve el modelo y
+    FastAPI lo procesa con response_model; en modo rápido devuelve los bytes
+    ya serializados en una sola pasada.
+    """
+    total_pages = math.ceil(total_items / size)
+    if not FAST_JSON_RESPONSES:
+        return PaginatedResponse(
+            total_items=total_items,
+            total_pages=total_pages,
+            current_page=page,
+            items=items,
+        )
+
+    payload = PaginatedResponse[item_schema].model_construct(
+        total_items=total_items,
+        total_pages=total_pages,
+        current_page=page,
+        items=items,
+    )
+    return PreRenderedJSONResponse(_paginated_adapter(item_schema).dump_json(payload))
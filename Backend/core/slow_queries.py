@@ -0,0 +1,207 @@
+# core/slow_queries.py
+import datetime
+import logging
+import math
+import os
+import queue
+import random
+import re
+import threading
+import time
+from logging.handlers import RotatingFileHandler
+
+from sqlalchemy import text
+
+from core.metrics import registry
+from core.request_context import get_request_id, get_route
+
+logger = logging.getLogger(__name__)
+
+# Sentencias más lentas que esto se registran en el log de la aplicación.
+# 0 o un valor negativo desactiva el registro.
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+SLOW_QUERY_SECONDS = SLOW_QUERY_MS / 1000 if SLOW_QUERY_MS > 0 else math.inf
+
+# Modo muestreo: de las sentencias SELECT que superan SLOW_QUERY_EXPLAIN_MS, una
+# fracción SLOW_QUERY_EXPLAIN_SAMPLE_RATE se vuelve a ejecutar en segundo plano
+# con EXPLAIN (ANALYZE, BUFFERS) y el plan se guarda en SLOW_QUERY_LOG_FILE.
+SLOW_QUERY_EXPLAIN_MS = float(os.getenv("SLOW_QUERY_EXPLAIN_MS", "1000"))
+SLOW_QUERY_EXPLAIN_SAMPLE_RATE = float(os.getenv("SLOW_QUERY_EXPLAIN_SAMPLE_RATE", "0"))
+SLOW_QUERY_LOG_FILE = os.getenv("SLOW_QUERY_LOG_FILE", "logs/slow_queries.log")
+# Una misma sentencia no se vuelve a analizar antes de este intervalo.
+EXPLAIN_COOLDOWN_SECONDS = 600
+EXPLAIN_TIMEOUT_MS = 30000
+
+# Nombres de parámetros cuyo valor nunca se escribe en los logs.
+SENSITIVE_PARAM = re.compile(
+    r"pass|token|secret|email|dni|cuit|phone|address|name|barrio|city", re.I
+)
+
+slow_query_count = registry.counter(
+    "db_slow_queries_total", "Sentencias SQL que superaron SLOW_QUERY_MS."
+)
+
+_explain_engines = {}
+_explain_queue = queue.Queue(maxsize=100)
+_explain_thread = None
+_explain_lock = threading.Lock()
+_last_explained = {}
+_explain_logger = None
+
+
+def register_explain_engine(engine, explain_engine):
+    """Asocia un Engine instrumentado con el Engine sync usado para EXPLAIN."""
+    _explain_engines[engine] = explain_engine
+
+
+def _redact_value(value):
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    if isinstance(value, str):
+        return f"<str:{len(value)}>"
+    return f"<{type(value).__name__}>"
+
+
+def redact_parameters(parameters):
+    """
+    Copia de los parámetros apta para logs: números, fechas y nulos se
+    conservan, los textos se reemplazan por su longitud y los parámetros con
+    nombre sensible (email, dni, password...) se ocultan por completo.
+    """
+    if isinstance(parameters, dict):
+        return {
+            key: "***" if SENSITIVE_PARAM.search(str(key)) else _redact_value(value)
+            for key, value in parameters.items()
+        }
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (dict, list, tuple)):
+            # executemany: basta con el primer juego de parámetros.
+            return [redact_parameters(parameters[0]), f"... ({len(parameters)} filas)"]
+        return [_redact_value(value) for value in parameters]
+    return _redact_value(parameters)
+
+
+def record(engine, statement, parameters, elapsed: float, executemany: bool):
+    """Registra una sentencia lenta y, si toca según el muestreo, encola su EXPLAIN."""
+    compact = " ".join(statement.split())
+    if compact[:7].upper() in ("EXPLAIN", "SET TRA", "SET LOC"):
+        # Sentencias del propio análisis en segundo plano.
+        return
+    slow_query_count.inc()
+    logger.warning(
+        f"Consulta lenta ({elapsed * 1000:.1f} ms) en {get_route() or 'sin petición'} "
+        f"[{get_request_id() or '-'}]: {compact[:1000]} | "
+        f"parámetros: {redact_parameters(parameters)}"
+    )
+
+    if (
+        SLOW_QUERY_EXPLAIN_SAMPLE_RATE <= 0
+        or executemany
+        or elapsed * 1000 < SLOW_QUERY_EXPLAIN_MS
+        or not compact[:6].upper() == "SELECT"
+        or random.random() >= SLOW_QUERY_EXPLAIN_SAMPLE_RATE
+    ):
+        return
+    now = time.monotonic()
+    with _explain_lock:
+        if now - _last_explained.get(compact, -math.inf) < EXPLAIN_COOLDOWN_SECONDS:
+            return
+        if len(_last_explained) > 1000:
+            _last_explained.clear()
+        _last_explained[compact] = now
+    try:
+        _explain_queue.put_nowait(
+            (
+                _explain_engines.get(engine, engine),
+                statement,
+                parameters,
+                elapsed,
+                get_route(),
+                get_request_id(),
+            )
+        )
+    except queue.Full:
+        return
+    _start_explain_worker()
+
+
+def _to_pyformat(statement: str, parameters):
+    """
+    Adapta una sentencia de asyncpg ($1, $2...) al formato de psycopg2 (%s)
+    para poder analizarla con el Engine sync.
+    """
+    if isinstance(parameters, dict) or "$1" not in statement:
+        return statement, parameters
+    ordered = []
+    escaped = statement.replace("%", "%%")
+
+    def replace(match):
+        ordered.append(parameters[int(match.group(1)) - 1])
+        return "%s"
+
+    return re.sub(r"\$(\d+)", replace, escaped), tuple(ordered)
+
+
+def _get_explain_logger():
+    global _explain_logger
+    if _explain_logger is None:
+        os.makedirs(os.path.dirname(SLOW_QUERY_LOG_FILE) or ".", exist_ok=True)
+        handler = RotatingFileHandler(
+            SLOW_QUERY_LOG_FILE,
+            maxBytes=10 * 1024 * 1024,
+            backupCount=5,
+            encoding="utf-8",
+        )
+        handler.setFormatter(logging.Formatter("%(asctime)s\n%(message)s\n"))
+        explain_logger = logging.getLogger("slow_queries.explain")
+        explain_logger.setLevel(logging.INFO)
+        explain_logger.addHandler(handler)
+        # El plan completo va solo al archivo propio, no al log general.
+        explain_logger.propagate = False
+        _explain_logger = explain_logger
+    return _explain_logger
+
+
+def _explain(engine, statement, parameters):
+    statement, parameters = _to_pyformat(statement, parameters)
+    with engine.connect() as connection:
+        # Transacción de solo lectura con timeout propio: ANALYZE ejecuta la
+        # consulta de verdad y no debe poder modificar nada ni colgarse.
+        connection.execute(text("SET TRANSACTION READ ONLY"))
+        connection.execute(text(f"SET LOCAL statement_timeout = {EXPLAIN_TIMEOUT_MS}"))
+        result = connection.exec_driver_sql(
+            "EXPLAIN (ANALYZE, BUFFERS) " + statement, parameters
+        )
+        plan = "\n".join(row[0] for row in result)
+        connection.rollback()
+    return plan
+
+
+def _explain_forever():
+    while True:
+        engine, statement, parameters, elapsed, route, request_id = _explain_queue.get()
+        try:
+            plan = _explain(engine, statement, parameters)
+            _get_explain_logger().info(
+                f"Ruta: {route or 'sin petición'} [{request_id or '-'}]\n"
+                f"Duración original: {elapsed * 1000:.1f} ms\n"
+                f"Parámetros: {redact_parameters(parameters)}\n"
+                f"Sentencia: {' '.join(statement.split())}\n"
+                f"{plan}"
+            )
+        except Exception as e:
+            logger.warning(f"No se pudo obtener el EXPLAIN de una consulta lenta: {e}")
+        finally:
+            _explain_queue.task_done()
+
+
+def _start_explain_worker():
+    global _explain_thread
+    with _explain_lock:
+        if _explain_thread is None:
+            _explain_thread = threading.Thread(
+                target=_explain_forever, name="slow-query-explain", daemon=True
+            )
+            _explain_thread.start()
@@ -1,6 +1,19 @@
 # models/models.py
 from config.db import Base
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Float, Boolean
+from sqlalchemy import (
+    Column,
+    Integer,
+    String,
+    ForeignKey,
+    DateTime,
+    Float,
+    Boolean,
+    JSON,
+    UniqueConstraint,
+    Date,
+    BigInteger,
+    Index,
+)
 from sqlalchemy.orm import relationship
 import datetime
 from datetime import date
@@ -12,6 +25,8 @@ from pydantic import (
 from core.constants import (
     SUBSCRIPTION_STATUS_ACTIVE,
     INVOICE_STATUS_PENDING,
+    INVOICE_REVIEW_STATUSES,
+    MAX_BILLING_DAY,
 )
 
 # --- Modelos de la Base de Datos (SQLAlchemy) ---
@@ -25,6 +40,9 @@ class User(Base):
     email = Column("email", String(80), unique=True, nullable=True)
     id_userdetail = Column(Integer, ForeignKey("userdetails.id"))
     refresh_token = Column("refresh_token", String, nullable=True)
+    updated_at = Column(
+        DateTime, default=datetime.datetime.now, onupdate=datetime.datetime.now
+    )
     userdetail = relationship(
         "UserDetail",
         uselist=False,
@@ -60,6 +78,9 @@ class UserDetail(Base):
     city = Column("city", String, nullable=True)
     phone = Column("phone", String, nullable=True)
     phone2 = Column("phone2", String, nullable=True)
+    updated_at = Column(
+        DateTime, default=datetime.datetime.now, onupdate=datetime.datetime.now
+    )
     user = relationship("User", back_populates="userdetail")
 
     def __init__(
@@ -91,6 +112,9 @@ class InternetPlan(Base):
     name = Column(String(100), nullable=False)
     speed_mbps = Column(Integer)
     price = Column(Float)
+    updated_at = Column(
+        DateTime, default=datetime.datetime.now, onupdate=datetime.datetime.now
+    )
     subscriptions = relationship("Subscription", back_populates="plan")
 
     def __init__(self, name, speed_mbps, price):
@@ -123,12 +147,17 @@ class Subscription(Base):
     plan_id = Column(Integer, ForeignKey("internet_plans.id"))
     subscription_date = Column(DateTime, default=datetime.datetime.now)
     status = Column(String, default=SUBSCRIPTION_STATUS_ACTIVE)
+    # Día del mes en que se factura (1-28, existe en todos los meses). Repartir
+    # los clientes entre los días evita generar todas las facturas el día 1.
+    billing_day = Column(Integer, nullable=False, default=1)
     user = relationship("User", back_populates="subscriptions")
     plan = relationship("InternetPlan", back_populates="subscriptions")
 
-    def __init__(self, user_id, plan_id):
+    def __init__(self, user_id, plan_id, billing_day=None):
         self.user_id = user_id
         self.plan_id = plan_id
+        # Por defecto, el aniversario de la suscripción.
+        self.billing_day = billing_day or min(date.today().day, MAX_BILLING_DAY)
 
 
 class CompanySettings(Base):
@@ -155,6 +184,20 @@ class CompanySettings(Base):
 
 class Invoice(Base):
     __tablename__ = "invoices"
+    # Una factura por suscripción y ciclo de facturación.
+    __table_args__ = (
+        UniqueConstraint(
+            "subscription_id", "billing_period", name="uq_invoices_subscription_period"
+        ),
+        # Índice parcial para la cola de revisión de comprobantes: solo contiene
+        # las pocas facturas en verificación, ordenadas por llegada.
+        Index(
+            "ix_invoices_review_queue",
+            "updated_at",
+            "id",
+            postgresql_where=Column("status").in_(INVOICE_REVIEW_STATUSES),
+        ),
+    )
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     subscription_id = Column(Integer, ForeignKey("subscriptions.id"), nullable=False)
@@ -166,16 +209,94 @@ class Invoice(Base):
     status = Column(String, default=INVOICE_STATUS_PENDING)
     receipt_pdf_url = Column(String, nullable=True)
     user_receipt_url = Column(String, nullable=True)
+    # Mes del ciclo facturado (siempre el día 1 de ese mes).
+    billing_period = Column(Date, nullable=True)
+    updated_at = Column(
+        DateTime, default=datetime.datetime.now, onupdate=datetime.datetime.now
+    )
     user = relationship("User", back_populates="invoices")
     subscription = relationship("Subscription")
     payments = relationship("Payment", back_populates="invoice")
 
-    def __init__(self, user_id, subscription_id, due_date, base_amount, total_amount):
+    def __init__(
+        self,
+        user_id,
+        subscription_id,
+        due_date,
+        base_amount,
+        total_amount,
+        billing_period=None,
+    ):
         self.user_id = user_id
         self.subscription_id = subscription_id
         self.due_date = due_date
         self.base_amount = base_amount
         self.total_amount = total_amount
+        self.billing_period = billing_period
+
+
+class Blob(Base):
+    """Contenido único de un archivo, identificado por su SHA-256 (ver services/blob_store.py)."""
+
+    __tablename__ = "blobs"
+    sha256 = Column(String(64), primary_key=True)
+    size = Column(BigInteger, nullable=False)
+    content_type = Column(String(100), nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.datetime.now)
+
+
+class Attachment(Base):
+    """Archivo asociado a una factura (comprobante o PDF) y el blob con su contenido."""
+
+    __tablename__ = "attachments"
+    id = Column(Integer, primary_key=True)
+    blob_sha256 = Column(
+        String(64), ForeignKey("blobs.sha256"), nullable=False, index=True
+    )
+    # Al borrar la factura el adjunto queda huérfano y lo limpia el GC.
+    invoice_id = Column(
+        Integer,
+        ForeignKey("invoices.id", ondelete="SET NULL"),
+        nullable=True,
+        index=True,
+    )
+    kind = Column(String(30), nullable=False)
+    # Ruta pública histórica (uploads/..., facturas/...), enlazada al blob.
+    path = Column(String, nullable=False, index=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.datetime.now)
+    blob = relationship("Blob")
+
+    def __init__(self, blob_sha256, kind, path, invoice_id=None):
+        self.blob_sha256 = blob_sha256
+        self.kind = kind
+        self.path = path
+        self.invoice_id = invoice_id
+
+
+class JobRun(Base):
+    """Historial de ejecuciones de las tareas programadas (ver services/job_runner.py)."""
+
+    __tablename__ = "job_runs"
+    # Un turno programado (slot) se ejecuta una sola vez en todo el cluster.
+    # Las ejecuciones manuales no tienen slot y no entran en la restricción.
+    __table_args__ = (
+        UniqueConstraint("job_name", "slot", name="uq_job_runs_job_slot"),
+    )
+    id = Column(Integer, primary_key=True)
+    job_name = Column(String(100), nullable=False, index=True)
+    trigger = Column(String(20), nullable=False, default="schedule")
+    slot = Column(DateTime, nullable=True)
+    status = Column(String(20), nullable=False, default="running")
+    started_at = Column(DateTime, nullable=False, default=datetime.datetime.now)
+    finished_at = Column(DateTime, nullable=True)
+    rows = Column(Integer, nullable=True)
+    result = Column(JSON, nullable=True)
+    error = Column(String, nullable=True)
+
+    def __init__(self, job_name, trigger="schedule"):
+        self.job_name = job_name
+        self.trigger = trigger
+        self.status = "running"
 
 
 # --- Modelos Pydantic (Solo para entrada de datos) ---
@@ -216,6 +337,7 @@ class InputPayment(BaseModel):
 class InputSubscription(BaseModel):
     user_id: int
     plan_id: int
+    billing_day: int | None = Field(None, ge=1, le=MAX_BILLING_DAY)
 
 
 class UpdatePlan(BaseModel):
@@ -255,3 +377,4 @@ class InputPaymentAdmin(BaseModel):
     payment_date: date
     payment_method: str
     receipt_url: str | None = None
+    receipt_sha256: str | None = None
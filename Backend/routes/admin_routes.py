@@ -1,15 +1,13 @@
 # routes/admin_routes.py
 import logging
-import math
 from typing import Optional, List
 from fastapi import APIRouter, Depends, Query, HTTPException, status, Header
 from pydantic import BaseModel
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
-from datetime import datetime
-from sqlalchemy import func, extract
+from sqlalchemy import func, select
 
-from config.db import get_db
+from config.db import get_db, get_read_db
 from auth.security import Security
 
 # --- 1. IMPORTACIONES ACTUALIZADAS ---
@@ -18,20 +16,23 @@ from models.models import (
     UserDetail,
     InputUser,
     UpdateUserDetail,
-    Subscription,
-    Payment,
-    Invoice,
     CompanySettings,  # <-- Reemplaza a BusinessSettings
 )
 from schemas.common_schemas import PaginatedResponse
+from core.responses import build_item, paginated_response
+from core.cache import invalidate_tags
+from services import dashboard_service
+from services.settings_cache import (
+    get_company_settings,
+    invalidate_company_settings,
+    publish_settings_change,
+)
 from schemas.user_schemas import UserOut
 
 # --- Se eliminan los schemas viejos y se añade el nuevo ---
 from schemas.settings_schemas import (
     CompanySettingsSchema,  # <-- Nuevo Schema
     DashboardStats,
-    ClientStatusSummary,
-    InvoiceStatusSummary,
 )
 
 logger = logging.getLogger(__name__)
@@ -66,50 +67,38 @@ def get_all_users(
     page: int = Query(1, ge=1),
     size: int = Query(10, ge=1, le=100),
     username: Optional[str] = Query(None),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
-    # ... (código sin cambios)
     logger.info("Solicitando la lista de usuarios.")
     try:
+        # Proyección explícita: solo las columnas que expone UserOut
+        # (nunca la contraseña ni el refresh_token) y sin entidades ORM.
         query = (
-            db.query(User).join(User.userdetail).filter(UserDetail.type == "cliente")
+            select(
+                User.id,
+                User.username,
+                User.email,
+                UserDetail.dni,
+                UserDetail.firstname,
+                UserDetail.lastname,
+                UserDetail.address,
+                UserDetail.barrio,
+                UserDetail.city,
+                UserDetail.phone,
+                UserDetail.phone2,
+                UserDetail.type.label("role"),
+            )
+            .join(UserDetail, User.id_userdetail == UserDetail.id)
+            .where(UserDetail.type == "cliente")
         )
         if username:
-            query = query.filter(User.username.ilike(f"{username}%"))
+            query = query.where(User.username.ilike(f"{username}%"))
 
-        total_items = query.count()
+        total_items = db.scalar(select(func.count()).select_from(query.subquery()))
         offset = (page - 1) * size
-        users_from_db = (
-            query.options(joinedload(User.userdetail)).offset(offset).limit(size).all()
-        )
-        total_pages = math.ceil(total_items / size)
-
-        items_list = []
-        for user in users_from_db:
-            if user.userdetail:
-                items_list.append(
-                    UserOut(
-                        id=user.id,
-                        username=user.username,
-                        email=user.email,
-                        dni=user.userdetail.dni,
-                        firstname=user.userdetail.firstname,
-                        lastname=user.userdetail.lastname,
-                        address=user.userdetail.address,
-                        barrio=user.userdetail.barrio,
-                        city=user.userdetail.city,
-                        phone=user.userdetail.phone,
-                        phone2=user.userdetail.phone2,
-                        role=user.userdetail.type,
-                    )
-                )
-
-        return PaginatedResponse(
-            total_items=total_items,
-            total_pages=total_pages,
-            current_page=page,
-            items=items_list,
-        )
+        rows = db.execute(query.order_by(User.id).offset(offset).limit(size)).mappings()
+        items_list = [build_item(UserOut, **row) for row in rows]
+        return paginated_response(UserOut, items_list, total_items, page, size)
     except Exception as e:
         logger.error(f"Error inesperado en get_all_users: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Error interno del servidor.")
@@ -186,6 +175,7 @@ def add_user(user_data: InputUser, db: Session = Depends(get_db)):
         )
         new_user.userdetail = new_user_detail
         db.add(new_user)
+        invalidate_tags(db, "users")
         db.commit()
         return {"message": "Cliente agregado exitosamente"}
     except IntegrityError:
@@ -214,6 +204,7 @@ def update_user_details(
     update_data = user_data.model_dump(exclude_unset=True)
     for key, value in update_data.items():
         setattr(user_to_update.userdetail, key, value)
+    invalidate_tags(db, f"user:{user_id}", "users")
     db.commit()
     return {"message": f"Detalles del usuario con ID {user_id} actualizados."}
 
@@ -228,6 +219,9 @@ def delete_user(user_id: int, db: Session = Depends(get_db)):
     if not user_to_delete:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
     db.delete(user_to_delete)
+    invalidate_tags(
+        db, f"user:{user_id}", "users", "invoices", "payments", "subscriptions"
+    )
     db.commit()
     return {"message": f"Usuario con ID {user_id} ha sido eliminado."}
 
@@ -288,7 +282,7 @@ def get_or_create_settings(db: Session) -> CompanySettings:
     dependencies=[Depends(verify_admin_permission)],
 )
 def get_settings(db: Session = Depends(get_db)):
-    return get_or_create_settings(db)
+    return get_company_settings() or get_or_create_settings(db)
 
 
 @admin_router.put(
@@ -311,7 +305,10 @@ def update_settings(update_data: CompanySettingsSchema, db: Session = Depends(ge
     settings.auto_invoicing_enabled = update_data.auto_invoicing_enabled
     settings.days_for_suspension = update_data.days_for_suspension
 
+    # El aviso se entrega al hacer commit; este worker invalida de inmediato.
+    publish_settings_change(db)
     db.commit()
+    invalidate_company_settings()
     db.refresh(settings)
     logger.info("La configuración del negocio ha sido actualizada.")
     return settings
@@ -323,69 +320,5 @@ def update_settings(update_data: CompanySettingsSchema, db: Session = Depends(ge
     summary="Obtener estadísticas del panel de control",
     dependencies=[Depends(verify_admin_permission)],
 )
-def get_dashboard_stats(db: Session = Depends(get_db)):
-    # Esta función se mantiene igual, pero ahora podría usar las configuraciones
-    # de una forma más segura si fuera necesario.
-    now = datetime.utcnow()
-    total_clients = db.query(UserDetail).filter(UserDetail.type == "cliente").count()
-    active_clients = (
-        db.query(Subscription.user_id)
-        .filter(Subscription.status == "active")
-        .distinct()
-        .count()
-    )
-    suspended_clients = (
-        db.query(Subscription.user_id)
-        .filter(Subscription.status == "suspended")
-        .distinct()
-        .count()
-    )
-
-    client_summary = ClientStatusSummary(
-        active_clients=active_clients,
-        suspended_clients=suspended_clients,
-        total_clients=total_clients,
-    )
-
-    pending_invoices = (
-        db.query(Invoice).filter(Invoice.status.ilike("pendiente%")).count()
-    )
-    paid_invoices = db.query(Invoice).filter(Invoice.status == "Pagado").count()
-    overdue_invoices = (
-        db.query(Invoice)
-        .filter(Invoice.status.ilike("pendiente%"), Invoice.due_date < now.date())
-        .count()
-    )
-
-    invoice_summary = InvoiceStatusSummary(
-        pending=pending_invoices,
-        paid=paid_invoices,
-        overdue=overdue_invoices,
-        total=db.query(Invoice).count(),
-    )
-
-    monthly_revenue = (
-        db.query(func.sum(Payment.amount))
-        .filter(
-            extract("month", Payment.payment_date) == now.month,
-            extract("year", Payment.payment_date) == now.year,
-        )
-        .scalar()
-        or 0.0
-    )
-
-    new_subscriptions = (
-        db.query(Subscription)
-        .filter(
-            extract("month", Subscription.subscription_date) == now.month,
-            extract("year", Subscription.subscription_date) == now.year,
-        )
-        .count()
-    )
-
-    return DashboardStats(
-        client_summary=client_summary,
-        invoice_summary=invoice_summary,
-        monthly_revenue=round(monthly_revenue, 2),
-        new_subscriptions_this_month=new_subscriptions,
-    )
+def get_dashboard_stats(db: Session = Depends(get_read_db)):
+    return dashboard_service.get_dashboard_stats(db)
@@ -2,8 +2,6 @@
 import logging
 import datetime
 import os
-import math
-import shutil
 from typing import Optional
 from fastapi import (
     APIRouter,
@@ -15,10 +13,14 @@ from fastapi import (
     Form,
     UploadFile,
     File,
+    BackgroundTasks,
+    Request,
 )
-from fastapi.responses import FileResponse
-from sqlalchemy import extract, or_
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import extract, or_, select, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import date
 
 # --- 1. MODELOS DE LA BASE DE DATOS (ACTUALIZADOS) ---
@@ -29,23 +31,62 @@ from models.models import (
     Payment,
     UserDetail,
     InputPaymentAdmin,
-    CompanySettings,  # <-- Usamos el nuevo modelo robusto y simple
+    InternetPlan,
 )
 
 # --- 2. SCHEMAS DE PYDANTIC ---
-from schemas.invoice_schemas import InvoiceOut, InvoiceAdminOut, UpdateInvoiceStatus
-from schemas.payment_schemas import PaymentAdminOut
+from schemas.invoice_schemas import (
+    InvoiceOut,
+    InvoiceAdminOut,
+    UpdateInvoiceStatus,
+    UserBasicInfo,
+    ReviewQueueItem,
+    ReviewBatch,
+    ReviewBatchResult,
+)
+from schemas.payment_schemas import (
+    PaymentAdminOut,
+    UserInfo,
+    BankImportPreview,
+    BankImportCommit,
+    BankImportResult,
+)
 from schemas.common_schemas import PaginatedResponse
 
 # --- 3. SERVICIOS Y UTILIDADES ---
 from auth.security import Security
-from config.db import get_db
-from services.payment_service import process_new_payment_admin, PaymentException
+from auth.signed_urls import signing_window, signing_window_start
+from config.db import get_db, get_async_db, get_read_db
+from core.responses import build_item, paginated_response
+from core.conditional import ConditionalRequest, conditional_request
+from services.payment_service import (
+    process_new_payment_admin,
+    register_imported_payments,
+    review_receipts,
+    PaymentException,
+)
+from services.settings_cache import get_company_settings
+from services.client_service import get_user_invoices_page
+from services import blob_store, job_runner
+from services.bank_import import (
+    BANK_FILE_EXTENSIONS,
+    BankImportError,
+    preview_bank_import,
+)
+from core.cache import invalidate_tags
+from core.constants import INVOICE_REVIEW_STATUSES
+from core.job_metrics import count_rows, track_job
+from utils.file_delivery import file_response
+from utils.uploads import MAX_UPLOAD_BYTES, UploadError, save_upload
+from utils.receipt_previews import generate_previews, is_image
 
 
 logger = logging.getLogger(__name__)
 billing_router = APIRouter()
 
+# Facturas por sentencia INSERT en la facturación diaria.
+INVOICE_INSERT_BATCH = 1000
+
 
 def verify_admin_permission(authorization: str = Header(...)):
     token_data = Security.verify_token({"authorization": authorization})
@@ -73,12 +114,22 @@ def get_all_payments_for_admin(
     month: Optional[int] = Query(None, ge=1, le=12),
     year: Optional[int] = Query(None, ge=2020),
     payment_method: Optional[str] = Query(None),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     try:
-        query = db.query(Payment).order_by(Payment.payment_date.desc())
-        query = query.join(User, Payment.user_id == User.id).join(
-            UserDetail, User.id_userdetail == UserDetail.id
+        query = (
+            select(
+                Payment.id,
+                Payment.payment_date,
+                Payment.amount,
+                Payment.payment_method,
+                Payment.invoice_id,
+                UserDetail.firstname,
+                UserDetail.lastname,
+                UserDetail.dni,
+            )
+            .join(User, Payment.user_id == User.id)
+            .join(UserDetail, User.id_userdetail == UserDetail.id)
         )
 
         if search:
@@ -89,46 +140,39 @@ def get_all_payments_for_admin(
             ]
             if search.isdigit():
                 search_filters.append(UserDetail.dni == int(search))
-            query = query.filter(or_(*search_filters))
+            query = query.where(or_(*search_filters))
 
         if month:
-            query = query.filter(extract("month", Payment.payment_date) == month)
+            query = query.where(extract("month", Payment.payment_date) == month)
         if year:
-            query = query.filter(extract("year", Payment.payment_date) == year)
+            query = query.where(extract("year", Payment.payment_date) == year)
         if payment_method:
-            query = query.filter(Payment.payment_method.ilike(f"%{payment_method}%"))
+            query = query.where(Payment.payment_method.ilike(f"%{payment_method}%"))
 
-        total_items = query.count()
-        payments_from_db = (
-            query.options(joinedload(Payment.user).joinedload(User.userdetail))
+        total_items = db.scalar(select(func.count()).select_from(query.subquery()))
+        rows = db.execute(
+            query.order_by(Payment.payment_date.desc())
             .offset((page - 1) * size)
             .limit(size)
-            .all()
-        )
-        items_list = []
-        for p in payments_from_db:
-            if p.user and p.user.userdetail:
-                items_list.append(
-                    PaymentAdminOut(
-                        id=p.id,
-                        payment_date=p.payment_date,
-                        amount=p.amount,
-                        payment_method=p.payment_method,
-                        invoice_id=p.invoice_id,
-                        user={
-                            "firstname": p.user.userdetail.firstname,
-                            "lastname": p.user.userdetail.lastname,
-                            "dni": p.user.userdetail.dni,
-                        },
-                    )
-                )
-
-        return PaginatedResponse(
-            total_items=total_items,
-            total_pages=math.ceil(total_items / size),
-            current_page=page,
-            items=items_list,
         )
+        items_list = [
+            build_item(
+                PaymentAdminOut,
+                id=row.id,
+                payment_date=row.payment_date,
+                amount=row.amount,
+                payment_method=row.payment_method,
+                invoice_id=row.invoice_id,
+                user=build_item(
+                    UserInfo,
+                    firstname=row.firstname,
+                    lastname=row.lastname,
+                    dni=row.dni,
+                ),
+            )
+            for row in rows
+        ]
+        return paginated_response(PaymentAdminOut, items_list, total_items, page, size)
     except Exception as e:
         logger.error(f"Error al obtener pagos para admin: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Error interno del servidor.")
@@ -140,7 +184,8 @@ def get_all_payments_for_admin(
     dependencies=[Depends(verify_admin_permission)],
     tags=["Admin"],
 )
-def register_manual_payment(
+async def register_manual_payment(
+    background_tasks: BackgroundTasks,
     invoice_id: int = Form(...),
     amount: float = Form(...),
     payment_date: date = Form(...),
@@ -150,34 +195,102 @@ def register_manual_payment(
 ):
     receipt_path = None
     if receipt_file:
-        upload_folder = "uploads/receipts"
-        os.makedirs(upload_folder, exist_ok=True)
         timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
-        file_extension = os.path.splitext(receipt_file.filename)[1]
-        unique_filename = f"receipt_{invoice_id}_{timestamp}{file_extension}"
-        file_path = os.path.join(upload_folder, unique_filename)
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(receipt_file.file, buffer)
-        receipt_path = file_path.replace("\\", "/")
-
-    payment_data = InputPaymentAdmin(
-        invoice_id=invoice_id,
-        amount=amount,
-        payment_date=payment_date,
-        payment_method=payment_method,
-        receipt_url=receipt_path,
-    )
+        try:
+            stored = await save_upload(
+                receipt_file, "uploads/receipts", f"receipt_{invoice_id}_{timestamp}"
+            )
+        except UploadError as e:
+            raise HTTPException(status_code=e.status_code, detail=e.message)
+        receipt_path = stored.path
+
     try:
-        result = process_new_payment_admin(payment_data, db)
-        return result
-    except PaymentException as e:
+        payment_data = InputPaymentAdmin(
+            invoice_id=invoice_id,
+            amount=amount,
+            payment_date=payment_date,
+            payment_method=payment_method,
+            receipt_url=receipt_path,
+            receipt_sha256=stored.sha256 if receipt_path else None,
+        )
+        result = await run_in_threadpool(process_new_payment_admin, payment_data, db)
+    except Exception as e:
+        if receipt_path and os.path.exists(receipt_path):
+            # El pago no se registró: el comprobante quedaría huérfano.
+            os.remove(receipt_path)
+        if isinstance(e, PaymentException):
+            raise HTTPException(status_code=e.status_code, detail=e.message)
+        logger.error(f"Error al registrar el pago manual: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Error interno del servidor.")
+    if receipt_path:
+        background_tasks.add_task(generate_previews, receipt_path)
+    return result
+
+
+@billing_router.post(
+    "/admin/payments/import/preview",
+    response_model=BankImportPreview,
+    summary="Conciliar un extracto bancario (CSV/OFX) con las facturas impagas",
+    dependencies=[Depends(verify_admin_permission)],
+    tags=["Admin"],
+)
+def preview_bank_statement(
+    file: UploadFile = File(...),
+    encoding: str = Query("utf-8-sig", max_length=20),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Lee el extracto línea por línea y propone la factura de cada transferencia
+    (por número de factura, DNI/CUIT o monto y fecha). No registra nada: los
+    pagos confirmados se envían a /admin/payments/import/commit.
+    """
+    extension = os.path.splitext(file.filename or "")[1].lower()
+    if extension not in BANK_FILE_EXTENSIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Formato no permitido. Permitidos: {', '.join(BANK_FILE_EXTENSIONS)}",
+        )
+    if file.size is not None and file.size > MAX_UPLOAD_BYTES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail="El extracto supera el tamaño máximo permitido.",
+        )
+    try:
+        return preview_bank_import(db, file.file, extension, encoding)
+    except BankImportError as e:
         raise HTTPException(status_code=e.status_code, detail=e.message)
+    except LookupError:
+        raise HTTPException(
+            status_code=400, detail=f"Codificación '{encoding}' desconocida."
+        )
+
+
+@billing_router.post(
+    "/admin/payments/import/commit",
+    response_model=BankImportResult,
+    summary="Registrar en lote los pagos confirmados de un extracto bancario",
+    tags=["Admin"],
+)
+def commit_bank_statement(
+    data: BankImportCommit,
+    token_data: dict = Depends(verify_admin_permission),
+    db: Session = Depends(get_db),
+):
+    try:
+        return register_imported_payments(
+            data.payments, data.payment_method, token_data.get("user_id"), db
+        )
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error al registrar los pagos importados: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Error interno del servidor.")
 
 
+@track_job("monthly_invoicing")
 def generate_monthly_invoices_logic(db: Session):
     logger.info("Iniciando la lógica de generación de facturas mensuales.")
 
-    settings = db.query(CompanySettings).first()
+    settings = get_company_settings()
     if not settings:
         logger.error(
             "CRÍTICO: No se encontró la fila de configuración en la tabla company_settings."
@@ -191,63 +304,89 @@ def generate_monthly_invoices_logic(db: Session):
         }
 
     payment_window_days = settings.payment_window_days
-    active_subscriptions = db.query(Subscription).filter_by(status="active").all()
-    generated_count, skipped_count = 0, 0
     today = datetime.date.today()
-    for sub in active_subscriptions:
-        if (
-            db.query(Invoice)
-            .filter(
-                Invoice.subscription_id == sub.id,
-                extract("month", Invoice.issue_date) == today.month,
-                extract("year", Invoice.issue_date) == today.year,
+    billing_period = today.replace(day=1)
+    # Una sola consulta: suscripciones activas cuyo ciclo de este mes ya llegó
+    # (billing_day <= hoy, así un día sin ejecución se recupera al siguiente),
+    # con el precio del plan y si el ciclo ya está facturado. La recuperación
+    # solo alcanza a suscripciones que ya existían en la fecha de su ciclo: un
+    # alta del día 20 con billing_day 5 se factura recién el 5 del mes siguiente.
+    cycle_date = func.make_date(today.year, today.month, Subscription.billing_day)
+    already_invoiced = (
+        select(Invoice.id)
+        .where(
+            Invoice.subscription_id == Subscription.id,
+            Invoice.billing_period == billing_period,
+        )
+        .exists()
+    )
+    due_subscriptions = db.execute(
+        select(
+            Subscription.id,
+            Subscription.user_id,
+            InternetPlan.price,
+            already_invoiced.label("invoiced"),
+        )
+        .join(InternetPlan, Subscription.plan_id == InternetPlan.id)
+        .where(
+            Subscription.status == "active",
+            Subscription.billing_day <= today.day,
+            or_(
+                Subscription.subscription_date.is_(None),
+                func.date(Subscription.subscription_date) <= cycle_date,
+            ),
+        )
+    ).all()
+
+    due_date = today + datetime.timedelta(days=payment_window_days)
+    new_invoices = [
+        {
+            "user_id": sub.user_id,
+            "subscription_id": sub.id,
+            "due_date": due_date,
+            "base_amount": sub.price,
+            "total_amount": sub.price,
+            "billing_period": billing_period,
+        }
+        for sub in due_subscriptions
+        if not sub.invoiced
+    ]
+    skipped_count = len(due_subscriptions) - len(new_invoices)
+    generated_count = 0
+    for start in range(0, len(new_invoices), INVOICE_INSERT_BATCH):
+        # ON CONFLICT cubre a otro proceso que facture el mismo ciclo a la vez.
+        inserted = db.execute(
+            pg_insert(Invoice)
+            .values(new_invoices[start : start + INVOICE_INSERT_BATCH])
+            .on_conflict_do_nothing(
+                index_elements=["subscription_id", "billing_period"]
             )
-            .first()
-        ):
-            skipped_count += 1
-            continue
-
-        new_invoice = Invoice(
-            user_id=sub.user_id,
-            subscription_id=sub.id,
-            due_date=today + datetime.timedelta(days=payment_window_days),
-            base_amount=sub.plan.price,
-            total_amount=sub.plan.price,
+            .returning(Invoice.id)
         )
-        db.add(new_invoice)
-        generated_count += 1
+        generated_count += len(inserted.all())
+    skipped_count += len(new_invoices) - generated_count
 
+    invalidate_tags(db, "invoices")
     db.commit()
-    logger.info(f"Facturas generadas: {generated_count}, omitidas: {skipped_count}.")
+    logger.info(
+        f"Ciclo {billing_period:%Y-%m}, día {today.day}: facturas generadas: "
+        f"{generated_count}, omitidas: {skipped_count}."
+    )
+    count_rows("monthly_invoicing", "generated", generated_count)
+    count_rows("monthly_invoicing", "skipped", skipped_count)
     return {
-        "message": "Proceso de facturación mensual completado.",
+        "message": "Proceso de facturación del día completado.",
+        "ciclo": billing_period.strftime("%Y-%m"),
         "facturas_generadas": generated_count,
         "facturas_omitidas_por_duplicado": skipped_count,
     }
 
 
-def generate_monthly_invoices_job(db: Session):
-    logger.info("Ejecutando TAREA PROGRAMADA: Generación de facturas mensuales.")
-    try:
-        generate_monthly_invoices_logic(db)
-    except Exception as e:
-        logger.error(f"Error en la tarea programada de facturación: {e}", exc_info=True)
-    finally:
-        db.close()
-
-
-@billing_router.post(
-    "/admin/invoices/process-overdue",
-    dependencies=[Depends(verify_admin_permission)],
-    tags=["Admin"],
-)
-def process_overdue_invoices(db: Session = Depends(get_db)):
-    settings = db.query(CompanySettings).first()
+@track_job("overdue_processing")
+def process_overdue_invoices_logic(db: Session):
+    settings = get_company_settings()
     if not settings:
-        raise HTTPException(
-            status_code=400,
-            detail="La configuración del negocio no ha sido inicializada.",
-        )
+        return {"error": "La configuración del negocio no ha sido inicializada."}
 
     late_fee = settings.late_fee_amount
     days_for_suspension = settings.days_for_suspension
@@ -271,7 +410,10 @@ def process_overdue_invoices(db: Session = Depends(get_db)):
             invoice.subscription.status = "suspended"
             suspended_count += 1
 
+    invalidate_tags(db, "invoices", "subscriptions")
     db.commit()
+    count_rows("overdue_processing", "late_fee", processed_count)
+    count_rows("overdue_processing", "suspended", suspended_count)
     return {
         "message": "Proceso de vencidas completado.",
         "facturas_con_recargo": processed_count,
@@ -279,6 +421,39 @@ def process_overdue_invoices(db: Session = Depends(get_db)):
     }
 
 
+# Tareas disponibles para el job runner (programación e historial en job_runs).
+job_runner.register_job(
+    "monthly_invoicing",
+    generate_monthly_invoices_logic,
+    "Facturación diaria de los ciclos que vencen hoy",
+)
+job_runner.register_job(
+    "overdue_processing",
+    process_overdue_invoices_logic,
+    "Recargos y suspensiones por facturas vencidas",
+)
+job_runner.register_job(
+    "blob_gc",
+    blob_store.collect_garbage,
+    "Limpieza de comprobantes y PDFs sin referencias",
+)
+
+
+@billing_router.post(
+    "/admin/invoices/process-overdue",
+    dependencies=[Depends(verify_admin_permission)],
+    tags=["Admin"],
+)
+def process_overdue_invoices():
+    try:
+        result = job_runner.run_job("overdue_processing", trigger="manual")
+    except job_runner.JobAlreadyRunning as e:
+        raise HTTPException(status_code=409, detail=e.message)
+    if "error" in result:
+        raise HTTPException(status_code=400, detail=result["error"])
+    return result
+
+
 @billing_router.get(
     "/admin/invoices/all",
     response_model=PaginatedResponse[InvoiceAdminOut],
@@ -290,47 +465,59 @@ def get_all_invoices_for_admin(
     size: int = Query(10, ge=1, le=100),
     status: Optional[str] = Query(None),
     user_id: Optional[int] = Query(None),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     try:
-        query = db.query(Invoice).order_by(Invoice.issue_date.desc())
+        query = (
+            select(
+                Invoice.id,
+                Invoice.issue_date,
+                Invoice.due_date,
+                Invoice.base_amount,
+                Invoice.late_fee,
+                Invoice.total_amount,
+                Invoice.status,
+                Invoice.receipt_pdf_url,
+                Invoice.user_receipt_url,
+                User.username,
+                UserDetail.firstname,
+                UserDetail.lastname,
+            )
+            .join(User, Invoice.user_id == User.id)
+            .join(UserDetail, User.id_userdetail == UserDetail.id)
+        )
         if status:
-            query = query.filter(Invoice.status.ilike(f"%{status}%"))
+            query = query.where(Invoice.status.ilike(f"%{status}%"))
         if user_id:
-            query = query.filter(Invoice.user_id == user_id)
-        total_items = query.count()
-        invoices_from_db = (
-            query.options(joinedload(Invoice.user).joinedload(User.userdetail))
+            query = query.where(Invoice.user_id == user_id)
+        total_items = db.scalar(select(func.count()).select_from(query.subquery()))
+        rows = db.execute(
+            query.order_by(Invoice.issue_date.desc())
             .offset((page - 1) * size)
             .limit(size)
-            .all()
-        )
-        total_pages = math.ceil(total_items / size)
-        items_list = []
-        for inv in invoices_from_db:
-            if inv.user and inv.user.userdetail:
-                invoice_data = {
-                    "id": inv.id,
-                    "issue_date": inv.issue_date,
-                    "due_date": inv.due_date,
-                    "base_amount": inv.base_amount,
-                    "late_fee": inv.late_fee,
-                    "total_amount": inv.total_amount,
-                    "status": inv.status,
-                    "receipt_pdf_url": inv.receipt_pdf_url,
-                    "user": {
-                        "username": inv.user.username,
-                        "firstname": inv.user.userdetail.firstname,
-                        "lastname": inv.user.userdetail.lastname,
-                    },
-                }
-                items_list.append(invoice_data)
-        return PaginatedResponse(
-            total_items=total_items,
-            total_pages=total_pages,
-            current_page=page,
-            items=items_list,
         )
+        items_list = [
+            build_item(
+                InvoiceAdminOut,
+                id=row.id,
+                issue_date=row.issue_date,
+                due_date=row.due_date,
+                base_amount=row.base_amount,
+                late_fee=row.late_fee,
+                total_amount=row.total_amount,
+                status=row.status,
+                receipt_pdf_url=row.receipt_pdf_url,
+                user_receipt_url=row.user_receipt_url,
+                user=build_item(
+                    UserBasicInfo,
+                    username=row.username,
+                    firstname=row.firstname,
+                    lastname=row.lastname,
+                ),
+            )
+            for row in rows
+        ]
+        return paginated_response(InvoiceAdminOut, items_list, total_items, page, size)
     except Exception as e:
         logger.error(f"Error al obtener facturas para admin: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Error interno del servidor.")
@@ -338,12 +525,15 @@ def get_all_invoices_for_admin(
 
 @billing_router.post(
     "/admin/invoices/generate-monthly",
-    summary="Generar facturas mensuales manualmente",
+    summary="Facturar manualmente los ciclos que vencen hasta hoy",
     dependencies=[Depends(verify_admin_permission)],
     tags=["Admin"],
 )
-def generate_monthly_invoices_manual(db: Session = Depends(get_db)):
-    result = generate_monthly_invoices_logic(db)
+def generate_monthly_invoices_manual():
+    try:
+        result = job_runner.run_job("monthly_invoicing", trigger="manual")
+    except job_runner.JobAlreadyRunning as e:
+        raise HTTPException(status_code=409, detail=e.message)
     if "error" in result:
         raise HTTPException(status_code=400, detail=result["error"])
     return result
@@ -352,6 +542,7 @@ def generate_monthly_invoices_manual(db: Session = Depends(get_db)):
 @billing_router.get("/invoices/{invoice_id}/download", tags=["Facturación"])
 def download_invoice_pdf(
     invoice_id: int,
+    request: Request,
     authorization: str = Header(...),
     db: Session = Depends(get_db),
 ):
@@ -382,8 +573,9 @@ def download_invoice_pdf(
             status_code=404,
             detail="El archivo PDF del recibo no se encontró en el servidor.",
         )
-    return FileResponse(
-        path=full_file_path,
+    return file_response(
+        request,
+        full_file_path,
         media_type="application/pdf",
         filename=os.path.basename(full_file_path),
     )
@@ -392,13 +584,13 @@ def download_invoice_pdf(
 @billing_router.get(
     "/users/me/invoices", response_model=PaginatedResponse[InvoiceOut], tags=["Cliente"]
 )
-def get_my_invoices(
+async def get_my_invoices(
     authorization: str = Header(...),
     page: int = Query(1, ge=1),
     size: int = Query(10, ge=1, le=100),
     month: int = Query(None, ge=1, le=12),
     year: int = Query(None, ge=2020),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     token_data = Security.verify_token({"authorization": authorization})
     if not token_data.get("success"):
@@ -406,21 +598,104 @@ def get_my_invoices(
             status_code=status.HTTP_401_UNAUTHORIZED, detail=token_data.get("message")
         )
     user_id = token_data.get("user_id")
-    query = (
-        db.query(Invoice).filter_by(user_id=user_id).order_by(Invoice.issue_date.desc())
-    )
-    if month:
-        query = query.filter(extract("month", Invoice.issue_date) == month)
-    if year:
-        query = query.filter(extract("year", Invoice.issue_date) == year)
-    total_items = query.count()
-    invoices = query.offset((page - 1) * size).limit(size).all()
-    return PaginatedResponse(
-        total_items=total_items,
-        total_pages=math.ceil(total_items / size),
-        current_page=page,
-        items=invoices,
-    )
+    return await get_user_invoices_page(db, user_id, page, size, month, year)
+
+
+@billing_router.get(
+    "/admin/invoices/review-queue",
+    response_model=PaginatedResponse[ReviewQueueItem],
+    summary="Cola de facturas con comprobante pendiente de revisión",
+    dependencies=[Depends(verify_admin_permission)],
+    tags=["Admin"],
+)
+def get_review_queue(
+    page: int = Query(1, ge=1),
+    size: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+):
+    """
+    Facturas en verificación, la más antigua primero, con su cliente y la URL
+    de la vista previa del comprobante. Una sola consulta: la recorre el índice
+    parcial ix_invoices_review_queue y el total sale de count(*) OVER ().
+    Se lee del primario para no mostrar facturas que ya se resolvieron.
+    """
+    receipt_url = func.coalesce(Invoice.user_receipt_url, Invoice.receipt_pdf_url)
+    rows = db.execute(
+        select(
+            Invoice.id,
+            Invoice.user_id,
+            Invoice.issue_date,
+            Invoice.due_date,
+            Invoice.total_amount,
+            Invoice.status,
+            Invoice.updated_at,
+            receipt_url.label("receipt_url"),
+            User.username,
+            UserDetail.firstname,
+            UserDetail.lastname,
+            func.count().over().label("total_items"),
+        )
+        .join(User, Invoice.user_id == User.id)
+        .join(UserDetail, User.id_userdetail == UserDetail.id)
+        .where(Invoice.status.in_(INVOICE_REVIEW_STATUSES))
+        .order_by(Invoice.updated_at, Invoice.id)
+        .offset((page - 1) * size)
+        .limit(size)
+    ).all()
+    total_items = rows[0].total_items if rows else 0
+    if not rows and page > 1:
+        # Fuera de rango: el total no viene en ninguna fila.
+        total_items = db.scalar(
+            select(func.count())
+            .select_from(Invoice)
+            .where(Invoice.status.in_(INVOICE_REVIEW_STATUSES))
+        )
+    items_list = [
+        build_item(
+            ReviewQueueItem,
+            id=row.id,
+            user_id=row.user_id,
+            issue_date=row.issue_date,
+            due_date=row.due_date,
+            total_amount=row.total_amount,
+            status=row.status,
+            submitted_at=row.updated_at,
+            receipt_url=row.receipt_url,
+            preview_url=f"/api/invoices/{row.id}/receipt",
+            thumbnail_url=(
+                f"/api/invoices/{row.id}/receipt?variant=thumbnail"
+                if row.receipt_url and is_image(row.receipt_url)
+                else None
+            ),
+            user=build_item(
+                UserBasicInfo,
+                username=row.username,
+                firstname=row.firstname,
+                lastname=row.lastname,
+            ),
+        )
+        for row in rows
+    ]
+    return paginated_response(ReviewQueueItem, items_list, total_items, page, size)
+
+
+@billing_router.post(
+    "/admin/invoices/review",
+    response_model=ReviewBatchResult,
+    summary="Aprobar o rechazar comprobantes en lote",
+    tags=["Admin"],
+)
+def review_invoice_receipts(
+    batch: ReviewBatch,
+    token_data: dict = Depends(verify_admin_permission),
+    db: Session = Depends(get_db),
+):
+    try:
+        return review_receipts(batch.decisions, token_data.get("user_id"), db)
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error al aplicar la revisión por lotes: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Error interno del servidor.")
 
 
 @billing_router.get(
@@ -474,6 +749,7 @@ def update_invoice_status(
     if not invoice:
         raise HTTPException(status_code=404, detail="Factura no encontrada.")
     invoice.status = update_data.status
+    invalidate_tags(db, f"user:{invoice.user_id}", "invoices")
     db.commit()
     db.refresh(invoice)
     return get_invoice_by_id_for_admin(invoice_id=invoice_id, db=db)
@@ -488,6 +764,7 @@ def get_my_invoice_by_id(
     invoice_id: int,
     authorization: str = Header(...),
     db: Session = Depends(get_db),
+    conditional: ConditionalRequest = Depends(conditional_request),
 ):
     token_data = Security.verify_token({"authorization": authorization})
     if not token_data.get("success"):
@@ -496,10 +773,18 @@ def get_my_invoice_by_id(
             detail=token_data.get("message"),
         )
     user_id = token_data.get("user_id")
-    invoice = db.query(Invoice).filter_by(id=invoice_id, user_id=user_id).first()
-    if not invoice:
+    updated_at = (
+        db.query(Invoice.updated_at).filter_by(id=invoice_id, user_id=user_id).first()
+    )
+    if not updated_at:
         raise HTTPException(status_code=404, detail="Factura no encontrada")
-    return invoice
+    # La respuesta incluye URLs firmadas que vencen: la versión cambia con
+    # cada ventana de firma para que un 304 no deje al cliente con URLs viejas.
+    conditional.check(
+        version=f"invoice:{invoice_id}:{user_id}:{updated_at[0]}:{signing_window()}",
+        last_modified=max(filter(None, (updated_at[0], signing_window_start()))),
+    )
+    return db.query(Invoice).filter_by(id=invoice_id, user_id=user_id).first()
 
 
 @billing_router.post(
@@ -507,8 +792,9 @@ def get_my_invoice_by_id(
     summary="Subir comprobante de pago del cliente",
     tags=["Cliente"],
 )
-def upload_user_receipt(
+async def upload_user_receipt(
     invoice_id: int,
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     authorization: str = Header(...),
     db: Session = Depends(get_db),
@@ -517,27 +803,44 @@ def upload_user_receipt(
     if not token_data.get("success"):
         raise HTTPException(status_code=401, detail=token_data.get("message"))
     user_id = token_data.get("user_id")
-    invoice = db.query(Invoice).filter_by(id=invoice_id, user_id=user_id).first()
+    invoice = await run_in_threadpool(
+        lambda: db.query(Invoice).filter_by(id=invoice_id, user_id=user_id).first()
+    )
     if not invoice:
         raise HTTPException(status_code=404, detail="Factura no encontrada.")
-    allowed_extensions = [".pdf", ".png", ".jpg", ".jpeg"]
-    file_extension = os.path.splitext(file.filename)[1].lower()
-    if file_extension not in allowed_extensions:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Formato de archivo no permitido. Permitidos: {', '.join(allowed_extensions)}",
-        )
     now = datetime.datetime.now()
-    folder = f"uploads/user_receipts/{now.year}/{now.month:02d}"
-    os.makedirs(folder, exist_ok=True)
-    filename = f"user_receipt_{invoice.id}_{user_id}_{now.strftime('%Y%m%d%H%M%S')}{file_extension}"
-    filepath = os.path.join(folder, filename)
-    with open(filepath, "wb") as f:
-        f.write(file.file.read())
-    invoice.user_receipt_url = filepath.replace("\\", "/")
-    invoice.status = "En Verificacion"
-    db.commit()
+    try:
+        stored = await save_upload(
+            file,
+            f"uploads/user_receipts/{now.year}/{now.month:02d}",
+            f"user_receipt_{invoice.id}_{user_id}_{now.strftime('%Y%m%d%H%M%S')}",
+        )
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+
+    def mark_in_review():
+        invoice.user_receipt_url = stored.path
+        invoice.status = "En Verificacion"
+        blob_store.store_file(
+            db,
+            stored.path,
+            "user_receipt",
+            invoice_id=invoice.id,
+            sha256=stored.sha256,
+            content_type=file.content_type,
+        )
+        invalidate_tags(db, f"user:{user_id}", "invoices")
+        db.commit()
+
+    await run_in_threadpool(mark_in_review)
+    # Vista previa y miniatura fuera del camino de la petición.
+    background_tasks.add_task(generate_previews, stored.path)
+    logger.info(
+        f"Comprobante de la factura {invoice_id} guardado en '{stored.path}' "
+        f"({stored.size} bytes, sha256 {stored.sha256})."
+    )
     return {
         "message": "Comprobante subido correctamente y factura en verificación.",
-        "path": filepath,
+        "path": stored.path,
+        "sha256": stored.sha256,
     }
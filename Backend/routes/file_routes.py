@@ -0,0 +1,45 @@
+# routes/file_routes.py
+import logging
+import mimetypes
+import os
+import time
+
+from fastapi import APIRouter, HTTPException, Query, Request
+
+from auth.signed_urls import normalize_file_path, verify_file_signature
+from utils.file_delivery import file_response
+
+logger = logging.getLogger(__name__)
+file_router = APIRouter(tags=["Archivos"])
+
+
+@file_router.get(
+    "/files/{file_path:path}",
+    summary="Descargar un archivo con una URL firmada",
+)
+def download_signed_file(
+    file_path: str,
+    request: Request,
+    expires: int = Query(...),
+    signature: str = Query(..., max_length=64),
+):
+    """
+    Sirve comprobantes y PDFs con las URLs que firman las respuestas de
+    facturas (auth/signed_urls.py). Sin JWT ni BD: solo se verifica la firma y
+    el vencimiento, así que la respuesta se puede cachear hasta que la URL
+    vence. Con FILE_DELIVERY_MODE=nginx/sendfile los bytes los envía el proxy.
+    """
+    path = normalize_file_path(file_path)
+    if path is None or path != file_path:
+        raise HTTPException(status_code=404, detail="Archivo no encontrado.")
+    if not verify_file_signature(path, expires, signature):
+        raise HTTPException(status_code=403, detail="URL inválida o vencida.")
+    if not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="Archivo no encontrado.")
+    remaining = max(0, expires - int(time.time()))
+    return file_response(
+        request,
+        path,
+        media_type=mimetypes.guess_type(path)[0] or "application/octet-stream",
+        cache_control=f"public, max-age={remaining}",
+    )
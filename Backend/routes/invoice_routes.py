@@ -1,7 +1,20 @@
 # Backend/routes/invoice_routes.py
 import logging
-import shutil
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Header
+import mimetypes
+from typing import Literal
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    HTTPException,
+    status,
+    UploadFile,
+    File,
+    Header,
+    Query,
+    Request,
+)
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 import os
 
@@ -13,6 +26,11 @@ from models.models import Invoice
 
 from auth.security import Security
 from config.db import get_db
+from core.cache import invalidate_tags
+from services.blob_store import store_file
+from utils.file_delivery import file_response
+from utils.uploads import UploadError, save_upload
+from utils.receipt_previews import generate_previews, is_image, variant_path
 
 logger = logging.getLogger(__name__)
 invoice_router = APIRouter()
@@ -27,8 +45,9 @@ os.makedirs(UPLOAD_DIRECTORY, exist_ok=True)
     summary="Subir comprobante de pago para una factura",
     tags=["Cliente"],
 )
-def upload_receipt(
+async def upload_receipt(
     invoice_id: int,
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     authorization: str = Header(...),
     db: Session = Depends(get_db),
@@ -44,7 +63,9 @@ def upload_receipt(
         f"Usuario ID {user_id} subiendo comprobante para factura ID {invoice_id}."
     )
 
-    invoice = db.query(Invoice).filter_by(id=invoice_id, user_id=user_id).first()
+    invoice = await run_in_threadpool(
+        lambda: db.query(Invoice).filter_by(id=invoice_id, user_id=user_id).first()
+    )
     if not invoice:
         raise HTTPException(
             status_code=404, detail="Factura no encontrada o no pertenece al usuario."
@@ -53,27 +74,105 @@ def upload_receipt(
     if invoice.status == "paid":
         raise HTTPException(status_code=400, detail="Esta factura ya ha sido pagada.")
 
+    # Nombre fijo por factura y usuario: un nuevo comprobante reemplaza al
+    # anterior de forma atómica.
     try:
-        # Generar un nombre de archivo único para evitar colisiones
-        file_extension = os.path.splitext(file.filename)[1]
-        unique_filename = f"receipt_{invoice_id}_{user_id}{file_extension}"
-        file_path = os.path.join(UPLOAD_DIRECTORY, unique_filename)
-
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        stored = await save_upload(
+            file, UPLOAD_DIRECTORY, f"receipt_{invoice_id}_{user_id}"
+        )
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
 
+    def mark_in_review():
         # Actualizar la factura para indicar que el pago está pendiente de revisión
         invoice.status = "in_review"
-        invoice.receipt_pdf_url = file_path
+        invoice.receipt_pdf_url = stored.path
+        store_file(
+            db,
+            stored.path,
+            "receipt",
+            invoice_id=invoice.id,
+            sha256=stored.sha256,
+            content_type=file.content_type,
+        )
+        invalidate_tags(db, f"user:{user_id}", "invoices")
         db.commit()
 
-        logger.info(f"Comprobante para factura {invoice_id} guardado en '{file_path}'.")
-        return {
-            "message": "Comprobante subido exitosamente. Será verificado a la brevedad."
-        }
+    try:
+        await run_in_threadpool(mark_in_review)
     except Exception as e:
-        db.rollback()
+        await run_in_threadpool(db.rollback)
         logger.error(f"Error al subir el comprobante para la factura {invoice_id}: {e}")
         raise HTTPException(status_code=500, detail="Error al procesar el archivo.")
-    finally:
-        file.file.close()
+
+    # Vista previa y miniatura fuera del camino de la petición.
+    background_tasks.add_task(generate_previews, stored.path)
+    logger.info(
+        f"Comprobante para factura {invoice_id} guardado en '{stored.path}' "
+        f"(sha256 {stored.sha256})."
+    )
+    return {
+        "message": "Comprobante subido exitosamente. Será verificado a la brevedad."
+    }
+
+
+def _receipt_file(invoice: Invoice) -> str | None:
+    # Primero el comprobante que subió el cliente; si no, el de la factura
+    # (los PDFs generados se guardan relativos a facturas/).
+    for url in (invoice.user_receipt_url, invoice.receipt_pdf_url):
+        if not url:
+            continue
+        for candidate in (url, os.path.join("facturas", url)):
+            if os.path.isfile(candidate):
+                return candidate
+    return None
+
+
+@invoice_router.get(
+    "/invoices/{invoice_id}/receipt",
+    summary="Ver el comprobante de una factura (vista previa por defecto)",
+    tags=["Facturación"],
+)
+def get_invoice_receipt(
+    invoice_id: int,
+    request: Request,
+    variant: Literal["preview", "thumbnail", "original"] = Query("preview"),
+    authorization: str = Header(...),
+    db: Session = Depends(get_db),
+):
+    """
+    Las imágenes se sirven como vista previa WebP reducida y sin EXIF;
+    'variant=original' devuelve el archivo subido. Los PDFs y los comprobantes
+    cuya vista previa todavía no existe se sirven siempre como original.
+    """
+    token_data = Security.verify_token({"authorization": authorization})
+    if not token_data.get("success"):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail=token_data.get("message")
+        )
+    invoice = db.query(Invoice).filter_by(id=invoice_id).first()
+    if not invoice:
+        raise HTTPException(status_code=404, detail="Factura no encontrada.")
+    if (
+        token_data.get("role") != "administrador"
+        and token_data.get("user_id") != invoice.user_id
+    ):
+        raise HTTPException(
+            status_code=403, detail="No tienes permiso para ver este comprobante."
+        )
+    path = _receipt_file(invoice)
+    if path is None:
+        raise HTTPException(
+            status_code=404, detail="La factura no tiene un comprobante asociado."
+        )
+
+    if variant != "original" and is_image(path):
+        preview = variant_path(path, variant)
+        if os.path.isfile(preview):
+            return file_response(request, preview, media_type="image/webp")
+    return file_response(
+        request,
+        path,
+        media_type=mimetypes.guess_type(path)[0] or "application/octet-stream",
+        filename=os.path.basename(path) if variant == "original" else None,
+    )
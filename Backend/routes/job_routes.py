@@ -0,0 +1,118 @@
+# routes/job_routes.py
+import logging
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Header, Query
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from auth.security import Security
+from config.db import get_db
+from core.responses import paginated_response
+from models.models import JobRun
+from schemas.common_schemas import PaginatedResponse
+from schemas.job_schemas import JobIndex, JobOut, JobRunOut, JobTriggered
+from services import job_runner
+
+logger = logging.getLogger(__name__)
+job_router = APIRouter(prefix="/admin/jobs", tags=["Admin"])
+
+
+def verify_admin_permission(authorization: str = Header(...)):
+    """Verifica que el token en la cabecera pertenezca a un administrador."""
+    token_data = Security.verify_token({"authorization": authorization})
+    if not token_data.get("success") or token_data.get("role") != "administrador":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="No tienes permisos de administrador para realizar esta acción.",
+        )
+    return token_data
+
+
+@job_router.get(
+    "",
+    response_model=JobIndex,
+    summary="Listar las tareas programadas con su próxima y última ejecución",
+    dependencies=[Depends(verify_admin_permission)],
+)
+def get_jobs(db: Session = Depends(get_db)):
+    latest = (
+        select(JobRun.job_name, func.max(JobRun.id).label("id"))
+        .group_by(JobRun.job_name)
+        .subquery()
+    )
+    last_runs = {
+        run.job_name: run
+        for run in db.scalars(select(JobRun).join(latest, JobRun.id == latest.c.id))
+    }
+    jobs = []
+    for job in job_runner.JOBS.values():
+        scheduled = job_runner.scheduler.get_job(f"{job.name}_job")
+        last_run = last_runs.get(job.name)
+        jobs.append(
+            JobOut(
+                name=job.name,
+                description=job.description,
+                next_run_time=scheduled.next_run_time if scheduled else None,
+                last_run=JobRunOut.model_validate(last_run) if last_run else None,
+            )
+        )
+    return JobIndex(jobs=jobs)
+
+
+@job_router.post(
+    "/{job_name}/run",
+    response_model=JobTriggered,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Lanzar una tarea en segundo plano",
+    dependencies=[Depends(verify_admin_permission)],
+)
+async def trigger_job(job_name: str):
+    if job_name not in job_runner.JOBS:
+        raise HTTPException(status_code=404, detail="Tarea no encontrada.")
+    run_id = await job_runner.submit_job(job_name, trigger="manual")
+    if run_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="La tarea ya se está ejecutando en otro proceso.",
+        )
+    logger.info(f"Tarea '{job_name}' lanzada manualmente (ejecución {run_id}).")
+    return JobTriggered(message="Tarea lanzada.", run_id=run_id)
+
+
+@job_router.get(
+    "/runs",
+    response_model=PaginatedResponse[JobRunOut],
+    summary="Historial de ejecuciones de las tareas",
+    dependencies=[Depends(verify_admin_permission)],
+)
+def get_job_runs(
+    page: int = Query(1, ge=1),
+    size: int = Query(20, ge=1, le=100),
+    job_name: Optional[str] = Query(None),
+    run_status: Optional[str] = Query(None, alias="status"),
+    db: Session = Depends(get_db),
+):
+    query = select(JobRun)
+    if job_name:
+        query = query.where(JobRun.job_name == job_name)
+    if run_status:
+        query = query.where(JobRun.status == run_status)
+    total_items = db.scalar(select(func.count()).select_from(query.subquery()))
+    runs = db.scalars(
+        query.order_by(JobRun.id.desc()).offset((page - 1) * size).limit(size)
+    )
+    items = [JobRunOut.model_validate(run) for run in runs]
+    return paginated_response(JobRunOut, items, total_items, page, size)
+
+
+@job_router.get(
+    "/runs/{run_id}",
+    response_model=JobRunOut,
+    summary="Detalle de una ejecución",
+    dependencies=[Depends(verify_admin_permission)],
+)
+def get_job_run(run_id: int, db: Session = Depends(get_db)):
+    run = db.get(JobRun, run_id)
+    if not run:
+        raise HTTPException(status_code=404, detail="Ejecución no encontrada.")
+    return run
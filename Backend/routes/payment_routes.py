@@ -2,13 +2,14 @@
 import logging
 import math
 from fastapi import APIRouter, Depends, HTTPException, status, Query, Header
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from models.models import Payment, Invoice
+from models.models import Payment
 from schemas.payment_schemas import PaymentOut
 from schemas.common_schemas import PaginatedResponse
 from auth.security import Security
-from config.db import get_db
+from config.db import get_async_db
 
 logger = logging.getLogger(__name__)
 # Cambiamos el prefijo para que todas las rutas aquí empiecen con /api/payments
@@ -20,12 +21,12 @@ payment_router = APIRouter(prefix="/payments", tags=["Pagos"])
     response_model=PaginatedResponse[PaymentOut],
     summary="Obtener los pagos de un usuario específico",
 )
-def get_user_payments(
+async def get_user_payments(
     user_id: int,
     authorization: str = Header(...),
     page: int = Query(1, ge=1),
     size: int = Query(10, ge=1, le=100),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Endpoint para que un administrador o el propio usuario puedan ver un historial de pagos.
@@ -46,19 +47,18 @@ def get_user_payments(
             detail="No tienes permiso para ver estos pagos.",
         )
 
-    query = (
-        db.query(Payment)
-        .filter_by(user_id=user_id)
-        .order_by(Payment.payment_date.desc())
+    total_items = await db.scalar(
+        select(func.count()).select_from(Payment).where(Payment.user_id == user_id)
     )
-
-    total_items = query.count()
-    payments = (
-        query.options(joinedload(Payment.invoice).joinedload(Invoice.subscription))
+    # PaymentOut no expone la factura, así que no se cargan relaciones.
+    result = await db.execute(
+        select(Payment)
+        .where(Payment.user_id == user_id)
+        .order_by(Payment.payment_date.desc())
         .offset((page - 1) * size)
         .limit(size)
-        .all()
     )
+    payments = result.scalars().all()
 
     return PaginatedResponse(
         total_items=total_items,
@@ -1,7 +1,9 @@
 # routes/plan_routes.py
 import logging
 import math
+import os
 from fastapi import APIRouter, Depends, Query, HTTPException, status, Header
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 
 # --- INICIO DE LA CORRECCIÓN DE IMPORTACIONES ---
@@ -20,11 +22,22 @@ from schemas.common_schemas import PaginatedResponse
 # --- FIN DE LA CORRECCIÓN DE IMPORTACIONES ---
 
 from config.db import get_db
+from core.conditional import (
+    ConditionalRequest,
+    NotModifiedException,
+    conditional_request,
+)
+from services.plan_catalogue import plan_catalogue, publish_plan_change
+from core.cache import invalidate_tags
 from auth.security import Security
 
 logger = logging.getLogger(__name__)
 plan_router = APIRouter()
 
+# Segundos que navegadores y proxies pueden reutilizar el listado público sin
+# revalidar; pasado ese tiempo revalidan con el ETag del catálogo.
+PLANS_CACHE_MAX_AGE = int(os.getenv("PLANS_CACHE_MAX_AGE", "60"))
+
 
 def verify_admin_permission(authorization: str = Header(...)):
     """Verifica que el token en la cabecera pertenezca a un administrador."""
@@ -48,8 +61,11 @@ def add_plan(plan_data: InputPlan, db: Session = Depends(get_db)):
     try:
         new_plan = InternetPlan(**plan_data.model_dump())
         db.add(new_plan)
+        db.flush()
+        publish_plan_change(db, new_plan.id)
         db.commit()
         db.refresh(new_plan)
+        plan_catalogue.upsert(new_plan)
         return {"message": f"Plan '{plan_data.name}' agregado."}
     except Exception as e:
         db.rollback()
@@ -60,21 +76,30 @@ def add_plan(plan_data: InputPlan, db: Session = Depends(get_db)):
 @plan_router.get(
     "/plans/all", response_model=PaginatedResponse[PlanOut], tags=["Planes de Internet"]
 )
-def get_all_plans(
+async def get_all_plans(
     page: int = Query(1, ge=1),
     size: int = Query(10, ge=1, le=100),
-    db: Session = Depends(get_db),
+    conditional: ConditionalRequest = Depends(conditional_request),
 ):
     logger.info("Solicitud pública para obtener todos los planes.")
     try:
-        total_items = db.query(InternetPlan).count()
-        plans = db.query(InternetPlan).offset((page - 1) * size).limit(size).all()
+        # Se sirve desde el catálogo en memoria: sin consultas a la BD.
+        if not plan_catalogue.loaded:
+            await run_in_threadpool(plan_catalogue.reload)
+        conditional.check(
+            version=f"plans:{plan_catalogue.version}:{page}:{size}",
+            last_modified=plan_catalogue.last_modified,
+            cache_control=f"public, max-age={PLANS_CACHE_MAX_AGE}",
+        )
+        total_items, plans = plan_catalogue.page(page, size)
         return PaginatedResponse(
             total_items=total_items,
             total_pages=math.ceil(total_items / size),
             current_page=page,
             items=plans,
         )
+    except NotModifiedException:
+        raise
     except Exception as e:
         logger.error(f"Error en get_all_plans: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Error interno del servidor.")
@@ -96,8 +121,12 @@ def update_plan(plan_id: int, plan_data: UpdatePlan, db: Session = Depends(get_d
         for key, value in update_data.items():
             setattr(plan, key, value)
 
+        publish_plan_change(db, plan.id)
+        # Las suscripciones en caché incluyen los datos del plan.
+        invalidate_tags(db, "subscriptions")
         db.commit()
         db.refresh(plan)
+        plan_catalogue.upsert(plan)
         return {"message": "Plan actualizado.", "plan": PlanOut.model_validate(plan)}
     except Exception as e:
         db.rollback()
@@ -124,7 +153,9 @@ def delete_plan(plan_id: int, db: Session = Depends(get_db)):
             )
 
         db.delete(plan)
+        publish_plan_change(db, plan_id)
         db.commit()
+        plan_catalogue.remove(plan_id)
         return {"message": f"Plan con ID {plan_id} eliminado."}
     except Exception as e:
         db.rollback()
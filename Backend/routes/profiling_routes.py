@@ -0,0 +1,57 @@
+# routes/profiling_routes.py
+import logging
+import datetime
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, status, Header
+from fastapi.responses import FileResponse
+from pydantic import BaseModel
+
+from auth.security import Security
+from core.profiling import PROFILING_ENABLED, list_profiles, profile_path
+
+logger = logging.getLogger(__name__)
+profiling_router = APIRouter(prefix="/admin/profiles", tags=["Admin"])
+
+
+class ProfileOut(BaseModel):
+    name: str
+    size_bytes: int
+    created_at: datetime.datetime
+
+
+class ProfileIndex(BaseModel):
+    enabled: bool
+    profiles: List[ProfileOut]
+
+
+def verify_admin_permission(authorization: str = Header(...)):
+    """Verifica que el token en la cabecera pertenezca a un administrador."""
+    token_data = Security.verify_token({"authorization": authorization})
+    if not token_data.get("success") or token_data.get("role") != "administrador":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="No tienes permisos de administrador para realizar esta acción.",
+        )
+    return token_data
+
+
+@profiling_router.get(
+    "",
+    response_model=ProfileIndex,
+    summary="Listar los perfiles de peticiones capturados",
+    dependencies=[Depends(verify_admin_permission)],
+)
+def get_profiles():
+    return ProfileIndex(enabled=PROFILING_ENABLED, profiles=list_profiles())
+
+
+@profiling_router.get(
+    "/{name}",
+    summary="Descargar un perfil (.prof para pstats/snakeviz, .collapsed para flamegraph)",
+    dependencies=[Depends(verify_admin_permission)],
+)
+def download_profile(name: str):
+    path = profile_path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Perfil no encontrado.")
+    return FileResponse(path, media_type="application/octet-stream", filename=name)
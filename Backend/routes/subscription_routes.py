@@ -1,7 +1,7 @@
 # routes/subscription_routes.py
 import logging
 from fastapi import APIRouter, Depends, HTTPException, status, Header
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.orm import Session
 from pydantic import BaseModel
 
 # --- INICIO DE LA CORRECCIÓN DE IMPORTACIONES ---
@@ -12,6 +12,8 @@ from models.models import Subscription, InputSubscription, User
 
 from auth.security import Security
 from config.db import get_db
+from core.cache import invalidate_tags
+from services import client_service
 
 logger = logging.getLogger(__name__)
 subscription_router = APIRouter()
@@ -50,9 +52,12 @@ def assign_plan_to_user(sub_data: InputSubscription, db: Session = Depends(get_d
             )
 
         new_subscription = Subscription(
-            user_id=sub_data.user_id, plan_id=sub_data.plan_id
+            user_id=sub_data.user_id,
+            plan_id=sub_data.plan_id,
+            billing_day=sub_data.billing_day,
         )
         db.add(new_subscription)
+        invalidate_tags(db, f"user:{sub_data.user_id}", "subscriptions")
         db.commit()
         return {"message": "Plan asignado al cliente exitosamente."}
     except Exception as e:
@@ -91,6 +96,7 @@ def update_subscription_status(
         )
 
     subscription.status = update_data.status
+    invalidate_tags(db, f"user:{subscription.user_id}", "subscriptions")
     db.commit()
 
     return {
@@ -123,13 +129,8 @@ def get_user_subscriptions(
             detail="No tienes permiso para ver estas suscripciones.",
         )
 
-    user = (
-        db.query(User)
-        .options(joinedload(User.subscriptions).joinedload(Subscription.plan))
-        .filter_by(id=user_id)
-        .first()
-    )
-    if not user:
+    subscriptions = client_service.get_user_subscriptions(db, user_id)
+    if subscriptions is None:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
 
-    return user.subscriptions
+    return subscriptions
@@ -0,0 +1,65 @@
+# routes/system_routes.py
+import logging
+import os
+import secrets
+from fastapi import APIRouter, Header, HTTPException, status
+from fastapi.responses import JSONResponse, PlainTextResponse
+from sqlalchemy import text
+
+from config.db import engine, get_pool_stats, DB_POOL_SATURATION_LIMIT
+from core.metrics import collect, render_prometheus
+
+logger = logging.getLogger(__name__)
+system_router = APIRouter(tags=["Sistema"])
+
+# Si se define, /metrics exige "Authorization: Bearer <METRICS_TOKEN>".
+METRICS_TOKEN = os.getenv("METRICS_TOKEN") or None
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@system_router.get("/health/live", summary="Verifica que el proceso responde")
+def liveness():
+    return {"status": "ok"}
+
+
+@system_router.get(
+    "/health/ready", summary="Verifica la base de datos y la saturación del pool"
+)
+def readiness():
+    pool = get_pool_stats()
+    if pool["saturation"] >= DB_POOL_SATURATION_LIMIT:
+        # Con algún pool saturado no intentamos conectar: solo esperaríamos al timeout.
+        logger.warning(f"Pool de conexiones saturado: {pool}")
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"status": "saturated", "database": "unknown", "pool": pool},
+        )
+
+    try:
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+    except Exception as e:
+        logger.error(f"La base de datos no responde: {e}")
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"status": "unavailable", "database": "error", "pool": pool},
+        )
+
+    return {"status": "ready", "database": "ok", "pool": get_pool_stats()}
+
+
+@system_router.get(
+    "/metrics",
+    summary="Métricas en formato de texto de Prometheus",
+    response_class=PlainTextResponse,
+)
+def metrics(authorization: str | None = Header(None)):
+    if METRICS_TOKEN and not secrets.compare_digest(
+        authorization or "", f"Bearer {METRICS_TOKEN}"
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Token inválido."
+        )
+    return PlainTextResponse(
+        render_prometheus(collect()), media_type=PROMETHEUS_CONTENT_TYPE
+    )
@@ -2,16 +2,25 @@
 import logging
 from fastapi import APIRouter, Depends, HTTPException, status, Header
 from fastapi.responses import JSONResponse
+from sqlalchemy import select
 from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
 
 # Modelos de la DB y de ENTRADA
-from models.models import User, InputLogin, UpdateMyDetails, UpdateMyPassword
+from models.models import (
+    User,
+    UserDetail,
+    InputLogin,
+    UpdateMyDetails,
+    UpdateMyPassword,
+)
 
 # Modelos de RESPUESTA (schemas)
 from schemas.user_schemas import UserOut
 
 from auth.security import Security
-from config.db import get_db
+from config.db import get_db, get_async_db
+from core.conditional import ConditionalRequest, conditional_request
 
 logger = logging.getLogger(__name__)
 user_router = APIRouter()
@@ -86,7 +95,11 @@ def login(user_credentials: InputLogin, db: Session = Depends(get_db)):
 
 
 @user_router.get("/users/me", response_model=UserOut, tags=["Cliente"])
-def get_my_profile(authorization: str = Header(...), db: Session = Depends(get_db)):
+async def get_my_profile(
+    authorization: str = Header(...),
+    db: AsyncSession = Depends(get_async_db),
+    conditional: ConditionalRequest = Depends(conditional_request),
+):
     token_data = Security.verify_token({"authorization": authorization})
     if not token_data.get("success"):
         raise HTTPException(
@@ -101,12 +114,28 @@ def get_my_profile(authorization: str = Header(...), db: Session = Depends(get_d
         )
 
     logger.info(f"Usuario ID {user_id} solicitando su perfil.")
-    user = (
-        db.query(User)
-        .options(joinedload(User.userdetail))
-        .filter(User.id == user_id)
-        .first()
+    # Primero solo las marcas de versión: si el cliente tiene la copia vigente,
+    # se responde 304 sin cargar ni serializar el perfil.
+    version = (
+        await db.execute(
+            select(User.updated_at, UserDetail.updated_at)
+            .join(UserDetail, User.id_userdetail == UserDetail.id)
+            .where(User.id == user_id)
+        )
+    ).first()
+    if not version:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Usuario no encontrado."
+        )
+    conditional.check(
+        version=f"user:{user_id}:{version[0]}:{version[1]}",
+        last_modified=max(filter(None, version), default=None),
+    )
+
+    result = await db.execute(
+        select(User).options(joinedload(User.userdetail)).where(User.id == user_id)
     )
+    user = result.scalars().first()
 
     if not user or not user.userdetail:
         raise HTTPException(
@@ -116,6 +145,7 @@ def get_my_profile(authorization: str = Header(...), db: Session = Depends(get_d
     # --- INICIO DE LA CORRECCIÓN CLAVE ---
     # Construimos la respuesta manualmente para que Pydantic no falle.
     return UserOut(
+        id=user.id,
         username=user.username,
         email=user.email,
         dni=user.userdetail.dni,
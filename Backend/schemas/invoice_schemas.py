@@ -1,7 +1,10 @@
 # schemas/invoice_schemas.py
-from pydantic import BaseModel, ConfigDict
+from typing import Literal
+from pydantic import BaseModel, ConfigDict, Field, computed_field, field_validator
 import datetime
 
+from auth.signed_urls import sign_file_url
+
 
 class UserBasicInfo(BaseModel):
     """Schema para devolver información básica de un usuario anidado."""
@@ -26,6 +29,18 @@ class InvoiceOut(BaseModel):
     user_receipt_url: str | None = None
     model_config = ConfigDict(from_attributes=True)
 
+    # URLs firmadas y con vencimiento: se generan al serializar, así que una
+    # respuesta guardada en la caché de consultas no entrega URLs vencidas.
+    @computed_field
+    @property
+    def receipt_download_url(self) -> str | None:
+        return sign_file_url(self.receipt_pdf_url)
+
+    @computed_field
+    @property
+    def user_receipt_download_url(self) -> str | None:
+        return sign_file_url(self.user_receipt_url)
+
 
 class InvoiceAdminOut(InvoiceOut):
     """Schema de respuesta para facturas en el panel de admin, incluye datos del usuario."""
@@ -38,3 +53,56 @@ class UpdateInvoiceStatus(BaseModel):
     """Schema para recibir el nuevo estado de una factura."""
 
     status: str
+
+
+class ReviewQueueItem(BaseModel):
+    """Factura en la cola de revisión de comprobantes, con su cliente y vista previa."""
+
+    id: int
+    user_id: int
+    issue_date: datetime.datetime
+    due_date: datetime.datetime
+    total_amount: float
+    status: str
+    submitted_at: datetime.datetime | None = None
+    receipt_url: str | None = None
+    preview_url: str
+    thumbnail_url: str | None = None
+    user: UserBasicInfo
+
+
+class ReviewDecision(BaseModel):
+    """Decisión del administrador sobre el comprobante de una factura."""
+
+    invoice_id: int
+    action: Literal["approve", "reject"]
+    payment_method: str = Field("Transferencia", max_length=50)
+    reason: str | None = Field(None, max_length=500)
+
+
+class ReviewBatch(BaseModel):
+    """Lote de decisiones que se aplica en una sola transacción."""
+
+    decisions: list[ReviewDecision] = Field(..., min_length=1, max_length=200)
+
+    @field_validator("decisions")
+    @classmethod
+    def unique_invoices(cls, decisions):
+        ids = [decision.invoice_id for decision in decisions]
+        if len(ids) != len(set(ids)):
+            raise ValueError("Cada factura puede aparecer una sola vez en el lote.")
+        return decisions
+
+
+class ReviewSkipped(BaseModel):
+    invoice_id: int
+    reason: str
+
+
+class ReviewBatchResult(BaseModel):
+    """Resultado del lote: facturas aprobadas (con su pago), rechazadas y omitidas."""
+
+    approved: list[int]
+    rejected: list[int]
+    payment_ids: list[int]
+    skipped: list[ReviewSkipped]
@@ -0,0 +1,37 @@
+# schemas/job_schemas.py
+import datetime
+from typing import Any, List, Optional
+
+from pydantic import BaseModel
+
+
+class JobRunOut(BaseModel):
+    id: int
+    job_name: str
+    trigger: str
+    slot: Optional[datetime.datetime] = None
+    status: str
+    started_at: datetime.datetime
+    finished_at: Optional[datetime.datetime] = None
+    rows: Optional[int] = None
+    result: Optional[dict[str, Any]] = None
+    error: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+
+class JobOut(BaseModel):
+    name: str
+    description: str
+    next_run_time: Optional[datetime.datetime] = None
+    last_run: Optional[JobRunOut] = None
+
+
+class JobTriggered(BaseModel):
+    message: str
+    run_id: int
+
+
+class JobIndex(BaseModel):
+    jobs: List[JobOut]
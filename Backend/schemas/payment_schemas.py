@@ -1,5 +1,6 @@
 # schemas/payment_schemas.py
-from pydantic import BaseModel, ConfigDict
+from typing import Literal
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 import datetime
 
 
@@ -40,3 +41,76 @@ class PaymentAdminOut(BaseModel):
     user: UserInfo
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class BankLineMatch(BaseModel):
+    """Una transferencia del extracto y la factura que se le propone."""
+
+    line: int
+    date: datetime.date
+    amount: float
+    reference: str
+    dni: int | None = None
+    fit_id: str | None = None
+    status: Literal["matched", "ambiguous", "unmatched"]
+    match_by: Literal["referencia", "dni", "monto"] | None = None
+    invoice_id: int | None = None
+    candidates: list[int]
+    reason: str | None = None
+
+
+class BankImportSummary(BaseModel):
+    transactions: int
+    matched: int
+    ambiguous: int
+    unmatched: int
+    invalid: int
+
+
+class BankLineError(BaseModel):
+    line: int
+    reason: str
+
+
+class BankImportPreview(BaseModel):
+    """Vista previa de la conciliación: no se registra ningún pago."""
+
+    summary: BankImportSummary
+    lines: list[BankLineMatch]
+    errors: list[BankLineError]
+
+
+class BankPaymentIn(BaseModel):
+    """Transferencia confirmada por el administrador para una factura."""
+
+    invoice_id: int
+    amount: float = Field(..., gt=0)
+    payment_date: datetime.date
+
+
+class BankImportCommit(BaseModel):
+    """Pagos confirmados de un extracto; se registran en una sola transacción."""
+
+    payments: list[BankPaymentIn] = Field(..., min_length=1, max_length=5000)
+    payment_method: str = Field("Transferencia", max_length=50)
+
+    @field_validator("payments")
+    @classmethod
+    def unique_invoices(cls, payments):
+        ids = [payment.invoice_id for payment in payments]
+        if len(ids) != len(set(ids)):
+            raise ValueError(
+                "Cada factura puede aparecer una sola vez en la importación."
+            )
+        return payments
+
+
+class BankImportSkipped(BaseModel):
+    invoice_id: int
+    reason: str
+
+
+class BankImportResult(BaseModel):
+    created: int
+    payment_ids: list[int]
+    skipped: list[BankImportSkipped]
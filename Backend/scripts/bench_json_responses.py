@@ -0,0 +1,110 @@
+# scripts/bench_json_responses.py
+# -----------------------------------------------------------------------------
+# Benchmark: serialización de una página de 100 facturas del panel de admin.
+#
+# Compara el camino por defecto de FastAPI (schemas validados al construirlos,
+# revalidación por response_model, jsonable_encoder y json.dumps) con el modo
+# FAST_JSON_RESPONSES (model_construct + TypeAdapter.dump_json en una pasada).
+# No necesita base de datos.
+#
+# Uso:
+#   python scripts/bench_json_responses.py --items 100 --iterations 2000
+# -----------------------------------------------------------------------------
+import argparse
+import datetime
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from schemas.common_schemas import PaginatedResponse
+from schemas.invoice_schemas import InvoiceAdminOut, UserBasicInfo
+
+
+def make_rows(count: int) -> list:
+    now = datetime.datetime.now()
+    return [
+        {
+            "id": i,
+            "issue_date": now,
+            "due_date": now + datetime.timedelta(days=15),
+            "base_amount": 6000.0,
+            "late_fee": 0.0,
+            "total_amount": 6000.0,
+            "status": "Pendiente",
+            "receipt_pdf_url": None,
+            "user_receipt_url": f"uploads/user_receipts/2025/07/user_receipt_{i}.jpg",
+            "username": f"cliente{i}",
+            "firstname": "Nombre",
+            "lastname": f"Apellido{i}",
+        }
+        for i in range(count)
+    ]
+
+
+def split_user(row: dict) -> tuple:
+    data = dict(row)
+    user = {k: data.pop(k) for k in ("username", "firstname", "lastname")}
+    return data, user
+
+
+def default_path(rows: list, adapter: TypeAdapter) -> bytes:
+    items = []
+    for row in rows:
+        data, user = split_user(row)
+        items.append(InvoiceAdminOut(**data, user=UserBasicInfo(**user)))
+    page = PaginatedResponse[InvoiceAdminOut](
+        total_items=len(rows), total_pages=1, current_page=1, items=items
+    )
+    # Lo que hace FastAPI con response_model: volcar, revalidar y codificar.
+    validated = adapter.validate_python(page.model_dump())
+    content = jsonable_encoder(adapter.dump_python(validated, mode="json"))
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def fast_path(rows: list, adapter: TypeAdapter) -> bytes:
+    items = []
+    for row in rows:
+        data, user = split_user(row)
+        items.append(
+            InvoiceAdminOut.model_construct(
+                **data, user=UserBasicInfo.model_construct(**user)
+            )
+        )
+    page = PaginatedResponse[InvoiceAdminOut].model_construct(
+        total_items=len(rows), total_pages=1, current_page=1, items=items
+    )
+    return adapter.dump_json(page)
+
+
+def measure(label: str, func, rows: list, adapter: TypeAdapter, iterations: int):
+    body = func(rows, adapter)  # calentamiento
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func(rows, adapter)
+    elapsed = time.perf_counter() - start
+    print(
+        f"{label:<10} {elapsed / iterations * 1000:8.3f} ms/página  "
+        f"{len(body):7d} bytes"
+    )
+    return elapsed
+
+
+def main(args):
+    rows = make_rows(args.items)
+    adapter = TypeAdapter(PaginatedResponse[InvoiceAdminOut])
+    slow = measure("default", default_path, rows, adapter, args.iterations)
+    fast = measure("rápido", fast_path, rows, adapter, args.iterations)
+    print(f"aceleración: x{slow / fast:.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=100)
+    parser.add_argument("--iterations", type=int, default=2000)
+    main(parser.parse_args())
@@ -0,0 +1,136 @@
+# scripts/bench_list_projection.py
+# -----------------------------------------------------------------------------
+# Micro-benchmark: carga de entidades ORM vs proyección de columnas.
+#
+# Reproduce el listado de clientes del panel de admin (size=100) de las dos
+# formas: la anterior (entidades User + UserDetail con joinedload y copia
+# manual de campos) y la actual (select() de columnas). Se mide solo la carga
+# de filas: la construcción de UserOut (validación de EmailStr incluida) cuesta
+# lo mismo en ambos casos. Usa una base SQLite en memoria para que solo se
+# mida el costo del lado Python.
+#
+# Uso:
+#   python scripts/bench_list_projection.py --rows 100 --iterations 500
+# -----------------------------------------------------------------------------
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session, joinedload
+
+from config.db import Base
+from models.models import User, UserDetail
+
+
+def seed(session: Session, rows: int):
+    for i in range(rows):
+        user = User(
+            username=f"cliente{i}",
+            password="$2b$12$" + "x" * 53,
+            email=f"cliente{i}@example.com",
+        )
+        user.refresh_token = "r" * 200
+        user.userdetail = UserDetail(
+            dni=30000000 + i,
+            firstname="Nombre",
+            lastname=f"Apellido{i}",
+            address="Calle Falsa 123",
+            city="Springfield",
+            phone="11-5555-0000",
+        )
+        session.add(user)
+    session.commit()
+
+
+def load_entities(session: Session, size: int) -> list:
+    users = (
+        session.query(User)
+        .join(User.userdetail)
+        .filter(UserDetail.type == "cliente")
+        .options(joinedload(User.userdetail))
+        .limit(size)
+        .all()
+    )
+    items = [
+        dict(
+            id=u.id,
+            username=u.username,
+            email=u.email,
+            dni=u.userdetail.dni,
+            firstname=u.userdetail.firstname,
+            lastname=u.userdetail.lastname,
+            address=u.userdetail.address,
+            barrio=u.userdetail.barrio,
+            city=u.userdetail.city,
+            phone=u.userdetail.phone,
+            phone2=u.userdetail.phone2,
+            role=u.userdetail.type,
+        )
+        for u in users
+    ]
+    session.expunge_all()
+    return items
+
+
+def load_projection(session: Session, size: int) -> list:
+    query = (
+        select(
+            User.id,
+            User.username,
+            User.email,
+            UserDetail.dni,
+            UserDetail.firstname,
+            UserDetail.lastname,
+            UserDetail.address,
+            UserDetail.barrio,
+            UserDetail.city,
+            UserDetail.phone,
+            UserDetail.phone2,
+            UserDetail.type.label("role"),
+        )
+        .join(UserDetail, User.id_userdetail == UserDetail.id)
+        .where(UserDetail.type == "cliente")
+        .limit(size)
+    )
+    return [dict(row) for row in session.execute(query).mappings()]
+
+
+def measure(label, func, session, rows, iterations):
+    func(session, rows)  # calentamiento
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func(session, rows)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    func(session, rows)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    per_row_us = elapsed / (iterations * rows) * 1_000_000
+    print(
+        f"{label:<12} {elapsed / iterations * 1000:8.2f} ms/página  "
+        f"{per_row_us:7.1f} µs/fila  pico memoria {peak / 1024:8.1f} KiB"
+    )
+
+
+def main(args):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        seed(session, args.rows)
+    with Session(engine) as session:
+        measure("entidades", load_entities, session, args.rows, args.iterations)
+        measure("proyección", load_projection, session, args.rows, args.iterations)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--iterations", type=int, default=500)
+    main(parser.parse_args())
@@ -0,0 +1,127 @@
+# scripts/check_blob_store.py
+# -----------------------------------------------------------------------------
+# Verifica el backend S3 del almacén de archivos (services/blob_store.py)
+# contra un servicio compatible: put, exists, link_to, iter_blobs y el GC
+# (collect_garbage) sobre la base de datos.
+#
+# Con BLOB_S3_ENDPOINT_URL usa ese endpoint (p. ej. un MinIO local) y el bucket
+# de BLOB_S3_BUCKET, que debe existir. Sin endpoint levanta un servidor S3 en
+# memoria con moto (pip install "moto[server]"), así no hace falta AWS.
+# Trabaja bajo un prefijo propio del bucket y borra lo que crea, pero el GC
+# corre con margen 0: no usar contra la base de producción. Necesita la base
+# de datos configurada en .env.
+#
+# Uso:
+#   python scripts/check_blob_store.py
+#   BLOB_S3_ENDPOINT_URL=http://localhost:9000 BLOB_S3_BUCKET=upl \
+#       python scripts/check_blob_store.py
+# -----------------------------------------------------------------------------
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def check(condition: bool, message: str):
+    print(f"  {'ok' if condition else 'FALLO'}: {message}")
+    if not condition:
+        sys.exit(1)
+
+
+def start_moto():
+    from moto.server import ThreadedMotoServer
+
+    for name, value in (
+        ("AWS_ACCESS_KEY_ID", "testing"),
+        ("AWS_SECRET_ACCESS_KEY", "testing"),
+        ("AWS_DEFAULT_REGION", "us-east-1"),
+    ):
+        os.environ.setdefault(name, value)
+    server = ThreadedMotoServer(ip_address="127.0.0.1", port=0, verbose=False)
+    server.start()
+    host, port = server.get_host_and_port()
+    return server, f"http://{host}:{port}"
+
+
+def write_file(directory: str, content: bytes) -> tuple[str, str]:
+    path = os.path.join(directory, f"{uuid.uuid4().hex}.bin")
+    with open(path, "wb") as f:
+        f.write(content)
+    return path, hashlib.sha256(content).hexdigest()
+
+
+def main():
+    endpoint_url = os.getenv("BLOB_S3_ENDPOINT_URL") or None
+    bucket = os.getenv("BLOB_S3_BUCKET") or "upl-blob-check"
+    server = None
+    if endpoint_url is None:
+        server, endpoint_url = start_moto()
+
+    from sqlalchemy import delete
+
+    from config.db import SessionLocal
+    from models.models import Attachment, Blob
+    from services import blob_store
+
+    prefix = f"check-{uuid.uuid4().hex[:8]}/"
+    backend = blob_store.S3BlobBackend(bucket, prefix, endpoint_url)
+    if server is not None:
+        backend.client.create_bucket(Bucket=bucket)
+    # El GC usa get_backend() y el margen del módulo.
+    blob_store._backend = backend
+    blob_store.BLOB_GC_GRACE_HOURS = 0
+    workdir = tempfile.mkdtemp(prefix="blob_check_")
+    print(f"Endpoint {endpoint_url}, bucket '{bucket}', prefijo '{prefix}'")
+
+    db = SessionLocal()
+    try:
+        print("put / exists / link_to / iter_blobs:")
+        source, sha256 = write_file(workdir, b"comprobante de prueba " * 100)
+        check(not backend.exists(sha256), "el blob no existe antes de put")
+        backend.put(sha256, source)
+        check(backend.exists(sha256), "exists después de put")
+        copy = os.path.join(workdir, "copia", "recibo.bin")
+        backend.link_to(sha256, copy)
+        with open(source, "rb") as a, open(copy, "rb") as b:
+            check(a.read() == b.read(), "link_to descarga el mismo contenido")
+        listed = dict(backend.iter_blobs())
+        check(sha256 in listed, "iter_blobs lista el blob")
+        check(listed[sha256].tzinfo is None, "iter_blobs devuelve fechas locales")
+        backend.delete(sha256)
+        check(not backend.exists(sha256), "delete lo quita del bucket")
+
+        print("store_file / collect_garbage:")
+        orphan_path, orphan_sha = write_file(workdir, b"adjunto huerfano " * 100)
+        blob_store.store_file(db, orphan_path, "receipt", invoice_id=None)
+        db.commit()
+        check(backend.exists(orphan_sha), "store_file sube el blob")
+        stray_path, stray_sha = write_file(workdir, b"blob sin fila " * 100)
+        backend.put(stray_sha, stray_path)
+
+        result = blob_store.collect_garbage(db)
+        print(f"  resultado: {result}")
+        check(not os.path.exists(orphan_path), "el GC borra el archivo huérfano")
+        check(not backend.exists(orphan_sha), "el GC borra el blob sin adjuntos")
+        check(db.get(Blob, orphan_sha) is None, "el GC borra la fila del blob")
+        check(not backend.exists(stray_sha), "el GC borra el blob sin fila")
+    finally:
+        # Por si la verificación se cortó a mitad de camino.
+        db.rollback()
+        for sha256, _ in backend.iter_blobs():
+            backend.delete(sha256)
+            db.execute(delete(Attachment).where(Attachment.blob_sha256 == sha256))
+            db.execute(delete(Blob).where(Blob.sha256 == sha256))
+        db.commit()
+        db.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+        if server is not None:
+            server.stop()
+    print("OK: backend S3 verificado.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# scripts/check_job_cluster.py
+# -----------------------------------------------------------------------------
+# Verifica que una tarea programada se ejecute una sola vez por turno aunque
+# la disparen varios procesos a la vez (uvicorn --workers N, varios pods).
+#
+# Lanza N procesos que reclaman el mismo turno de una tarea de prueba con
+# job_runner.claim_run, igual que run_scheduled en cada worker: la mitad al
+# mismo tiempo y la otra mitad cuando la primera ejecución ya terminó (un
+# worker que despierta tarde). Al final cuenta las filas de job_runs del turno
+# y las borra. Necesita la base de datos configurada en .env.
+#
+# Uso:
+#   python scripts/check_job_cluster.py --workers 8
+# -----------------------------------------------------------------------------
+import argparse
+import datetime
+import multiprocessing
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+JOB_NAME = "cluster_check"
+
+
+def slow_job(db):
+    time.sleep(0.5)
+    return {"message": "ok", "pid": os.getpid()}
+
+
+def worker(slot, barrier, late: bool, results):
+    from services import job_runner
+
+    job_runner.register_job(JOB_NAME, slow_job, "Prueba de ejecución única")
+    barrier.wait()
+    if late:
+        # Despierta cuando la primera ejecución ya liberó el advisory lock.
+        time.sleep(1.5)
+    claimed = job_runner.claim_run(JOB_NAME, trigger="schedule", slot=slot)
+    if claimed is None:
+        results.put((os.getpid(), "omitida"))
+        return
+    run_id, lock_conn = claimed
+    job_runner.execute_run(run_id, JOB_NAME, lock_conn)
+    results.put((os.getpid(), f"ejecutada (run {run_id})"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    from sqlalchemy import delete, select
+
+    from config.db import Base, SessionLocal, engine
+    from config.schema_upgrades import apply_schema_upgrades
+    from models.models import JobRun
+
+    Base.metadata.create_all(bind=engine)
+    apply_schema_upgrades(engine)
+
+    slot = datetime.datetime.now().replace(second=0, microsecond=0)
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(args.workers)
+    results = context.Queue()
+    processes = [
+        context.Process(target=worker, args=(slot, barrier, i % 2 == 1, results))
+        for i in range(args.workers)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    for _ in processes:
+        pid, outcome = results.get()
+        print(f"  proceso {pid}: {outcome}")
+
+    with SessionLocal() as db:
+        runs = db.scalars(
+            select(JobRun).where(JobRun.job_name == JOB_NAME, JobRun.slot == slot)
+        ).all()
+        statuses = [run.status for run in runs]
+        db.execute(delete(JobRun).where(JobRun.job_name == JOB_NAME))
+        db.commit()
+
+    print(f"Ejecuciones del turno {slot:%Y-%m-%d %H:%M}: {len(runs)} {statuses}")
+    if len(runs) != 1 or statuses != ["ok"]:
+        print("ERROR: se esperaba exactamente una ejecución correcta.")
+        sys.exit(1)
+    print("OK: una sola ejecución en todo el cluster.")
+
+
+if __name__ == "__main__":
+    main()
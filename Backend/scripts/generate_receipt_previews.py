@@ -0,0 +1,40 @@
+# scripts/generate_receipt_previews.py
+# -----------------------------------------------------------------------------
+# Genera la vista previa y la miniatura (utils/receipt_previews.py) de los
+# comprobantes de imagen subidos antes de que existiera ese paso.
+#
+# Uso:
+#   python scripts/generate_receipt_previews.py [--force]
+# -----------------------------------------------------------------------------
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.receipt_previews import generate_previews, is_image, variant_paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--folder", default="uploads")
+    parser.add_argument(
+        "--force", action="store_true", help="Regenerar aunque ya existan."
+    )
+    args = parser.parse_args()
+
+    generated = 0
+    for dirpath, _, filenames in os.walk(args.folder):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            if name.startswith(".") or not is_image(path):
+                continue
+            if not args.force and all(os.path.exists(p) for p in variant_paths(path)):
+                continue
+            generate_previews(path)
+            generated += 1
+    print(f"Comprobantes procesados: {generated}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# scripts/load_test_read_endpoints.py
+# -----------------------------------------------------------------------------
+# Prueba de carga para las rutas de lectura asíncronas.
+#
+# Lanza N peticiones concurrentes contra cada endpoint y reporta throughput y
+# latencias (p50/p99). Sirve para comparar la versión síncrona (threadpool)
+# con la asíncrona: a igual p99, la versión async debe soportar más concurrencia.
+#
+# Uso:
+#   python scripts/load_test_read_endpoints.py --token <JWT> --user-id 2 \
+#       --concurrency 10 50 100 --requests 1000
+# -----------------------------------------------------------------------------
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run_endpoint(client, url, headers, concurrency, total_requests):
+    latencies, errors = [], 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one_request():
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                response = await client.get(url, headers=headers)
+                if response.status_code != 200:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one_request() for _ in range(total_requests)))
+    elapsed = time.perf_counter() - start
+    return {
+        "rps": total_requests / elapsed,
+        "p50": statistics.median(latencies) * 1000,
+        "p99": percentile(latencies, 99) * 1000,
+        "errors": errors,
+    }
+
+
+async def main(args):
+    headers = {"Authorization": f"Bearer {args.token}"} if args.token else {}
+    endpoints = [
+        "/api/plans/all",
+        "/api/users/me",
+        "/api/users/me/invoices",
+        f"/api/payments/user/{args.user_id}",
+    ]
+    limits = httpx.Limits(max_connections=max(args.concurrency))
+    async with httpx.AsyncClient(
+        base_url=args.base_url, limits=limits, timeout=30
+    ) as client:
+        for path in endpoints:
+            for concurrency in args.concurrency:
+                result = await run_endpoint(
+                    client, path, headers, concurrency, args.requests
+                )
+                print(
+                    f"{path:<32} c={concurrency:<4} "
+                    f"rps={result['rps']:8.1f}  p50={result['p50']:7.1f}ms  "
+                    f"p99={result['p99']:7.1f}ms  errores={result['errors']}"
+                )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--token", default="", help="JWT de un usuario cliente")
+    parser.add_argument("--user-id", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 50, 100])
+    parser.add_argument("--requests", type=int, default=500)
+    asyncio.run(main(parser.parse_args()))
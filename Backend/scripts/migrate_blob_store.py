@@ -0,0 +1,99 @@
+# scripts/migrate_blob_store.py
+# -----------------------------------------------------------------------------
+# Pasa al almacén por contenido (services/blob_store.py) los comprobantes y
+# PDFs que ya existían antes de que las subidas lo usaran.
+#
+# 1. Cada archivo referenciado por una factura (receipt_pdf_url,
+#    user_receipt_url) se guarda como blob y se registra su adjunto.
+# 2. Con --dedup-unreferenced, los demás archivos de uploads/ y facturas/
+#    cuyo contenido ya es un blob se reemplazan por un hard link (no se les
+#    crea adjunto, así el GC nunca los borra).
+#
+# Es idempotente: las rutas que ya tienen adjunto se omiten.
+#
+# Uso:
+#   python scripts/migrate_blob_store.py [--dedup-unreferenced]
+# -----------------------------------------------------------------------------
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select
+
+from config.db import Base, SessionLocal, engine
+from models.models import Attachment, Blob, Invoice
+from services import blob_store
+
+PUBLIC_DIRS = ("uploads", "facturas")
+
+
+def resolve(url: str) -> str | None:
+    # Los PDFs generados se guardan relativos a facturas/.
+    for candidate in (url, os.path.join("facturas", url)):
+        if os.path.isfile(candidate):
+            return candidate.replace("\\", "/")
+    return None
+
+
+def migrate_referenced(db) -> int:
+    known_paths = set(db.scalars(select(Attachment.path)).all())
+    stored = 0
+    rows = db.execute(
+        select(Invoice.id, Invoice.receipt_pdf_url, Invoice.user_receipt_url)
+    ).all()
+    for invoice_id, receipt_url, user_receipt_url in rows:
+        for url, kind in ((receipt_url, None), (user_receipt_url, "user_receipt")):
+            path = resolve(url) if url else None
+            if path is None or path in known_paths:
+                continue
+            if kind is None:
+                kind = "invoice_pdf" if path.startswith("facturas/") else "receipt"
+            if blob_store.store_file(db, path, kind, invoice_id=invoice_id):
+                known_paths.add(path)
+                stored += 1
+        db.commit()
+    return stored
+
+
+def dedup_unreferenced(db) -> tuple[int, int]:
+    known_paths = set(db.scalars(select(Attachment.path)).all())
+    known_blobs = set(db.scalars(select(Blob.sha256)).all())
+    backend = blob_store.get_backend()
+    linked, saved = 0, 0
+    for folder in PUBLIC_DIRS:
+        for dirpath, _, filenames in os.walk(folder):
+            for name in filenames:
+                path = os.path.join(dirpath, name).replace("\\", "/")
+                if path in known_paths or name.startswith("."):
+                    continue
+                sha256 = blob_store.file_sha256(path)
+                if sha256 in known_blobs and os.stat(path).st_nlink == 1:
+                    size = os.path.getsize(path)
+                    backend.link_to(sha256, path)
+                    if os.stat(path).st_nlink > 1:
+                        linked += 1
+                        saved += size
+    return linked, saved
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--dedup-unreferenced", action="store_true")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        stored = migrate_referenced(db)
+        print(f"Archivos referenciados guardados en el almacén: {stored}")
+        if args.dedup_unreferenced:
+            linked, saved = dedup_unreferenced(db)
+            print(
+                f"Archivos sin referencia deduplicados: {linked} "
+                f"({saved / 1024:.1f} KB liberados)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# scripts/precompress_static.py
+# -----------------------------------------------------------------------------
+# Genera variantes precomprimidas (.br y .gz) de los archivos estáticos.
+#
+# PrecompressedStaticFiles (core/compression.py) sirve estas variantes cuando
+# el cliente las acepta, sin comprimir en cada petición. Solo se guarda una
+# variante si ahorra al menos --min-saving del tamaño original.
+#
+# Uso:
+#   python scripts/precompress_static.py facturas uploads --min-saving 0.1
+# -----------------------------------------------------------------------------
+import argparse
+import gzip
+import os
+
+import brotli
+
+DEFAULT_EXTENSIONS = [".pdf", ".json", ".html", ".css", ".js", ".svg", ".txt"]
+
+
+def precompress_file(path: str, min_saving: float) -> int:
+    with open(path, "rb") as f:
+        data = f.read()
+    saved = 0
+    variants = (
+        (".br", lambda d: brotli.compress(d, quality=11)),
+        (".gz", lambda d: gzip.compress(d, compresslevel=9)),
+    )
+    for suffix, compress in variants:
+        target = path + suffix
+        if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(
+            path
+        ):
+            continue
+        compressed = compress(data)
+        if len(compressed) > len(data) * (1 - min_saving):
+            continue
+        tmp_path = target + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(compressed)
+        os.replace(tmp_path, target)
+        saved += len(data) - len(compressed)
+    return saved
+
+
+def main(args):
+    total_saved, total_files = 0, 0
+    for directory in args.directories:
+        for root, _, files in os.walk(directory):
+            for name in files:
+                if os.path.splitext(name)[1].lower() not in args.extensions:
+                    continue
+                total_saved += precompress_file(
+                    os.path.join(root, name), args.min_saving
+                )
+                total_files += 1
+    print(f"{total_files} archivos revisados, {total_saved / 1024:.1f} KiB ahorrados.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("directories", nargs="+")
+    parser.add_argument("--extensions", nargs="+", default=DEFAULT_EXTENSIONS)
+    parser.add_argument("--min-saving", type=float, default=0.1)
+    main(parser.parse_args())
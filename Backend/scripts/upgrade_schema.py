@@ -0,0 +1,47 @@
+# scripts/upgrade_schema.py
+# -----------------------------------------------------------------------------
+# Aplica las migraciones de esquema pendientes (config/schema_upgrades.py).
+#
+# Se ejecuta una vez por despliegue, antes de reiniciar los workers: algunas
+# migraciones rellenan columnas o agregan NOT NULL y toman locks exclusivos
+# sobre tablas grandes. Las ya aplicadas quedan en schema_migrations y no se
+# repiten. Necesita la base de datos configurada en .env.
+#
+# Uso:
+#   python scripts/upgrade_schema.py           # aplica las pendientes
+#   python scripts/upgrade_schema.py --check   # solo las lista (sale con 1 si hay)
+# -----------------------------------------------------------------------------
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migraciones de esquema")
+    parser.add_argument(
+        "--check", action="store_true", help="solo lista las migraciones pendientes"
+    )
+    args = parser.parse_args()
+
+    from config.db import Base, engine
+    from config.schema_upgrades import apply_schema_upgrades, pending_schema_upgrades
+    from models import models  # noqa: F401  (registra las tablas en Base)
+
+    if args.check:
+        pending = pending_schema_upgrades(engine)
+        for name in pending:
+            print(f"pendiente: {name}")
+        print(f"{len(pending)} migraciones pendientes.")
+        sys.exit(1 if pending else 0)
+
+    Base.metadata.create_all(bind=engine)
+    applied = apply_schema_upgrades(engine)
+    for name in applied:
+        print(f"aplicada: {name}")
+    print(f"{len(applied)} migraciones aplicadas.")
+
+
+if __name__ == "__main__":
+    main()
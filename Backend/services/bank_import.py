@@ -0,0 +1,356 @@
+# services/bank_import.py
+import csv
+import datetime
+import io
+import logging
+import os
+import re
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from core.constants import INVOICE_PAID_STATUSES
+from models.models import Invoice, User, UserDetail
+
+logger = logging.getLogger(__name__)
+
+# Días de tolerancia alrededor de emisión/vencimiento para aceptar una
+# transferencia cuando solo el monto (o el DNI con varias facturas) la vincula.
+BANK_MATCH_DAYS = int(os.getenv("BANK_MATCH_DAYS", "10"))
+BANK_IMPORT_MAX_LINES = int(os.getenv("BANK_IMPORT_MAX_LINES", "20000"))
+
+BANK_FILE_EXTENSIONS = (".csv", ".ofx", ".qfx")
+
+# Nombres de columna aceptados en los CSV de los bancos (en minúsculas).
+CSV_COLUMNS = {
+    "date": ("fecha", "fecha operacion", "fecha valor", "date"),
+    "amount": ("monto", "importe", "credito", "crédito", "amount"),
+    "reference": (
+        "referencia",
+        "concepto",
+        "descripcion",
+        "descripción",
+        "detalle",
+        "reference",
+        "description",
+    ),
+    "dni": ("dni", "cuit", "cuil", "documento"),
+    "fit_id": ("id", "nro operacion", "comprobante", "transaccion", "fitid"),
+}
+DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%d/%m/%y", "%d-%m-%Y", "%Y%m%d")
+
+# Número de comprobante de la factura (F2025-012) o "factura 12" en el concepto.
+INVOICE_REF_RE = re.compile(
+    r"\bF(?:\d{4}-)?0*(\d+)\b|\bfactura\s*n?[º°.]?\s*0*(\d+)", re.I
+)
+# CUIT/CUIL (20-12345678-3) o DNI suelto de 7-8 dígitos.
+DNI_RE = re.compile(r"\b(?:2[0347]|3[034])-?(\d{8})-?\d\b|\b(\d{7,8})\b")
+OFX_TAG_RE = re.compile(r"<(\w+)>([^<\r\n]*)")
+
+
+class BankImportError(Exception):
+    def __init__(self, message: str, status_code: int = 400):
+        self.message = message
+        self.status_code = status_code
+        super().__init__(self.message)
+
+
+@dataclass
+class BankTransaction:
+    line: int
+    date: datetime.date
+    amount: float
+    reference: str = ""
+    dni: int | None = None
+    fit_id: str | None = None
+
+
+@dataclass
+class OpenInvoice:
+    id: int
+    user_id: int
+    dni: int
+    cents: int
+    issue_date: datetime.date
+    due_date: datetime.date
+
+
+@dataclass
+class OpenInvoiceIndex:
+    """Facturas impagas en memoria, indexadas por id, DNI y monto (en centavos)."""
+
+    by_id: dict = field(default_factory=dict)
+    by_dni: dict = field(default_factory=lambda: defaultdict(list))
+    by_cents: dict = field(default_factory=lambda: defaultdict(list))
+
+
+# --- LECTURA DEL ARCHIVO ---
+
+
+def _parse_amount(value: str) -> float:
+    value = value.strip().replace("$", "").replace(" ", "")
+    if "," in value and "." in value:
+        # 1.234,56 (formato local) o 1,234.56.
+        if value.rfind(",") > value.rfind("."):
+            value = value.replace(".", "").replace(",", ".")
+        else:
+            value = value.replace(",", "")
+    elif "," in value:
+        value = value.replace(",", ".")
+    return float(value)
+
+
+def _parse_date(value: str) -> datetime.date:
+    value = value.strip()[:10]
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(value, date_format).date()
+        except ValueError:
+            continue
+    raise ValueError(f"fecha '{value}' no reconocida")
+
+
+def _find_dni(*texts: str) -> int | None:
+    for text in texts:
+        # Los DNI suelen venir con puntos (12.345.678).
+        match = DNI_RE.search((text or "").replace(".", ""))
+        if match:
+            return int(match.group(1) or match.group(2))
+    return None
+
+
+def _iter_csv(stream):
+    header_line = stream.readline()
+    if not header_line.strip():
+        raise BankImportError("El archivo está vacío.")
+    delimiter = ";" if header_line.count(";") > header_line.count(",") else ","
+    header = [
+        h.strip().lower() for h in next(csv.reader([header_line], delimiter=delimiter))
+    ]
+    positions = {}
+    for key, names in CSV_COLUMNS.items():
+        for index, name in enumerate(header):
+            if name in names:
+                positions[key] = index
+                break
+    missing = {"date", "amount"} - positions.keys()
+    if missing:
+        raise BankImportError(
+            "Faltan columnas en el CSV: " + ", ".join(sorted(missing)) + "."
+        )
+
+    def column(row, key):
+        index = positions.get(key)
+        return row[index].strip() if index is not None and index < len(row) else ""
+
+    for number, row in enumerate(csv.reader(stream, delimiter=delimiter), start=2):
+        if not any(cell.strip() for cell in row):
+            continue
+        reference = column(row, "reference")
+        yield number, {
+            "date": column(row, "date"),
+            "amount": column(row, "amount"),
+            "reference": reference,
+            "dni": _find_dni(column(row, "dni"), reference),
+            "fit_id": column(row, "fit_id") or None,
+        }
+
+
+def _iter_ofx(stream):
+    # OFX 1.x es SGML (etiquetas sin cerrar, una por línea) y 2.x es XML; se
+    # leen igual, línea por línea, tomando los campos de cada <STMTTRN>.
+    current, start = None, 0
+    for number, line in enumerate(stream, start=1):
+        upper = line.upper()
+        if "<STMTTRN>" in upper:
+            current, start = {}, number
+        if current is not None:
+            for tag, value in OFX_TAG_RE.findall(line):
+                current.setdefault(tag.upper(), value.strip())
+        if "</STMTTRN>" in upper and current is not None:
+            reference = " ".join(
+                filter(None, (current.get("NAME"), current.get("MEMO")))
+            )
+            yield start, {
+                "date": current.get("DTPOSTED", "")[:8],
+                "amount": current.get("TRNAMT", ""),
+                "reference": reference,
+                "dni": _find_dni(reference),
+                "fit_id": current.get("FITID"),
+            }
+            current = None
+
+
+def read_transactions(binary_stream, extension: str, encoding: str = "utf-8-sig"):
+    """
+    Lee el extracto por líneas desde el archivo subido, sin cargarlo entero.
+    Devuelve (transacciones, errores por línea). Solo interesan los créditos:
+    los débitos y montos en cero se descartan.
+    """
+    stream = io.TextIOWrapper(
+        binary_stream, encoding=encoding, errors="replace", newline=""
+    )
+    rows = _iter_csv(stream) if extension == ".csv" else _iter_ofx(stream)
+    transactions, errors = [], []
+    try:
+        for number, row in rows:
+            if len(transactions) + len(errors) >= BANK_IMPORT_MAX_LINES:
+                raise BankImportError(
+                    f"El extracto supera el máximo de {BANK_IMPORT_MAX_LINES} movimientos."
+                )
+            try:
+                amount = _parse_amount(row["amount"])
+                tx_date = _parse_date(row["date"])
+            except ValueError as e:
+                errors.append({"line": number, "reason": f"Línea inválida: {e}"})
+                continue
+            if amount <= 0:
+                continue
+            transactions.append(
+                BankTransaction(
+                    line=number,
+                    date=tx_date,
+                    amount=amount,
+                    reference=row["reference"],
+                    dni=row["dni"],
+                    fit_id=row["fit_id"],
+                )
+            )
+    finally:
+        # El UploadFile sigue siendo dueño del archivo subyacente.
+        stream.detach()
+    return transactions, errors
+
+
+# --- CONCILIACIÓN ---
+
+
+def load_open_invoices(db: Session) -> OpenInvoiceIndex:
+    """Una consulta (solo columnas) con todas las facturas impagas y el DNI del cliente."""
+    index = OpenInvoiceIndex()
+    rows = db.execute(
+        select(
+            Invoice.id,
+            Invoice.user_id,
+            Invoice.total_amount,
+            Invoice.issue_date,
+            Invoice.due_date,
+            UserDetail.dni,
+        )
+        .join(User, Invoice.user_id == User.id)
+        .join(UserDetail, User.id_userdetail == UserDetail.id)
+        .where(Invoice.status.notin_(INVOICE_PAID_STATUSES))
+        .order_by(Invoice.issue_date, Invoice.id)
+    )
+    for row in rows:
+        invoice = OpenInvoice(
+            id=row.id,
+            user_id=row.user_id,
+            dni=row.dni,
+            cents=round(row.total_amount * 100),
+            issue_date=row.issue_date.date(),
+            due_date=row.due_date.date(),
+        )
+        index.by_id[invoice.id] = invoice
+        index.by_dni[invoice.dni].append(invoice)
+        index.by_cents[invoice.cents].append(invoice)
+    return index
+
+
+def _in_window(invoice: OpenInvoice, tx_date: datetime.date) -> bool:
+    margin = datetime.timedelta(days=BANK_MATCH_DAYS)
+    return invoice.issue_date - margin <= tx_date <= invoice.due_date + margin
+
+
+def _candidates(tx: BankTransaction, index: OpenInvoiceIndex):
+    """(candidatas, criterio, motivo) para una transferencia."""
+    cents = round(tx.amount * 100)
+
+    for groups in INVOICE_REF_RE.findall(tx.reference):
+        invoice = index.by_id.get(int(groups[0] or groups[1]))
+        if invoice is None:
+            continue
+        if invoice.cents == cents:
+            return [invoice], "referencia", None
+        return [invoice], "referencia", "El monto no coincide con la factura."
+
+    if tx.dni is not None and tx.dni in index.by_dni:
+        invoices = index.by_dni[tx.dni]
+        same_amount = [invoice for invoice in invoices if invoice.cents == cents]
+        if not same_amount:
+            return (
+                invoices,
+                "dni",
+                "El monto no coincide con ninguna factura del cliente.",
+            )
+        if len(same_amount) > 1:
+            in_window = [i for i in same_amount if _in_window(i, tx.date)]
+            same_amount = in_window or same_amount
+        return same_amount, "dni", None
+
+    in_window = [i for i in index.by_cents.get(cents, []) if _in_window(i, tx.date)]
+    return in_window, "monto", None
+
+
+def match_transactions(transactions: list, index: OpenInvoiceIndex) -> list:
+    """
+    Vincula cada transferencia con una factura impaga: primero por número de
+    factura en el concepto, después por DNI/CUIT del cliente y, si no hay
+    ninguno, por monto exacto dentro de la ventana de fechas. Con más de una
+    candidata (o una factura ya tomada por otra línea) queda como ambigua.
+    """
+    assigned = {}
+    results = []
+    for tx in transactions:
+        candidates, match_by, reason = _candidates(tx, index)
+        result = {
+            "line": tx.line,
+            "date": tx.date,
+            "amount": tx.amount,
+            "reference": tx.reference,
+            "dni": tx.dni,
+            "fit_id": tx.fit_id,
+            "status": "unmatched",
+            "match_by": match_by if candidates else None,
+            "invoice_id": None,
+            "candidates": [invoice.id for invoice in candidates],
+            "reason": reason,
+        }
+        if not candidates:
+            result["reason"] = "No hay facturas impagas que coincidan."
+        elif reason is not None or len(candidates) > 1:
+            result["status"] = "ambiguous"
+        elif candidates[0].id in assigned:
+            result["status"] = "ambiguous"
+            result["reason"] = (
+                f"La factura ya corresponde a la línea {assigned[candidates[0].id]}."
+            )
+        else:
+            result["status"] = "matched"
+            result["invoice_id"] = candidates[0].id
+            assigned[candidates[0].id] = tx.line
+        results.append(result)
+    return results
+
+
+def preview_bank_import(
+    db: Session, binary_stream, extension: str, encoding: str = "utf-8-sig"
+) -> dict:
+    """Lee el extracto y propone la factura de cada transferencia, sin escribir nada."""
+    transactions, errors = read_transactions(binary_stream, extension, encoding)
+    index = load_open_invoices(db)
+    lines = match_transactions(transactions, index)
+    summary = {
+        "transactions": len(transactions),
+        "matched": sum(1 for line in lines if line["status"] == "matched"),
+        "ambiguous": sum(1 for line in lines if line["status"] == "ambiguous"),
+        "unmatched": sum(1 for line in lines if line["status"] == "unmatched"),
+        "invalid": len(errors),
+    }
+    logger.info(
+        f"Extracto bancario ({extension}): {summary} contra "
+        f"{len(index.by_id)} facturas impagas."
+    )
+    return {"summary": summary, "lines": lines, "errors": errors}
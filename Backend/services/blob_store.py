@@ -0,0 +1,282 @@
+# services/blob_store.py
+import datetime
+import hashlib
+import logging
+import os
+import shutil
+import uuid
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from core.job_metrics import count_rows, track_job
+from models.models import Attachment, Blob
+from utils.receipt_previews import variant_paths
+
+logger = logging.getLogger(__name__)
+
+# Almacén de archivos por contenido: cada archivo se guarda una sola vez con
+# su SHA-256 como nombre. 'local' (por defecto) o 's3' (AWS, MinIO, etc.).
+BLOB_BACKEND = os.getenv("BLOB_BACKEND", "local").lower()
+BLOB_ROOT = os.getenv("BLOB_ROOT", "storage/blobs")
+BLOB_S3_BUCKET = os.getenv("BLOB_S3_BUCKET", "")
+BLOB_S3_PREFIX = os.getenv("BLOB_S3_PREFIX", "blobs/")
+# Para MinIO u otro servicio compatible con S3; vacío = AWS.
+BLOB_S3_ENDPOINT_URL = os.getenv("BLOB_S3_ENDPOINT_URL") or None
+# Los blobs y archivos sin referencias se borran pasado este margen, para no
+# pisar una subida cuya transacción todavía no terminó.
+BLOB_GC_GRACE_HOURS = float(os.getenv("BLOB_GC_GRACE_HOURS", "24"))
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _replace_with_link(source: str, dest: str):
+    """Reemplaza 'dest' por un hard link a 'source' de forma atómica."""
+    temp = f"{dest}.{uuid.uuid4().hex}.link"
+    os.link(source, temp)
+    os.replace(temp, dest)
+
+
+class LocalBlobBackend:
+    """
+    Blobs en disco bajo BLOB_ROOT/ab/cd/<sha256>. Las rutas públicas de
+    uploads/ y facturas/ se convierten en hard links al blob: las sirven los
+    mismos StaticFiles de siempre y un archivo repetido ocupa espacio una vez.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, sha256: str) -> str:
+        return os.path.join(self.root, sha256[:2], sha256[2:4], sha256)
+
+    def exists(self, sha256: str) -> bool:
+        return os.path.exists(self._path(sha256))
+
+    def put(self, sha256: str, source: str):
+        blob_path = self._path(sha256)
+        os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+        try:
+            os.link(source, blob_path)
+        except FileExistsError:
+            # Otra subida con el mismo contenido llegó primero.
+            self.link_to(sha256, source)
+        except OSError:
+            # Otro sistema de archivos (sin hard links): copia.
+            temp = f"{blob_path}.{uuid.uuid4().hex}.part"
+            shutil.copyfile(source, temp)
+            os.replace(temp, blob_path)
+
+    def link_to(self, sha256: str, dest: str):
+        try:
+            _replace_with_link(self._path(sha256), dest)
+        except OSError as e:
+            # Sin hard links posibles el archivo queda duplicado, pero correcto.
+            logger.warning(f"No se pudo enlazar '{dest}' al blob {sha256}: {e}")
+
+    def delete(self, sha256: str):
+        try:
+            os.remove(self._path(sha256))
+        except FileNotFoundError:
+            pass
+
+    def iter_blobs(self):
+        """(sha256, fecha de modificación) de todos los blobs guardados."""
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                if len(name) == 64:
+                    mtime = os.path.getmtime(os.path.join(dirpath, name))
+                    yield name, datetime.datetime.fromtimestamp(mtime)
+
+
+class S3BlobBackend:
+    """
+    Blobs en un bucket S3 o compatible (MinIO, Ceph...). La copia bajo la ruta
+    pública se mantiene en disco porque es la que sirven los StaticFiles.
+    """
+
+    def __init__(self, bucket: str, prefix: str, endpoint_url: str | None):
+        try:
+            import boto3
+        except ImportError as e:  # boto3 solo hace falta con BLOB_BACKEND=s3.
+            raise RuntimeError(
+                "BLOB_BACKEND=s3 requiere el paquete boto3 (pip install boto3)."
+            ) from e
+        if not bucket:
+            raise RuntimeError("BLOB_BACKEND=s3 requiere BLOB_S3_BUCKET.")
+        self.bucket = bucket
+        self.prefix = prefix
+        self.client = boto3.client("s3", endpoint_url=endpoint_url)
+
+    def _key(self, sha256: str) -> str:
+        return f"{self.prefix}{sha256[:2]}/{sha256}"
+
+    def exists(self, sha256: str) -> bool:
+        from botocore.exceptions import ClientError
+
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._key(sha256))
+            return True
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey"):
+                return False
+            raise
+
+    def put(self, sha256: str, source: str):
+        self.client.upload_file(source, self.bucket, self._key(sha256))
+
+    def link_to(self, sha256: str, dest: str):
+        if os.path.exists(dest):
+            return
+        os.makedirs(os.path.dirname(dest) or ".", exist_ok=True)
+        temp = f"{dest}.{uuid.uuid4().hex}.part"
+        self.client.download_file(self.bucket, self._key(sha256), temp)
+        os.replace(temp, dest)
+
+    def delete(self, sha256: str):
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(sha256))
+
+    def iter_blobs(self):
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix):
+            for item in page.get("Contents", []):
+                name = item["Key"].rsplit("/", 1)[-1]
+                if len(name) == 64:
+                    yield name, item["LastModified"].astimezone().replace(tzinfo=None)
+
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        if BLOB_BACKEND == "s3":
+            _backend = S3BlobBackend(
+                BLOB_S3_BUCKET, BLOB_S3_PREFIX, BLOB_S3_ENDPOINT_URL
+            )
+        else:
+            _backend = LocalBlobBackend(BLOB_ROOT)
+    return _backend
+
+
+def store_file(
+    db: Session,
+    path: str,
+    kind: str,
+    invoice_id: int | None = None,
+    sha256: str | None = None,
+    content_type: str | None = None,
+) -> Attachment | None:
+    """
+    Guarda en el almacén el archivo ya escrito en 'path' y lo asocia a la
+    factura. Si el contenido ya existía, 'path' pasa a ser un enlace al blob
+    existente y la copia nueva se libera. No hace commit: el adjunto se
+    confirma con la transacción de quien llama.
+    Un fallo del almacén no impide la operación: el archivo queda en 'path'.
+    """
+    sha256 = sha256 or file_sha256(path)
+    backend = get_backend()
+    known = db.get(Blob, sha256) is not None
+    try:
+        if known or backend.exists(sha256):
+            backend.link_to(sha256, path)
+        else:
+            backend.put(sha256, path)
+    except Exception as e:
+        logger.error(
+            f"No se pudo guardar '{path}' en el almacén de archivos: {e}", exc_info=True
+        )
+        return None
+
+    if not known:
+        db.execute(
+            insert(Blob)
+            .values(
+                sha256=sha256,
+                size=os.path.getsize(path),
+                content_type=content_type,
+                created_at=datetime.datetime.now(),
+            )
+            .on_conflict_do_nothing(index_elements=["sha256"])
+        )
+    # La ruta ahora apunta al contenido nuevo (p. ej. un comprobante reemplazado).
+    db.execute(delete(Attachment).where(Attachment.path == path))
+    attachment = Attachment(
+        blob_sha256=sha256, kind=kind, path=path, invoice_id=invoice_id
+    )
+    db.add(attachment)
+    if known:
+        logger.info(f"Archivo '{path}' deduplicado: mismo contenido que {sha256}.")
+    return attachment
+
+
+@track_job("blob_gc")
+def collect_garbage(db: Session) -> dict:
+    """
+    Borra los adjuntos de facturas eliminadas (y su archivo en la ruta
+    pública), los blobs sin adjuntos y, en el almacén, los blobs sin fila en
+    la tabla (subidas cuya transacción falló).
+    """
+    backend = get_backend()
+    cutoff = datetime.datetime.now() - datetime.timedelta(hours=BLOB_GC_GRACE_HOURS)
+
+    orphan_attachments = db.scalars(
+        select(Attachment).where(Attachment.invoice_id.is_(None))
+    ).all()
+    live_paths = set(
+        db.scalars(
+            select(Attachment.path).where(Attachment.invoice_id.is_not(None))
+        ).all()
+    )
+    for attachment in orphan_attachments:
+        if attachment.path not in live_paths:
+            for path in (attachment.path, *variant_paths(attachment.path)):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+        db.delete(attachment)
+    db.flush()
+
+    unreferenced = db.scalars(
+        select(Blob).where(
+            Blob.created_at < cutoff,
+            ~select(Attachment.id)
+            .where(Attachment.blob_sha256 == Blob.sha256)
+            .exists(),
+        )
+    ).all()
+    for blob in unreferenced:
+        backend.delete(blob.sha256)
+        db.delete(blob)
+    db.commit()
+
+    known = set(db.scalars(select(Blob.sha256)).all())
+    stray = 0
+    for sha256, modified_at in backend.iter_blobs():
+        if sha256 not in known and modified_at < cutoff:
+            backend.delete(sha256)
+            stray += 1
+
+    count_rows("blob_gc", "attachments", len(orphan_attachments))
+    count_rows("blob_gc", "blobs", len(unreferenced) + stray)
+    logger.info(
+        f"GC de archivos: {len(orphan_attachments)} adjuntos huérfanos, "
+        f"{len(unreferenced)} blobs sin referencias, {stray} blobs sueltos."
+    )
+    return {
+        "message": "Limpieza del almacén de archivos completada.",
+        "adjuntos_huerfanos": len(orphan_attachments),
+        "blobs_sin_referencias": len(unreferenced),
+        "blobs_sueltos": stray,
+    }
@@ -0,0 +1,63 @@
+# services/client_service.py
+import math
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import extract, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload
+
+from core.cache import cached
+from models.models import Invoice, Subscription, User
+from schemas.common_schemas import PaginatedResponse
+from schemas.invoice_schemas import InvoiceOut
+
+# Consultas de solo lectura del área de cliente. Los resultados se guardan en
+# la caché de consultas, así que se devuelven schemas o datos planos.
+
+
+@cached(ttl=60, tags=("user:{user_id}", "invoices"))
+async def get_user_invoices_page(
+    db: AsyncSession,
+    user_id: int,
+    page: int,
+    size: int,
+    month: int | None = None,
+    year: int | None = None,
+) -> PaginatedResponse[InvoiceOut]:
+    """Página de facturas de un cliente, opcionalmente filtrada por mes/año."""
+    filters = [Invoice.user_id == user_id]
+    if month:
+        filters.append(extract("month", Invoice.issue_date) == month)
+    if year:
+        filters.append(extract("year", Invoice.issue_date) == year)
+    total_items = await db.scalar(
+        select(func.count()).select_from(Invoice).where(*filters)
+    )
+    result = await db.execute(
+        select(Invoice)
+        .where(*filters)
+        .order_by(Invoice.issue_date.desc())
+        .offset((page - 1) * size)
+        .limit(size)
+    )
+    invoices = result.scalars().all()
+    return PaginatedResponse[InvoiceOut](
+        total_items=total_items,
+        total_pages=math.ceil(total_items / size),
+        current_page=page,
+        items=[InvoiceOut.model_validate(invoice) for invoice in invoices],
+    )
+
+
+@cached(ttl=300, tags=("user:{user_id}", "subscriptions"))
+def get_user_subscriptions(db: Session, user_id: int) -> list | None:
+    """Suscripciones de un cliente con su plan, o None si el usuario no existe."""
+    user = (
+        db.query(User)
+        .options(joinedload(User.subscriptions).joinedload(Subscription.plan))
+        .filter_by(id=user_id)
+        .first()
+    )
+    if not user:
+        return None
+    return jsonable_encoder(user.subscriptions)
@@ -0,0 +1,84 @@
+# services/dashboard_service.py
+from datetime import datetime
+
+from sqlalchemy import extract, func
+from sqlalchemy.orm import Session
+
+from core.cache import cached
+from models.models import Invoice, Payment, Subscription, UserDetail
+from schemas.settings_schemas import (
+    ClientStatusSummary,
+    DashboardStats,
+    InvoiceStatusSummary,
+)
+
+
+@cached(ttl=30, tags=("dashboard", "users", "invoices", "payments", "subscriptions"))
+def get_dashboard_stats(db: Session) -> DashboardStats:
+    """
+    Calcula las cifras del panel de control. Se guarda en la caché de consultas
+    y se invalida con cualquier escritura sobre las tablas que resume.
+    """
+    now = datetime.utcnow()
+    total_clients = db.query(UserDetail).filter(UserDetail.type == "cliente").count()
+    active_clients = (
+        db.query(Subscription.user_id)
+        .filter(Subscription.status == "active")
+        .distinct()
+        .count()
+    )
+    suspended_clients = (
+        db.query(Subscription.user_id)
+        .filter(Subscription.status == "suspended")
+        .distinct()
+        .count()
+    )
+
+    client_summary = ClientStatusSummary(
+        active_clients=active_clients,
+        suspended_clients=suspended_clients,
+        total_clients=total_clients,
+    )
+
+    pending_invoices = (
+        db.query(Invoice).filter(Invoice.status.ilike("pendiente%")).count()
+    )
+    paid_invoices = db.query(Invoice).filter(Invoice.status == "Pagado").count()
+    overdue_invoices = (
+        db.query(Invoice)
+        .filter(Invoice.status.ilike("pendiente%"), Invoice.due_date < now.date())
+        .count()
+    )
+
+    invoice_summary = InvoiceStatusSummary(
+        pending=pending_invoices,
+        paid=paid_invoices,
+        overdue=overdue_invoices,
+        total=db.query(Invoice).count(),
+    )
+
+    monthly_revenue = (
+        db.query(func.sum(Payment.amount))
+        .filter(
+            extract("month", Payment.payment_date) == now.month,
+            extract("year", Payment.payment_date) == now.year,
+        )
+        .scalar()
+        or 0.0
+    )
+
+    new_subscriptions = (
+        db.query(Subscription)
+        .filter(
+            extract("month", Subscription.subscription_date) == now.month,
+            extract("year", Subscription.subscription_date) == now.year,
+        )
+        .count()
+    )
+
+    return DashboardStats(
+        client_summary=client_summary,
+        invoice_summary=invoice_summary,
+        monthly_revenue=round(monthly_revenue, 2),
+        new_subscriptions_this_month=new_subscriptions,
+    )
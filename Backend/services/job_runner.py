@@ -0,0 +1,328 @@
+# services/job_runner.py
+import asyncio
+import datetime
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable
+
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import select, text, update
+from sqlalchemy.dialects.postgresql import insert
+
+from config.db import SessionLocal, engine
+from core.job_metrics import job_rows_var, job_runs
+from models.models import JobRun
+
+logger = logging.getLogger(__name__)
+
+# Hilos dedicados a las tareas: una facturación larga no ocupa el threadpool
+# que FastAPI usa para atender las rutas sync.
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+
+# Margen para disparos atrasados del scheduler; dentro de él todos los
+# workers calculan el mismo turno (slot).
+JOB_MISFIRE_GRACE = datetime.timedelta(
+    seconds=int(os.getenv("JOB_MISFIRE_GRACE_SECONDS", "300"))
+)
+MIN_SLOT_STEP = datetime.timedelta(seconds=1)
+# Primer argumento de pg_try_advisory_lock(int, int): separa los locks de las
+# tareas de otros advisory locks que use la base.
+ADVISORY_LOCK_NAMESPACE = 7401
+
+JOB_STATUS_RUNNING = "running"
+JOB_STATUS_OK = "ok"
+JOB_STATUS_ERROR = "error"
+# Turno programado que no se ejecutó porque otra ejecución retenía el lock.
+JOB_STATUS_SKIPPED = "skipped"
+
+_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="job")
+# El scheduler solo dispara las tareas en el event loop; el trabajo corre en
+# _executor (ver submit_job).
+scheduler = AsyncIOScheduler()
+
+
+@dataclass
+class JobDefinition:
+    name: str
+    func: Callable
+    description: str
+
+
+JOBS: dict[str, JobDefinition] = {}
+
+
+def register_job(name: str, func: Callable, description: str):
+    """
+    Registra una tarea sync con la firma func(db) -> dict. Si el dict trae la
+    clave 'error', la ejecución se marca como fallida con ese mensaje.
+    """
+    JOBS[name] = JobDefinition(name=name, func=func, description=description)
+
+
+class JobAlreadyRunning(Exception):
+    def __init__(self, message: str):
+        self.message = message
+        super().__init__(self.message)
+
+
+def _lock_key(job_name: str):
+    return text(
+        f"SELECT pg_try_advisory_lock({ADVISORY_LOCK_NAMESPACE}, hashtext(:job_name))"
+    ).bindparams(job_name=job_name)
+
+
+def _release(lock_conn, job_name: str):
+    try:
+        lock_conn.execute(
+            text(
+                f"SELECT pg_advisory_unlock({ADVISORY_LOCK_NAMESPACE}, hashtext(:job_name))"
+            ),
+            {"job_name": job_name},
+        )
+        lock_conn.commit()
+    finally:
+        lock_conn.close()
+
+
+def _record_skipped_slot(conn, job_name: str, slot) -> bool:
+    """
+    Con el lock ocupado, distingue un turno que ya reclamó otro worker (lo
+    normal, no se registra nada) de uno que se pierde porque sigue en curso
+    otra ejecución: una manual o la de un turno anterior. En ese caso el turno
+    queda en job_runs como 'skipped' (una sola fila en todo el cluster) y
+    devuelve True.
+    """
+    holder = conn.execute(
+        select(JobRun.id, JobRun.trigger)
+        .where(
+            JobRun.job_name == job_name,
+            JobRun.status == JOB_STATUS_RUNNING,
+            JobRun.slot.is_distinct_from(slot),
+        )
+        .order_by(JobRun.started_at.desc())
+        .limit(1)
+    ).first()
+    if holder is None:
+        return False
+    now = datetime.datetime.now()
+    reason = "ejecución manual" if holder.trigger == "manual" else "ejecución"
+    skipped_id = conn.scalar(
+        insert(JobRun)
+        .values(
+            job_name=job_name,
+            trigger="schedule",
+            status=JOB_STATUS_SKIPPED,
+            started_at=now,
+            finished_at=now,
+            slot=slot,
+            error=f"Turno omitido: la {reason} {holder.id} seguía en curso.",
+        )
+        .on_conflict_do_nothing(index_elements=["job_name", "slot"])
+        .returning(JobRun.id)
+    )
+    conn.commit()
+    if skipped_id is None:
+        return False
+    job_runs.inc(labels={"job": job_name, "status": JOB_STATUS_SKIPPED})
+    logger.warning(
+        f"Tarea '{job_name}' ({slot:%Y-%m-%d %H:%M}): turno omitido porque la "
+        f"{reason} {holder.id} retiene el lock."
+    )
+    return True
+
+
+def claim_run(job_name: str, trigger: str = "schedule", slot=None):
+    """
+    Reserva la ejecución de una tarea en todo el cluster. Devuelve
+    (run_id, lock_conn) o None si otro proceso la está ejecutando o si el turno
+    'slot' ya fue reclamado. Si el turno se pierde por otra ejecución en curso,
+    queda registrado como 'skipped' (ver _record_skipped_slot).
+
+    Dos barreras: el advisory lock de Postgres (uno por tarea, retenido en
+    lock_conn mientras dure la ejecución) evita ejecuciones solapadas, y la
+    restricción única (job_name, slot) evita que un worker que dispara unos
+    segundos más tarde repita un turno que otro ya terminó.
+    """
+    lock_conn = engine.connect()
+    try:
+        if not lock_conn.scalar(_lock_key(job_name)):
+            lock_conn.rollback()
+            if slot is not None:
+                _record_skipped_slot(lock_conn, job_name, slot)
+            lock_conn.close()
+            return None
+        # Con el lock tomado no puede haber otra ejecución viva: las que
+        # siguen 'running' son de un proceso que murió a mitad de camino.
+        lock_conn.execute(
+            update(JobRun)
+            .where(JobRun.job_name == job_name, JobRun.status == JOB_STATUS_RUNNING)
+            .values(
+                status=JOB_STATUS_ERROR,
+                finished_at=datetime.datetime.now(),
+                error="Ejecución interrumpida (el proceso terminó antes de completarla).",
+            )
+        )
+        run_id = lock_conn.scalar(
+            insert(JobRun)
+            .values(
+                job_name=job_name,
+                trigger=trigger,
+                status=JOB_STATUS_RUNNING,
+                started_at=datetime.datetime.now(),
+                slot=slot,
+            )
+            .on_conflict_do_nothing(index_elements=["job_name", "slot"])
+            .returning(JobRun.id)
+        )
+        lock_conn.commit()
+    except Exception:
+        _release(lock_conn, job_name)
+        raise
+    if run_id is None:
+        _release(lock_conn, job_name)
+        return None
+    return run_id, lock_conn
+
+
+def _finish_run(run_id: int, status: str, rows: dict, result=None, error=None):
+    db = SessionLocal()
+    try:
+        run = db.get(JobRun, run_id)
+        run.status = status
+        run.finished_at = datetime.datetime.now()
+        run.rows = sum(rows.values())
+        run.result = jsonable_encoder({**(result or {}), "rows": rows})
+        run.error = error
+        db.commit()
+    finally:
+        db.close()
+
+
+def execute_run(run_id: int, job_name: str, lock_conn) -> dict:
+    """
+    Ejecuta la tarea con una sesión nueva, que se cierra al terminar, y deja
+    en el historial el resultado, las filas contadas y el error si lo hubo.
+    Al final libera el advisory lock tomado en claim_run.
+    """
+    try:
+        return _execute(run_id, job_name)
+    finally:
+        _release(lock_conn, job_name)
+
+
+def _execute(run_id: int, job_name: str) -> dict:
+    job = JOBS[job_name]
+    rows = {}
+    token = job_rows_var.set(rows)
+    db = SessionLocal()
+    try:
+        result = job.func(db)
+    except Exception as e:
+        db.rollback()
+        logger.error(
+            f"La tarea '{job_name}' (ejecución {run_id}) falló: {e}", exc_info=True
+        )
+        _finish_run(run_id, JOB_STATUS_ERROR, rows, error=str(e))
+        raise
+    finally:
+        db.close()
+        job_rows_var.reset(token)
+
+    error = result.get("error") if isinstance(result, dict) else None
+    _finish_run(
+        run_id,
+        JOB_STATUS_ERROR if error else JOB_STATUS_OK,
+        rows,
+        result=result if isinstance(result, dict) else None,
+        error=error,
+    )
+    logger.info(f"Tarea '{job_name}' (ejecución {run_id}) terminada: {result}")
+    return result
+
+
+def run_job(job_name: str, trigger: str = "manual") -> dict:
+    """Ejecuta la tarea en el hilo actual y devuelve su resultado."""
+    claimed = claim_run(job_name, trigger)
+    if claimed is None:
+        raise JobAlreadyRunning(f"La tarea '{job_name}' ya se está ejecutando.")
+    run_id, lock_conn = claimed
+    return execute_run(run_id, job_name, lock_conn)
+
+
+def _run_quietly(run_id: int, job_name: str, lock_conn):
+    try:
+        execute_run(run_id, job_name, lock_conn)
+    except Exception:
+        # El error ya quedó registrado en el log y en job_runs.
+        pass
+
+
+async def submit_job(job_name: str, trigger: str = "manual", slot=None) -> int | None:
+    """
+    Reserva la ejecución y la lanza en el executor de tareas sin esperarla.
+    Devuelve el id de la ejecución, o None si no se pudo reservar.
+    """
+    loop = asyncio.get_running_loop()
+    # La reserva se hace en el threadpool por defecto: es breve y no debe
+    # esperar a que se libere un hilo de _executor.
+    claimed = await loop.run_in_executor(None, claim_run, job_name, trigger, slot)
+    if claimed is None:
+        return None
+    run_id, lock_conn = claimed
+    loop.run_in_executor(_executor, _run_quietly, run_id, job_name, lock_conn)
+    return run_id
+
+
+def current_slot(trigger, now=None) -> datetime.datetime:
+    """
+    Último disparo programado del trigger que no sea posterior a 'now'. Todos
+    los workers obtienen el mismo valor aunque el scheduler los despierte con
+    algunos segundos de diferencia.
+    """
+    now = now or datetime.datetime.now(datetime.timezone.utc).astimezone()
+    slot = trigger.get_next_fire_time(None, now - JOB_MISFIRE_GRACE)
+    while slot is not None:
+        following = trigger.get_next_fire_time(slot, slot + MIN_SLOT_STEP)
+        if following is None or following > now:
+            break
+        slot = following
+    if slot is None or slot > now:
+        # Sin disparo reciente (ejecución tardía): el minuto actual.
+        slot = now.replace(second=0, microsecond=0)
+    return slot.replace(tzinfo=None)
+
+
+async def run_scheduled(job_name: str):
+    """Punto de entrada del scheduler: cada worker lo dispara, solo uno ejecuta."""
+    scheduled = scheduler.get_job(f"{job_name}_job")
+    slot = current_slot(scheduled.trigger)
+    run_id = await submit_job(job_name, trigger="schedule", slot=slot)
+    if run_id is None:
+        logger.debug(
+            f"Tarea '{job_name}' ({slot:%Y-%m-%d %H:%M}) ya reclamada por otro proceso."
+        )
+
+
+def schedule_job(job_name: str, trigger, name: str | None = None):
+    """
+    Programa una tarea registrada en el AsyncIOScheduler de la aplicación.
+    Todos los workers la programan; run_scheduled garantiza una sola ejecución
+    por turno en el cluster.
+    """
+    scheduler.add_job(
+        run_scheduled,
+        trigger=trigger,
+        args=[job_name],
+        id=f"{job_name}_job",
+        name=name or JOBS[job_name].description,
+        replace_existing=True,
+        coalesce=True,
+        misfire_grace_time=int(JOB_MISFIRE_GRACE.total_seconds()),
+    )
+
+
+def shutdown():
+    _executor.shutdown(wait=False, cancel_futures=True)
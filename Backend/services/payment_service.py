@@ -1,4 +1,5 @@
 # services/payment_service.py
+import datetime
 import logging
 import os
 import re
@@ -12,6 +13,9 @@ from models.models import (
     InputPaymentAdmin,
 )
 from utils.pdf_generator import generate_payment_receipt
+from core.cache import invalidate_tags
+from core.constants import INVOICE_PAID_STATUSES, INVOICE_REVIEW_STATUSES
+from services.blob_store import store_file
 
 logger = logging.getLogger(__name__)
 
@@ -98,7 +102,15 @@ def process_new_payment(payment_data: InputPayment, db: Session) -> dict:
     )
     relative_path = os.path.relpath(full_receipt_path, "facturas").replace("\\", "/")
     invoice_to_pay.receipt_pdf_url = relative_path
+    store_file(
+        db,
+        full_receipt_path,
+        "invoice_pdf",
+        invoice_id=invoice_to_pay.id,
+        content_type="application/pdf",
+    )
 
+    invalidate_tags(db, f"user:{invoice_to_pay.user_id}", "invoices", "payments")
     db.commit()
 
     return {
@@ -135,6 +147,13 @@ def process_new_payment_admin(payment_data: InputPaymentAdmin, db: Session) -> d
     invoice_to_pay.status = "Pagado"
     if payment_data.receipt_url:
         invoice_to_pay.receipt_pdf_url = payment_data.receipt_url
+        store_file(
+            db,
+            payment_data.receipt_url,
+            "receipt",
+            invoice_id=invoice_to_pay.id,
+            sha256=payment_data.receipt_sha256,
+        )
 
     new_payment = Payment(
         user_id=invoice_to_pay.user_id,
@@ -164,7 +183,15 @@ def process_new_payment_admin(payment_data: InputPaymentAdmin, db: Session) -> d
             "\\", "/"
         )
         invoice_to_pay.receipt_pdf_url = relative_path
+        store_file(
+            db,
+            full_receipt_path,
+            "invoice_pdf",
+            invoice_id=invoice_to_pay.id,
+            content_type="application/pdf",
+        )
 
+    invalidate_tags(db, f"user:{invoice_to_pay.user_id}", "invoices", "payments")
     db.commit()
 
     return {
@@ -173,3 +200,138 @@ def process_new_payment_admin(payment_data: InputPaymentAdmin, db: Session) -> d
         "invoice_id": invoice_to_pay.id,
         "new_status": "Pagado",
     }
+
+
+# --- REVISIÓN DE COMPROBANTES POR LOTES ---
+def review_receipts(decisions: list, admin_user_id: int, db: Session) -> dict:
+    """
+    Aplica un lote de decisiones de la cola de revisión en una sola transacción.
+    Aprobar marca la factura como pagada y crea su Payment por el total;
+    rechazar la devuelve a "Pendiente" para que el cliente suba otro
+    comprobante. Las facturas se bloquean (FOR UPDATE) y solo se toman las que
+    siguen en revisión: las que otro administrador ya resolvió se omiten.
+    """
+    by_invoice = {decision.invoice_id: decision for decision in decisions}
+    invoices = (
+        db.query(Invoice)
+        .filter(Invoice.id.in_(by_invoice), Invoice.status.in_(INVOICE_REVIEW_STATUSES))
+        .order_by(Invoice.id)
+        .with_for_update()
+        .all()
+    )
+    found = {invoice.id for invoice in invoices}
+    skipped = [
+        {"invoice_id": invoice_id, "reason": "La factura no está en revisión."}
+        for invoice_id in by_invoice
+        if invoice_id not in found
+    ]
+
+    approved, rejected, payments, tags = [], [], [], {"invoices"}
+    for invoice in invoices:
+        decision = by_invoice[invoice.id]
+        tags.add(f"user:{invoice.user_id}")
+        if decision.action == "approve":
+            invoice.status = "Pagado"
+            payment = Payment(
+                user_id=invoice.user_id,
+                amount=invoice.total_amount,
+                invoice_id=invoice.id,
+            )
+            # El default del modelo se evalúa al importar el módulo.
+            payment.payment_date = datetime.datetime.now()
+            payment.payment_method = decision.payment_method
+            payments.append(payment)
+            approved.append(invoice.id)
+        else:
+            invoice.status = "Pendiente"
+            rejected.append(invoice.id)
+            logger.info(
+                f"Comprobante de la factura {invoice.id} rechazado por el admin "
+                f"{admin_user_id}: {decision.reason or 'sin motivo'}."
+            )
+
+    db.add_all(payments)
+    db.flush()
+    if payments:
+        tags.add("payments")
+    if invoices:
+        invalidate_tags(db, *tags)
+    db.commit()
+
+    logger.info(
+        f"Revisión por lotes del admin {admin_user_id}: {len(approved)} aprobadas, "
+        f"{len(rejected)} rechazadas, {len(skipped)} omitidas."
+    )
+    return {
+        "approved": approved,
+        "rejected": rejected,
+        "payment_ids": [payment.id for payment in payments],
+        "skipped": skipped,
+    }
+
+
+# --- PAGOS IMPORTADOS DE EXTRACTOS BANCARIOS ---
+def register_imported_payments(
+    payments: list, payment_method: str, admin_user_id: int, db: Session
+) -> dict:
+    """
+    Registra en una sola transacción los pagos confirmados de un extracto
+    (ver services/bank_import.py). Las facturas se bloquean (FOR UPDATE) y se
+    omiten las que ya están pagadas o cuyo total no coincide con el monto
+    transferido, para que importar dos veces el mismo extracto no duplique pagos.
+    """
+    by_invoice = {payment.invoice_id: payment for payment in payments}
+    invoices = (
+        db.query(Invoice)
+        .filter(
+            Invoice.id.in_(by_invoice), Invoice.status.notin_(INVOICE_PAID_STATUSES)
+        )
+        .order_by(Invoice.id)
+        .with_for_update()
+        .all()
+    )
+    found = {invoice.id for invoice in invoices}
+    skipped = [
+        {"invoice_id": invoice_id, "reason": "La factura no existe o ya está pagada."}
+        for invoice_id in by_invoice
+        if invoice_id not in found
+    ]
+
+    new_payments, tags = [], {"invoices", "payments"}
+    for invoice in invoices:
+        data = by_invoice[invoice.id]
+        if round(data.amount * 100) != round(invoice.total_amount * 100):
+            skipped.append(
+                {
+                    "invoice_id": invoice.id,
+                    "reason": "El monto no coincide con la factura.",
+                }
+            )
+            continue
+        invoice.status = "Pagado"
+        payment = Payment(
+            user_id=invoice.user_id, amount=data.amount, invoice_id=invoice.id
+        )
+        payment.payment_method = payment_method
+        payment.payment_date = datetime.datetime.combine(
+            data.payment_date, datetime.time()
+        )
+        new_payments.append(payment)
+        tags.add(f"user:{invoice.user_id}")
+
+    # Un solo flush: SQLAlchemy agrupa los INSERT de los pagos en lotes.
+    db.add_all(new_payments)
+    db.flush()
+    if new_payments:
+        invalidate_tags(db, *tags)
+    db.commit()
+
+    logger.info(
+        f"Importación bancaria del admin {admin_user_id}: {len(new_payments)} pagos "
+        f"registrados, {len(skipped)} omitidos."
+    )
+    return {
+        "created": len(new_payments),
+        "payment_ids": [payment.id for payment in new_payments],
+        "skipped": skipped,
+    }
@@ -0,0 +1,98 @@
+# services/plan_catalogue.py
+import datetime
+import hashlib
+import logging
+import threading
+
+from sqlalchemy.orm import Session
+
+from config.db import SessionLocal
+from core import db_notify
+from models.models import InternetPlan
+from schemas.plan_schemas import PlanOut
+
+logger = logging.getLogger(__name__)
+
+PLANS_CHANNEL = "plan_catalogue_changed"
+
+
+class PlanCatalogue:
+    """
+    Catálogo público de planes en memoria. Se carga al iniciar el worker, se
+    actualiza write-through desde las rutas de admin y se recarga completo
+    cuando otro worker avisa de un cambio (son pocas filas).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._plans = {}
+        self._loaded = False
+        self.version = ""
+        self.last_modified = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def _rebuild_version(self):
+        # La versión depende solo del contenido, así todos los workers
+        # generan el mismo ETag para el mismo catálogo.
+        plans = sorted(self._plans.values(), key=lambda p: p.id)
+        digest = hashlib.sha1(
+            "|".join(p.model_dump_json() for p in plans).encode()
+        ).hexdigest()
+        if digest[:20] != self.version:
+            # No se toma el updated_at más reciente de los planes: al borrar
+            # uno, Last-Modified retrocedería y los If-Modified-Since guardados
+            # seguirían dando 304 con un catálogo distinto.
+            self.version = digest[:20]
+            self.last_modified = datetime.datetime.now()
+
+    def reload(self):
+        """Carga todos los planes desde la BD con una sesión propia."""
+        db = SessionLocal()
+        try:
+            rows = db.query(InternetPlan).all()
+            plans = {row.id: PlanOut.model_validate(row) for row in rows}
+        finally:
+            db.close()
+        with self._lock:
+            self._plans = plans
+            self._loaded = True
+            self._rebuild_version()
+        logger.info(f"Catálogo de planes cargado: {len(plans)} planes.")
+
+    def upsert(self, plan: InternetPlan):
+        with self._lock:
+            self._plans[plan.id] = PlanOut.model_validate(plan)
+            self._rebuild_version()
+
+    def remove(self, plan_id: int):
+        with self._lock:
+            self._plans.pop(plan_id, None)
+            self._rebuild_version()
+
+    def page(self, page: int, size: int) -> tuple[int, list]:
+        """Devuelve (total de planes, planes de la página) ordenados por ID."""
+        with self._lock:
+            plans = sorted(self._plans.values(), key=lambda p: p.id)
+        offset = (page - 1) * size
+        return len(plans), plans[offset : offset + size]
+
+
+plan_catalogue = PlanCatalogue()
+
+
+def publish_plan_change(db: Session, plan_id: int):
+    """Avisa a los demás workers; se entrega al hacer commit de 'db'."""
+    db_notify.notify(db, PLANS_CHANNEL, str(plan_id))
+
+
+def _on_plan_change(payload: str | None):
+    try:
+        plan_catalogue.reload()
+    except Exception as e:
+        logger.error(f"No se pudo recargar el catálogo de planes: {e}", exc_info=True)
+
+
+db_notify.subscribe(PLANS_CHANNEL, _on_plan_change)
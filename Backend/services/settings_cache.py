@@ -0,0 +1,79 @@
+# services/settings_cache.py
+import logging
+import threading
+from dataclasses import dataclass, fields
+
+from sqlalchemy.orm import Session
+
+from config.db import SessionLocal
+from core import db_notify
+from models.models import CompanySettings
+
+logger = logging.getLogger(__name__)
+
+SETTINGS_CHANNEL = "company_settings_changed"
+
+
+@dataclass(frozen=True)
+class CompanySettingsSnapshot:
+    """Copia inmutable de la fila de CompanySettings, segura entre hilos."""
+
+    id: int
+    business_name: str
+    business_cuit: str
+    business_address: str
+    business_city: str
+    business_phone: str
+    payment_window_days: int
+    late_fee_amount: float
+    auto_invoicing_enabled: bool
+    days_for_suspension: int
+
+    @classmethod
+    def from_model(cls, settings: CompanySettings) -> "CompanySettingsSnapshot":
+        return cls(**{f.name: getattr(settings, f.name) for f in fields(cls)})
+
+
+_snapshot = None
+_lock = threading.Lock()
+
+
+def get_company_settings() -> CompanySettingsSnapshot | None:
+    """
+    Devuelve la configuración del negocio desde la caché del worker. Solo la
+    primera llamada (o la primera tras una invalidación) consulta la BD, con
+    su propia sesión, así que no necesita una sesión del llamador.
+    Devuelve None si la fila de configuración todavía no existe.
+    """
+    global _snapshot
+    snapshot = _snapshot
+    if snapshot is not None:
+        return snapshot
+    with _lock:
+        if _snapshot is None:
+            db = SessionLocal()
+            try:
+                settings = db.query(CompanySettings).first()
+                if settings:
+                    _snapshot = CompanySettingsSnapshot.from_model(settings)
+                    logger.info("Configuración del negocio cargada en caché.")
+            finally:
+                db.close()
+        return _snapshot
+
+
+def invalidate_company_settings(payload: str | None = None):
+    global _snapshot
+    with _lock:
+        _snapshot = None
+
+
+def publish_settings_change(db: Session):
+    """
+    Avisa a todos los workers (este incluido) que la configuración cambió.
+    Debe llamarse antes del commit de la transacción que la modifica.
+    """
+    db_notify.notify(db, SETTINGS_CHANNEL)
+
+
+db_notify.subscribe(SETTINGS_CHANNEL, invalidate_company_settings)
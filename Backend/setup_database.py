@@ -3,6 +3,7 @@ import logging
 from getpass import getpass
 from sqlalchemy.orm import Session
 from config.db import SessionLocal, Base, engine
+from config.schema_upgrades import apply_schema_upgrades
 from models.models import (
     User,
     UserDetail,
@@ -143,6 +144,8 @@ def setup_database():
         logger.info("--- Iniciando configuración de la base de datos ---")
         Base.metadata.drop_all(bind=engine)
         Base.metadata.create_all(bind=engine)
+        # Las tablas nuevas ya tienen el esquema actual: solo quedan registradas.
+        apply_schema_upgrades(engine)
         logger.info("Tablas recreadas exitosamente.")
 
         # --- LÓGICA CORREGIDA Y SIMPLIFICADA ---
@@ -194,6 +197,7 @@ def setup_database():
                 due_date=due_date,
                 base_amount=plan.price,
                 total_amount=plan.price,
+                billing_period=today.replace(day=1),
             )
             if "pagado" in client_data["scenario"]:
                 invoice.status = "Pagado"
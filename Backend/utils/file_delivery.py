@@ -0,0 +1,119 @@
+# utils/file_delivery.py
+import logging
+import os
+from mimetypes import guess_type
+from urllib.parse import quote
+
+from fastapi import Request, Response
+from fastapi.responses import FileResponse
+from fastapi.staticfiles import StaticFiles
+
+logger = logging.getLogger(__name__)
+
+# Quién envía los bytes de los archivos (PDFs, comprobantes) una vez que la
+# API verificó el acceso:
+#   app      -> el propio worker, con Range y ETag (por defecto, sin proxy).
+#   nginx    -> cabecera X-Accel-Redirect hacia una location 'internal'.
+#   sendfile -> cabecera X-Sendfile con la ruta absoluta (Apache, lighttpd).
+# Con nginx, la location interna apunta al directorio del backend:
+#   location /_protected/ { internal; alias /ruta/al/Backend/; }
+FILE_DELIVERY_MODE = os.getenv("FILE_DELIVERY_MODE", "app").lower()
+FILE_DELIVERY_INTERNAL_PREFIX = os.getenv(
+    "FILE_DELIVERY_INTERNAL_PREFIX", "/_protected/"
+)
+# false: /facturas y /uploads dejan de servirse sin firma (ver routes/file_routes.py).
+PUBLIC_FILE_MOUNTS = os.getenv("PUBLIC_FILE_MOUNTS", "true").lower() == "true"
+# Carpetas que el proxy puede servir; cualquier otra ruta la sirve la app.
+OFFLOAD_ROOTS = ("facturas", "uploads")
+
+if FILE_DELIVERY_MODE not in ("app", "nginx", "sendfile"):
+    logger.warning(
+        f"FILE_DELIVERY_MODE='{FILE_DELIVERY_MODE}' no es válido; se usa 'app'."
+    )
+    FILE_DELIVERY_MODE = "app"
+
+
+def _offload_target(path: str) -> str | None:
+    """URI interna (nginx) o ruta absoluta (X-Sendfile) del archivo, o None."""
+    relative = os.path.relpath(os.path.abspath(path)).replace("\\", "/")
+    if relative.split("/", 1)[0] not in OFFLOAD_ROOTS:
+        return None
+    if FILE_DELIVERY_MODE == "nginx":
+        return f"{FILE_DELIVERY_INTERNAL_PREFIX.rstrip('/')}/{quote(relative)}"
+    # X-Sendfile lleva la ruta tal cual y una cabecera HTTP solo admite ASCII.
+    absolute = os.path.abspath(path)
+    return absolute if absolute.isascii() else None
+
+
+def _offload_response(path: str, headers: dict) -> Response | None:
+    target = _offload_target(path) if FILE_DELIVERY_MODE != "app" else None
+    if target is None:
+        return None
+    header = "X-Accel-Redirect" if FILE_DELIVERY_MODE == "nginx" else "X-Sendfile"
+    # El proxy completa Content-Length, Range, ETag, Last-Modified y los 304.
+    return Response(status_code=200, headers={**headers, header: target})
+
+
+def _is_not_modified(response_headers, request_headers) -> bool:
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match is not None:
+        etag = response_headers.get("etag", "").strip(" W/")
+        tags = [tag.strip(" W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+    return False
+
+
+def file_response(
+    request: Request,
+    path: str,
+    media_type: str | None = None,
+    filename: str | None = None,
+    cache_control: str = "private, max-age=300",
+) -> Response:
+    """
+    Respuesta para un archivo cuyo acceso ya se verificó. Según
+    FILE_DELIVERY_MODE la envía el proxy (la petición termina aquí, sin leer
+    el archivo) o la app, que responde 304 si el ETag del cliente coincide y
+    atiende Range (206) para descargas parciales o reanudadas.
+    """
+    # FileResponse arma Content-Type y Content-Disposition (nombres con tildes
+    # incluidos); sin stat_result todavía no toca el disco.
+    response = FileResponse(path, media_type=media_type, filename=filename)
+    response.headers["Cache-Control"] = cache_control
+    offloaded = _offload_response(
+        path,
+        {
+            key: value
+            for key, value in response.headers.items()
+            if key in ("content-type", "content-disposition", "cache-control")
+        },
+    )
+    if offloaded is not None:
+        return offloaded
+
+    response.set_stat_headers(os.stat(path))
+    if _is_not_modified(response.headers, request.headers):
+        return Response(
+            status_code=304,
+            headers={
+                key: value
+                for key, value in response.headers.items()
+                if key in ("etag", "last-modified", "cache-control")
+            },
+        )
+    return response
+
+
+class OffloadedStaticFiles(StaticFiles):
+    """
+    StaticFiles para FILE_DELIVERY_MODE=nginx/sendfile: la app resuelve la
+    ruta (y el 404) y el proxy envía el archivo. La compresión previa la
+    resuelve el proxy (gzip_static / brotli_static).
+    """
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        content_type = guess_type(str(full_path))[0] or "application/octet-stream"
+        response = _offload_response(str(full_path), {"content-type": content_type})
+        if response is None:
+            return super().file_response(full_path, stat_result, scope, status_code)
+        return response
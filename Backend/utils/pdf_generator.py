@@ -1,5 +1,7 @@
 # Backend/utils/pdf_generator.py
 import datetime
+import os
+import time
 from pathlib import Path
 from jinja2 import Environment, FileSystemLoader
 from weasyprint import HTML, CSS
@@ -7,11 +9,19 @@ from sqlalchemy.orm import Session
 
 # --- ¡IMPORTACIONES CORREGIDAS! ---
 # Se elimina BusinessSettings y se añade CompanySettings
-from models.models import Payment, Invoice, CompanySettings, UserDetail
+from models.models import Payment, Invoice, UserDetail
+from services.settings_cache import get_company_settings
+from core.metrics import registry
 
 TEMPLATES_DIR = Path(__file__).parent.parent / "templates"
 INVOICES_DIR = Path("facturas")
 
+pdf_render_duration = registry.histogram(
+    "pdf_render_seconds",
+    "Duración del renderizado de PDFs con WeasyPrint.",
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0),
+)
+
 
 def get_logo_path():
     for ext in ["png", "jpg", "jpeg", "svg"]:
@@ -43,8 +53,14 @@ def create_invoice_pdf(invoice_data: dict, custom_filename: str) -> str:
             f"El archivo 'style.css' no se encuentra en: {css_path}"
         )
 
+    started = time.perf_counter()
     html_doc = HTML(string=html_string, base_url=TEMPLATES_DIR.as_uri())
-    html_doc.write_pdf(full_path, stylesheets=[CSS(css_path)])
+    # Se escribe aparte y se reemplaza: la ruta puede ser un hard link a un
+    # blob compartido (services/blob_store.py) que no debe modificarse.
+    temp_path = full_path.with_name(f".{full_path.name}.part")
+    html_doc.write_pdf(temp_path, stylesheets=[CSS(css_path)])
+    os.replace(temp_path, full_path)
+    pdf_render_duration.observe(time.perf_counter() - started)
 
     print(f"Factura generada exitosamente en: {full_path}")
     return str(full_path.as_posix())
@@ -59,9 +75,8 @@ def generate_payment_receipt(
     user_details = invoice.user.userdetail
     plan_details = invoice.subscription.plan
 
-    # --- ¡LÓGICA CORREGIDA Y SIMPLIFICADA! ---
-    # Se busca la única fila de configuración en la nueva tabla.
-    settings = db.query(CompanySettings).first()
+    # La configuración sale de la caché del worker, sin consultar la BD.
+    settings = get_company_settings()
     if not settings:
         raise ValueError(
             "La configuración de la empresa (CompanySettings) no ha sido inicializada en la base de datos."
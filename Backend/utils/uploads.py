@@ -0,0 +1,125 @@
+# utils/uploads.py
+import hashlib
+import os
+import uuid
+from dataclasses import dataclass
+
+import aiofiles
+import aiofiles.os
+from fastapi import UploadFile, status
+
+# Tamaño máximo de un comprobante subido (por defecto 10 MB).
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+# Firmas (magic bytes) aceptadas por extensión: el contenido debe coincidir
+# con la extensión declarada, sin importar el Content-Type que mande el cliente.
+RECEIPT_SIGNATURES = {
+    ".pdf": (b"%PDF-",),
+    ".png": (b"\x89PNG\r\n\x1a\n",),
+    ".jpg": (b"\xff\xd8\xff",),
+    ".jpeg": (b"\xff\xd8\xff",),
+}
+
+
+class UploadError(Exception):
+    def __init__(self, message: str, status_code: int = 400):
+        self.message = message
+        self.status_code = status_code
+        super().__init__(self.message)
+
+
+@dataclass
+class StoredUpload:
+    path: str
+    size: int
+    sha256: str
+    extension: str
+
+
+def upload_extension(file: UploadFile, signatures: dict = RECEIPT_SIGNATURES) -> str:
+    """Extensión del archivo en minúsculas; UploadError si no está permitida."""
+    extension = os.path.splitext(file.filename or "")[1].lower()
+    if extension not in signatures:
+        raise UploadError(
+            f"Formato de archivo no permitido. Permitidos: {', '.join(signatures)}"
+        )
+    return extension
+
+
+async def save_upload(
+    file: UploadFile,
+    folder: str,
+    filename_stem: str,
+    signatures: dict = RECEIPT_SIGNATURES,
+    max_bytes: int = MAX_UPLOAD_BYTES,
+) -> StoredUpload:
+    """
+    Guarda un archivo subido en 'folder/filename_stem<ext>' por bloques, sin
+    cargarlo entero en memoria. Mientras los bytes pasan se controla el tamaño
+    máximo y la firma del contenido, y se calcula el SHA-256. Se escribe en un
+    archivo temporal de la misma carpeta que solo se renombra (os.replace,
+    atómico) cuando todo salió bien; ante cualquier error se borra.
+    """
+    extension = upload_extension(file, signatures)
+    if file.size is not None and file.size > max_bytes:
+        raise _too_large(max_bytes)
+
+    await aiofiles.os.makedirs(folder, exist_ok=True)
+    final_path = os.path.join(folder, f"{filename_stem}{extension}")
+    temp_path = os.path.join(folder, f".{filename_stem}.{uuid.uuid4().hex}.part")
+    signature_bytes = max(len(sig) for sig in signatures[extension])
+    digest = hashlib.sha256()
+    size = 0
+    head = b""
+    try:
+        async with aiofiles.open(temp_path, "wb") as out:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise _too_large(max_bytes)
+                if len(head) < signature_bytes:
+                    head += chunk[: signature_bytes - len(head)]
+                    if len(head) >= signature_bytes:
+                        _check_signature(head, extension, signatures)
+                digest.update(chunk)
+                await out.write(chunk)
+        if size == 0:
+            raise UploadError("El archivo está vacío.")
+        if len(head) < signature_bytes:
+            _check_signature(head, extension, signatures)
+        await aiofiles.os.replace(temp_path, final_path)
+    except BaseException:
+        try:
+            await aiofiles.os.remove(temp_path)
+        except FileNotFoundError:
+            pass
+        raise
+    finally:
+        await file.close()
+
+    return StoredUpload(
+        path=final_path.replace("\\", "/"),
+        size=size,
+        sha256=digest.hexdigest(),
+        extension=extension,
+    )
+
+
+def _too_large(max_bytes: int) -> UploadError:
+    if max_bytes >= 1024 * 1024:
+        limit = f"{max_bytes / (1024 * 1024):g} MB"
+    else:
+        limit = f"{max_bytes // 1024} KB"
+    return UploadError(
+        f"El archivo supera el tamaño máximo de {limit}.",
+        status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+    )
+
+
+def _check_signature(head: bytes, extension: str, signatures: dict):
+    if not any(head.startswith(signature) for signature in signatures[extension]):
+        raise UploadError(
+            f"El contenido del archivo no corresponde a un {extension[1:].upper()}.",
+            status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+        )